@@ -0,0 +1,400 @@
+"""Streaming audio writers used while a recording is in progress."""
+import logging
+import os
+import struct
+import threading
+import time
+from typing import Callable, List, Optional
+
+from .ffmpeg import FfmpegAudioWriter
+from .ring_buffer import SampleRing
+from .segments import segment_path
+
+logger = logging.getLogger(__name__)
+
+# Size of the PCM WAV header written by WavStreamWriter: RIFF, a 28-byte
+# JUNK chunk reserving room for an RF64 ds64 chunk, fmt and the data chunk header
+WAV_HEADER_SIZE = 80
+# Largest size a RIFF chunk can declare; longer files are written as RF64
+MAX_RIFF_SIZE = 0xFFFFFFFF
+# Audio file formats; the compressed ones are encoded by a local ffmpeg
+AUDIO_FORMATS = ('wav', 'flac', 'opus')
+
+
+def wav_header(channels: int, sample_width: int, rate: int, data_bytes: int) -> bytes:
+    """
+    The WAV_HEADER_SIZE-byte header of a PCM file holding ``data_bytes`` of audio.
+
+    Up to 4 GB this is a plain RIFF/WAVE header with a JUNK chunk. Beyond,
+    it is an RF64 header (EBU Tech 3306): the JUNK chunk becomes a ds64
+    chunk carrying the 64-bit sizes, so switching formats rewrites the
+    header in place without moving any audio.
+    """
+    block_align = channels * sample_width
+    riff_size = WAV_HEADER_SIZE - 8 + data_bytes + (data_bytes & 1)
+    fmt = struct.pack('<4sIHHIIHH', b'fmt ', 16, 1, channels, rate, rate * block_align,
+                      block_align, sample_width * 8)
+    if riff_size <= MAX_RIFF_SIZE:
+        return (struct.pack('<4sI4s4sI', b'RIFF', riff_size, b'WAVE', b'JUNK', 28) + bytes(28)
+                + fmt + struct.pack('<4sI', b'data', data_bytes))
+    return (struct.pack('<4sI4s4sIQQQI', b'RF64', MAX_RIFF_SIZE, b'WAVE', b'ds64', 28,
+                        riff_size, data_bytes, data_bytes // block_align, 0)
+            + fmt + struct.pack('<4sI', b'data', MAX_RIFF_SIZE))
+
+
+class WavReader:
+    """
+    Read PCM frames from a RIFF or RF64 WAV file.
+
+    Offers the subset of ``wave.Wave_read`` the mixer uses, without the
+    stdlib's 4 GB limit.
+
+    Attributes:
+        path: WAV file path
+        rf64: Whether the file is RF64
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._parse(os.path.getsize(path))
+        except Exception:
+            self._file.close()
+            raise
+        self._position = 0
+
+    def _parse(self, file_size: int):
+        kind, _, wave_id = struct.unpack('<4sI4s', self._file.read(12))
+        if kind not in (b'RIFF', b'RF64') or wave_id != b'WAVE':
+            raise ValueError(f"{self.path} is not a WAV file")
+        self.rf64 = kind == b'RF64'
+        ds64_data = None
+        self._block_align = None
+        position = 12
+        while True:
+            self._file.seek(position)
+            header = self._file.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{self.path} has no data chunk")
+            chunk_id, size = struct.unpack('<4sI', header)
+            if chunk_id == b'ds64':
+                ds64_data = struct.unpack('<QQ', self._file.read(16))[1]
+            elif chunk_id == b'fmt ':
+                (_, self._channels, self._rate, _, self._block_align,
+                 bits) = struct.unpack('<HHIIHH', self._file.read(16))
+                self._sample_width = bits // 8
+            elif chunk_id == b'data':
+                if self.rf64 and size == MAX_RIFF_SIZE and ds64_data is not None:
+                    size = ds64_data
+                break
+            position += 8 + size + (size & 1)
+        if not self._block_align:
+            raise ValueError(f"{self.path} has no format chunk")
+        self._data_start = position + 8
+        # A file cut short holds fewer frames than its header claims
+        size = min(size, file_size - self._data_start)
+        self._nframes = size // self._block_align
+
+    def getnchannels(self) -> int:
+        return self._channels
+
+    def getsampwidth(self) -> int:
+        return self._sample_width
+
+    def getframerate(self) -> int:
+        return self._rate
+
+    def getnframes(self) -> int:
+        return self._nframes
+
+    def tell(self) -> int:
+        return self._position
+
+    def setpos(self, frame: int):
+        """Move the read position to ``frame``."""
+        if not 0 <= frame <= self._nframes:
+            raise ValueError("position not in range")
+        self._position = frame
+
+    def readframes(self, n: int) -> bytes:
+        """Read up to ``n`` frames from the current position."""
+        n = max(0, min(n, self._nframes - self._position))
+        self._file.seek(self._data_start + self._position * self._block_align)
+        data = self._file.read(n * self._block_align)
+        self._position += len(data) // self._block_align
+        return data
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> "WavReader":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class WavStreamWriter:
+    """
+    Append-only PCM WAV file.
+
+    The header is written up front with zero lengths and patched with the real
+    sizes on close, so audio can be appended chunk by chunk without ever being
+    held in memory. Once the data no longer fits a RIFF file (4 GB, about
+    6 hours of 48 kHz stereo) the header switches to RF64. While writing, the
+    header is also refreshed every ``header_interval`` seconds, so a file left
+    behind by a crash plays up to the last update (and ``recordmymeeting
+    repair`` recovers the rest).
+
+    Attributes:
+        path: Output file path
+        channels: Number of interleaved channels
+        sample_width: Bytes per sample
+        rate: Sample rate in Hz
+        header_interval: Seconds between header updates while writing (None = only on close)
+        frames_written: Number of audio frames appended so far
+    """
+    def __init__(self, path: str, channels: int, sample_width: int, rate: int,
+                 header_interval: Optional[float] = 1.0):
+        self.path = path
+        self.channels = channels
+        self.sample_width = sample_width
+        self.rate = rate
+        self.header_interval = header_interval
+        self.frames_written = 0
+        self._data_bytes = 0
+        self._rf64 = False
+        self._file = open(path, 'wb')
+        self._write_header()
+        self._next_header = time.monotonic() + (header_interval or 0)
+
+    @property
+    def paths(self) -> List[str]:
+        """Files written by this writer."""
+        return [self.path]
+
+    def _write_header(self):
+        """Write (or rewrite) the WAV header for the current data size."""
+        header = wav_header(self.channels, self.sample_width, self.rate, self._data_bytes)
+        if header[:4] == b'RF64' and not self._rf64:
+            self._rf64 = True
+            logger.info(f"{self.path} passed the 4 GB RIFF limit, continuing as RF64")
+        self._file.write(header)
+
+    def write(self, data):
+        """Append raw interleaved PCM data (bytes or any contiguous buffer)."""
+        view = memoryview(data)
+        self._file.write(view)
+        self._data_bytes += view.nbytes
+        self.frames_written = self._data_bytes // (self.channels * self.sample_width)
+        if self.header_interval is not None and time.monotonic() >= self._next_header:
+            self._update_header()
+
+    def _update_header(self):
+        """Rewrite the header for the data written so far and hand everything to the OS."""
+        self._file.seek(0)
+        self._write_header()
+        self._file.seek(0, os.SEEK_END)
+        self._file.flush()
+        self._next_header = time.monotonic() + self.header_interval
+
+    def close(self):
+        """Patch the header with the final sizes and close the file."""
+        if self._file.closed:
+            return
+        # RIFF chunks must be word aligned
+        if self._data_bytes % 2:
+            self._file.write(b'\x00')
+        self._file.seek(0)
+        self._write_header()
+        self._file.close()
+
+
+def open_audio_file(path: str, channels: int, sample_width: int, rate: int,
+                    bitrate: Optional[str] = None):
+    """
+    Open a streaming audio file writer for ``path``, picked by its extension.
+
+    ``.wav`` gives a WavStreamWriter; ``.flac`` and ``.opus`` an
+    FfmpegAudioWriter encoding in an ffmpeg process. All take raw PCM with
+    write() and offer frames_written, paths and close().
+
+    Args:
+        path: Output file path
+        channels: Number of interleaved channels
+        sample_width: Bytes per sample
+        rate: Sample rate in Hz
+        bitrate: Opus bitrate (e.g. '48k'), or None for the codec default
+    """
+    if path.lower().endswith('.wav'):
+        return WavStreamWriter(path, channels, sample_width, rate)
+    return FfmpegAudioWriter(path, channels, sample_width, rate, bitrate=bitrate)
+
+
+class SegmentedWavWriter:
+    """
+    Audio writer that rolls over to a new numbered file every ``segment_frames`` frames.
+
+    Drop-in replacement for WavStreamWriter: writes are split exactly at
+    segment boundaries, so segment ``k`` of ``microphone.wav`` is
+    ``microphone_000k.wav`` and starts at frame ``k * segment_frames``. Each
+    finished segment has a valid header and can be processed while the
+    recording goes on. Segments are opened with open_audio_file, so a
+    ``.flac`` or ``.opus`` path gives compressed segments.
+
+    Attributes:
+        path: Base path the segment file names are derived from
+        segment_frames: Frames per segment
+        frames_written: Frames written over all segments
+        paths: Segment files opened so far
+    """
+    def __init__(self,
+                 path: str,
+                 channels: int,
+                 sample_width: int,
+                 rate: int,
+                 segment_frames: int,
+                 on_open: Optional[Callable[[int, str, int], None]] = None,
+                 on_close: Optional[Callable[[int, str, int], None]] = None,
+                 bitrate: Optional[str] = None):
+        """
+        Args:
+            path: Base output path
+            channels: Number of interleaved channels
+            sample_width: Bytes per sample
+            rate: Sample rate in Hz
+            segment_frames: Frames per segment file
+            on_open: Called with ``(index, path, first_frame)`` when a segment is started
+            on_close: Called with ``(index, path, end_frame)`` when a segment is complete
+            bitrate: Opus bitrate passed to open_audio_file
+        """
+        self.path = path
+        self.channels = channels
+        self.sample_width = sample_width
+        self.rate = rate
+        self.segment_frames = max(1, int(segment_frames))
+        self.on_open = on_open
+        self.on_close = on_close
+        self.bitrate = bitrate
+        self.frames_written = 0
+        self.paths = []
+        self._wav = None
+
+    def _roll(self):
+        """Close the full segment (if any) and start the next one."""
+        self._close_segment()
+        index = self.frames_written // self.segment_frames
+        path = segment_path(self.path, index)
+        self._wav = open_audio_file(path, self.channels, self.sample_width, self.rate, self.bitrate)
+        self.paths.append(path)
+        if self.on_open:
+            self.on_open(index, path, self.frames_written)
+
+    def _close_segment(self):
+        if self._wav is None:
+            return
+        self._wav.close()
+        if self.on_close:
+            self.on_close(len(self.paths) - 1, self._wav.path, self.frames_written)
+        self._wav = None
+
+    def write(self, data):
+        """Append raw interleaved PCM data, starting new segments as needed."""
+        view = memoryview(data).cast('B')
+        frame_bytes = self.channels * self.sample_width
+        while view.nbytes:
+            if self._wav is None or self._wav.frames_written >= self.segment_frames:
+                self._roll()
+            room = (self.segment_frames - self._wav.frames_written) * frame_bytes
+            self._wav.write(view[:room])
+            self.frames_written += min(room, view.nbytes) // frame_bytes
+            view = view[room:]
+
+    def close(self):
+        """Finalize the current segment."""
+        self._close_segment()
+
+
+class StreamingAudioWriter:
+    """
+    Background writer that drains a capture ring buffer to an audio file.
+
+    The capture side copies chunks into a preallocated SampleRing; a dedicated
+    thread attaches its own RingReader and appends zero-copy views of the new
+    frames to disk as they arrive. The file starts at ring frame 0, so file
+    frames line up with the ring's clock. Memory use is bounded by the ring capacity
+    regardless of how long the recording runs.
+
+    Attributes:
+        path: Output file path
+        source: Ring buffer the writer drains
+        frames_written: Number of audio frames written to disk so far
+    """
+    def __init__(self,
+                 path: str,
+                 sample_width: int,
+                 rate: int,
+                 source: SampleRing,
+                 poll_interval: float = 0.01,
+                 wav=None):
+        """
+        Open the output file and start the writer thread.
+
+        Args:
+            path: Output file path (.wav, .flac or .opus)
+            sample_width: Bytes per sample
+            rate: Sample rate in Hz
+            source: Ring to drain; its channel count is used for the file
+            poll_interval: Seconds to sleep when the ring is empty
+            wav: Opened output writer (e.g. a SegmentedWavWriter); opened
+                with open_audio_file on ``path`` if None
+        """
+        self.path = path
+        self.source = source
+        self.poll_interval = poll_interval
+        self._reader = source.reader(from_start=True)
+        self._wav = wav or open_audio_file(path, source.channels, sample_width, rate)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def frames_written(self) -> int:
+        return self._wav.frames_written
+
+    @property
+    def paths(self) -> List[str]:
+        return self._wav.paths
+
+    @property
+    def dropped_frames(self) -> int:
+        return self._reader.lost_frames
+
+    def _drain(self) -> int:
+        """Write every unread frame in the ring. Returns the number of frames written."""
+        views = self._reader.peek()
+        count = 0
+        for view in views:
+            try:
+                self._wav.write(view)
+            except Exception as e:
+                logger.error(f"Error writing audio to {self.path}: {e}")
+            count += len(view)
+        self._reader.advance(count)
+        return count
+
+    def _run(self):
+        """Writer thread: drain the ring until close() is requested."""
+        while not self._stop.is_set():
+            if not self._drain():
+                self._stop.wait(self.poll_interval)
+        # Pick up anything written after the last pass
+        self._drain()
+
+    def close(self):
+        """Flush pending frames, patch the WAV header and close the file."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        self._wav.close()
@@ -0,0 +1,95 @@
+"""Audio input and screen capture backends used by RecordMyMeeting."""
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+import mss
+import pyaudio
+
+from .device_manager import get_device_registry, get_device_snapshot
+from .device_profile import DeviceProfile, get_device_profile
+
+
+class AudioBackend(ABC):
+    """
+    Source of audio input sessions and device information.
+
+    ``create()`` returns a PyAudio-compatible session object (``open``,
+    ``get_device_info_by_index``, ``get_host_api_info_by_index``,
+    ``terminate``); everything else the recorder needs from the platform
+    goes through the methods below.
+
+    Attributes:
+        name: Short backend name for logs
+        time_scale: How many backend seconds pass per wall-clock second
+    """
+    name = 'base'
+    time_scale = 1.0
+
+    @abstractmethod
+    def create(self):
+        """Open a new PyAudio-compatible session."""
+
+    @abstractmethod
+    def detect_devices(self, refresh: bool = False) -> Dict[str, Optional[Dict]]:
+        """Best working 'mic' and 'speaker', as returned by auto_detect_devices()."""
+
+    @abstractmethod
+    def snapshot(self) -> Dict:
+        """Cheap device-list snapshot, as returned by get_device_snapshot()."""
+
+    def invalidate_devices(self):
+        """Forget cached device information after a device change."""
+
+    def monotonic(self) -> float:
+        """Clock used to timestamp captured audio and screen frames."""
+        return time.monotonic()
+
+    @property
+    def device_profile(self) -> Optional[DeviceProfile]:
+        """Persistent device profile to consult and update, if any."""
+        return None
+
+
+class PyAudioBackend(AudioBackend):
+    """Real audio devices through PyAudio/PortAudio."""
+    name = 'pyaudio'
+
+    def create(self):
+        return pyaudio.PyAudio()
+
+    def detect_devices(self, refresh: bool = False) -> Dict[str, Optional[Dict]]:
+        return get_device_registry().detected_devices(refresh=refresh)
+
+    def snapshot(self) -> Dict:
+        return get_device_snapshot()
+
+    def invalidate_devices(self):
+        get_device_registry().invalidate()
+
+    @property
+    def device_profile(self) -> Optional[DeviceProfile]:
+        return get_device_profile()
+
+
+class ScreenBackend(ABC):
+    """
+    Source of screen frames.
+
+    ``open()`` returns a context manager compatible with ``mss.mss()``: it has
+    a ``monitors`` list (index 0 is the union of all monitors) and a
+    ``grab(monitor)`` method returning a BGRA screenshot.
+    """
+    name = 'base'
+
+    @abstractmethod
+    def open(self):
+        """Open a new mss-compatible capture session."""
+
+
+class MssScreenBackend(ScreenBackend):
+    """Real screen capture through mss."""
+    name = 'mss'
+
+    def open(self):
+        return mss.mss()
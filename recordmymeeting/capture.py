@@ -0,0 +1,216 @@
+"""Per-device audio capture built on PyAudio callback mode."""
+import logging
+import time
+from typing import Callable, Optional
+
+import numpy as np
+import pyaudio
+
+from .device_profile import DeviceProfile, device_key
+from .ring_buffer import SampleRing
+
+logger = logging.getLogger(__name__)
+
+
+class AudioCaptureStream:
+    """
+    Capture one input device independently of every other source.
+
+    PortAudio invokes the stream callback on its own thread for each device,
+    so a stalled device never delays reads from another one. Every chunk is
+    stamped with ``clock()`` (``time.monotonic()`` by default) and copied into
+    a preallocated int16 SampleRing that consumers (e.g. a StreamingAudioWriter)
+    read from.
+
+    Attributes:
+        name: Source name used in logs ('mic' or 'speaker')
+        device_index: PyAudio device index currently captured
+        channels: Number of channels actually opened on the device
+        ring: Sample ring receiving captured frames (created on first open)
+        overflows: Callbacks flagged with paInputOverflow by PortAudio
+        frames_captured: Total frames delivered by the device
+        frames_lost: Frames the device dropped, replaced by silence in the ring
+    """
+    # Later-than-expected chunks within this many seconds are callback jitter
+    GAP_TOLERANCE = 0.05
+
+    def __init__(self,
+                 pa: pyaudio.PyAudio,
+                 name: str,
+                 device_index: int,
+                 channels: int,
+                 rate: int,
+                 format: int = pyaudio.paInt16,
+                 frames_per_buffer: int = 1024,
+                 ring_seconds: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 profile: Optional[DeviceProfile] = None):
+        """
+        Args:
+            pa: Shared PyAudio instance
+            name: Source name used in logs
+            device_index: Input device index
+            channels: Requested channel count (clamped to what the device supports)
+            rate: Sample rate in Hz
+            format: PyAudio sample format
+            frames_per_buffer: Frames per callback
+            ring_seconds: Seconds of audio the ring holds before overwriting
+            clock: Monotonic clock used to timestamp chunks
+            profile: Device profile updated when the device opens (None to skip)
+        """
+        self.pa = pa
+        self.name = name
+        self.device_index = device_index
+        self.requested_channels = channels
+        self.channels = channels
+        self.rate = rate
+        self.format = format
+        self.frames_per_buffer = frames_per_buffer
+        self.ring_seconds = ring_seconds
+        self.clock = clock
+        self.profile = profile
+        self.ring = None
+        self.overflows = 0
+        self.frames_captured = 0
+        self.frames_lost = 0
+        self._stream = None
+        # Where the next chunk should start, in PortAudio stream time and on ``clock``
+        self._next_adc_time = None
+        self._next_timestamp = None
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        """PortAudio callback: timestamp the chunk and hand it to the ring."""
+        # The callback runs once the chunk is complete; stamp its first frame
+        timestamp = self.clock() - frame_count / self.rate
+        overflow = bool(status & pyaudio.paInputOverflow)
+        if overflow:
+            self.overflows += 1
+        lost = self._lost_frames(timestamp, frame_count, time_info, overflow)
+        if lost:
+            # Silence keeps later frames at their capture time, so the clock
+            # estimate does not mistake lost audio for drift
+            self.ring.write_silence(lost)
+            self.frames_lost += lost
+        self.frames_captured += frame_count
+        self.ring.write(in_data, timestamp)
+        return (None, pyaudio.paContinue)
+
+    def _lost_frames(self, timestamp: float, frame_count: int, time_info, overflow: bool) -> int:
+        """
+        Frames dropped between the previous chunk and this one.
+
+        PortAudio's ADC time of the chunk is exact where the host API reports
+        it. Otherwise the chunk timestamp is compared with the ring's clock;
+        late callbacks are common, so that gap only counts when PortAudio
+        flagged an overflow or it exceeds GAP_TOLERANCE.
+        """
+        adc_time = (time_info or {}).get('input_buffer_adc_time') or None
+        expected_adc, expected_timestamp = self._next_adc_time, self._next_timestamp
+        self._next_adc_time = adc_time + frame_count / self.rate if adc_time else None
+        self._next_timestamp = timestamp + frame_count / self.rate
+        if adc_time and expected_adc is not None:
+            gap = adc_time - expected_adc
+        elif expected_timestamp is None:
+            return 0
+        elif overflow or timestamp - expected_timestamp >= self.GAP_TOLERANCE:
+            expected = self.ring.time_of(self.ring.frames_written)
+            gap = 0.0 if expected is None else timestamp - expected
+        else:
+            return 0
+        return max(0, int(round(gap * self.rate)))
+
+    def open(self):
+        """Open and start the callback stream on ``device_index``."""
+        device_info = self.pa.get_device_info_by_index(self.device_index)
+        max_channels = int(device_info.get('maxInputChannels', 0))
+        if max_channels == 0:
+            raise Exception(f"Invalid audio channels: Device {self.device_index} does not support "
+                            f"input recording (maxInputChannels=0).")
+        if self.ring is None:
+            self.channels = min(self.requested_channels, max_channels)
+            self.ring = SampleRing.for_duration(self.ring_seconds, self.rate, self.channels)
+        elif max_channels < self.ring.channels:
+            # Consumers already read this ring with a fixed frame layout
+            raise Exception(f"Device {self.device_index} supports {max_channels} input channel(s), "
+                            f"need {self.ring.channels}")
+        self._stream = self.pa.open(
+            format=self.format,
+            channels=self.channels,
+            rate=self.rate,
+            input=True,
+            input_device_index=self.device_index,
+            frames_per_buffer=self.frames_per_buffer,
+            stream_callback=self._callback
+        )
+        self._stream.start_stream()
+        logger.info(f"{self.name.capitalize()} stream opened (device {self.device_index}, channels: {self.channels})")
+        if self.profile is None:
+            return
+        try:
+            host_api = self.pa.get_host_api_info_by_index(device_info['hostApi'])['name']
+            key = device_key(host_api, device_info['name'], max_channels)
+            self.profile.note_supported(key, self.rate, self.channels)
+        except Exception as e:
+            logger.debug(f"Could not update device profile: {e}")
+
+    def is_active(self) -> bool:
+        """Whether the callback stream is still delivering audio."""
+        try:
+            return self._stream is not None and self._stream.is_active()
+        except Exception:
+            return False
+
+    def reopen(self, device_index=None):
+        """
+        Close the current stream and open it again, optionally on a new device.
+
+        Args:
+            device_index: New device index, or None to reopen the same device
+        """
+        self.close()
+        if device_index is not None:
+            self.device_index = device_index
+        if self.ring is not None:
+            # The new stream has its own clock and starts after a gap
+            self.ring.mark_discontinuity()
+        self._next_adc_time = None
+        self._next_timestamp = None
+        self.open()
+
+    def close(self):
+        """Stop and close the stream. Safe to call more than once."""
+        if self._stream is None:
+            return
+        try:
+            self._stream.stop_stream()
+            self._stream.close()
+        except Exception as e:
+            logger.debug(f"Error closing {self.name} stream: {e}")
+        self._stream = None
+
+    def level(self, window: float = 0.05) -> float:
+        """
+        RMS level of the most recent audio, normalized to 0.0-1.0.
+
+        Args:
+            window: Seconds of audio to measure
+        """
+        if self.ring is None or not self.ring.frames_written:
+            return 0.0
+        views = self.ring.latest(int(window * self.rate))
+        total = sum(float(np.square(v, dtype=np.float64).sum()) for v in views)
+        count = sum(v.size for v in views)
+        return (total / count) ** 0.5 / 32768.0 if count else 0.0
+
+    def stats(self) -> dict:
+        """Capture counters for status reporting."""
+        clock = self.ring.clock() if self.ring else None
+        return {
+            'device_index': self.device_index,
+            'frames_captured': self.frames_captured,
+            'overflows': self.overflows,
+            'frames_lost': self.frames_lost,
+            'dropped_frames': self.ring.overruns if self.ring else 0,
+            'measured_rate': round(clock[1], 2) if clock else None,
+            'level': round(self.level(), 4),
+        }
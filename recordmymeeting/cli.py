@@ -6,7 +6,8 @@ from datetime import datetime, timedelta
 
 from recordmymeeting import __version__
 from recordmymeeting.core import RecordMyMeeting
-from recordmymeeting.device_manager import print_all_devices, auto_detect_devices
+from recordmymeeting.device_manager import print_all_devices
+from recordmymeeting.repair import FAILED, repair_session
 
 
 def setup_logging(verbose=False):
@@ -18,8 +19,52 @@ def setup_logging(verbose=False):
         datefmt='%Y-%m-%d %H:%M:%S'
     )
 
+def parse_size(value):
+    """Parse WIDTHxHEIGHT (e.g. 1280x720)."""
+    try:
+        width, height = (int(v) for v in value.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got '{value}'")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError("width and height must be positive")
+    return width, height
+
+def parse_region(value):
+    """Parse LEFT,TOP,WIDTH,HEIGHT (e.g. 0,0,1920,1080)."""
+    try:
+        left, top, width, height = (int(v) for v in value.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected LEFT,TOP,WIDTH,HEIGHT, got '{value}'")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError("width and height must be positive")
+    return left, top, width, height
+
+def repair_main(argv):
+    """``recordmymeeting repair <session>``: fix the files of an interrupted session."""
+    parser = argparse.ArgumentParser(
+        prog='recordmymeeting repair',
+        description="Rebuild WAV headers, MP4 indexes and the segment index of a session "
+                    "left behind by a crash, without re-encoding."
+    )
+    parser.add_argument('session', help='Session folder to repair')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Enable verbose logging')
+    args = parser.parse_args(argv)
+
+    setup_logging(args.verbose)
+    try:
+        results = repair_session(args.session)
+    except FileNotFoundError as e:
+        logging.error(str(e))
+        return 1
+    for path, outcome in results.items():
+        print(f"{outcome:>9}  {path}")
+    return 1 if FAILED in results.values() else 0
+
 def main():
     """Main CLI entry point."""
+    if sys.argv[1:2] == ['repair']:
+        sys.exit(repair_main(sys.argv[2:]))
+
     parser = argparse.ArgumentParser(
         description="RecordMyMeeting - Effortlessly capture audio and screen.",
         formatter_class=argparse.RawTextHelpFormatter
@@ -42,9 +87,18 @@ def main():
   # Record everything (mic + speaker + screen)
   recordmymeeting --source all --output ./my_recordings --duration 30
 
+  # Record only the second monitor, downscaled to 720p, in grayscale
+  recordmymeeting --source screen --monitor 2 --resolution 1280x720 --grayscale
+
+  # Keep the audio lossless but about half the size of WAV
+  recordmymeeting --source all --audio-format flac
+
   # With specific microphone device
   recordmymeeting --source mic --mic-device 2 --session-name "Interview"
 
+  # Recover the files of a session interrupted by a crash
+  recordmymeeting repair ./recordings/Interview_20251019_143025
+
   # Launch GUI for interactive control
   recordmymeeting-gui
 """
@@ -75,6 +129,38 @@ def main():
     adv_group = parser.add_argument_group('Advanced Options')
     adv_group.add_argument('--fps', type=int, default=10, help='Video frames per second (default: 10)')
     adv_group.add_argument('--audio-rate', type=int, default=44100, help='Audio sample rate in Hz (default: 44100)')
+    adv_group.add_argument('--audio-format', choices=['wav', 'flac', 'opus'], default='wav',
+                           help='Audio file format; flac and opus are encoded while recording by ffmpeg (default: wav)')
+    adv_group.add_argument('--audio-bitrate', type=str, default=None, metavar='RATE',
+                           help='Opus bitrate, e.g. 48k (default: encoder default)')
+    adv_group.add_argument('--audio-layout', choices=['separate', 'interleaved'], default='separate',
+                           help='interleaved: one 2-channel session file (mic left, speaker right) '
+                                'instead of microphone, speaker and merged files (default: separate)')
+    adv_group.add_argument('--live-merge', action='store_true',
+                           help='Mix mic + speaker into merged.wav while recording (no merge pass at stop)')
+    adv_group.add_argument('--mux', choices=['mkv', 'mp4'], default=None,
+                           help='At stop, combine screen and audio into one recording.mkv/.mp4 (needs ffmpeg)')
+    adv_group.add_argument('--mux-all-tracks', action='store_true',
+                           help='Also add the separate mic and speaker tracks to the --mux file')
+    adv_group.add_argument('--segment-minutes', type=float, default=None, metavar='N',
+                           help='Roll audio and video over into new numbered files every N minutes (index in segments.json)')
+
+    # Screen options
+    screen_group = parser.add_argument_group('Screen Options')
+    screen_group.add_argument('--monitor', type=int, default=0,
+                              help='Monitor to record, 1 = first monitor (default: 0 = all monitors)')
+    screen_group.add_argument('--region', type=parse_region, default=None, metavar='LEFT,TOP,WIDTH,HEIGHT',
+                              help='Record only this screen rectangle (overrides --monitor)')
+    screen_group.add_argument('--resolution', type=parse_size, default=None, metavar='WIDTHxHEIGHT',
+                              help='Scale video down to fit WIDTHxHEIGHT, keeping the aspect ratio')
+    screen_group.add_argument('--grayscale', action='store_true',
+                              help='Record the screen in grayscale (smaller files for slides and text)')
+    screen_group.add_argument('--video-encoder', choices=['auto', 'ffmpeg', 'opencv'], default='auto',
+                              help='Video encoder: ffmpeg (multi-threaded, smaller files), opencv, or auto (default: ffmpeg if installed)')
+    screen_group.add_argument('--video-codec', type=str, default='libx264', help='ffmpeg video codec (default: libx264)')
+    screen_group.add_argument('--crf', type=int, default=23, help='ffmpeg constant rate factor, lower = better quality (default: 23)')
+    screen_group.add_argument('--preset', type=str, default='ultrafast', help='ffmpeg encoder preset (default: ultrafast)')
+    screen_group.add_argument('--video-threads', type=int, default=0, help='ffmpeg encoder threads (default: 0 = all cores)')
 
     args = parser.parse_args()
 
@@ -115,32 +201,12 @@ def main():
         logging.error("At least one recording source must be enabled")
         sys.exit(1)
 
-    # Auto-detect devices only if needed
+    # Devices not given on the command line are left to the recorder: it
+    # auto-detects them and, if a detected device fails to open (e.g. a stale
+    # device profile), probes again and retries on the newly detected one
     mic_index = args.mic_device
     speaker_index = args.speaker_device
 
-    # Only detect mic if we're recording mic
-    if record_mic and mic_index is None:
-        logging.info("Auto-detecting microphone device...")
-        detected = auto_detect_devices()
-        if 'mic' in detected and detected['mic']:
-            mic_index = detected['mic']['index']
-            logging.info(f"Using microphone: {detected['mic']['name']} (Index: {mic_index})")
-        else:
-            logging.error("No microphone detected. Use --list-devices to see available devices.")
-            sys.exit(1)
-
-    # Only detect speaker if we're recording speaker
-    if record_speaker and speaker_index is None:
-        logging.info("Auto-detecting speaker device...")
-        detected = auto_detect_devices()
-        if 'speaker' in detected and detected['speaker']:
-            speaker_index = detected['speaker']['index']
-            logging.info(f"Using speaker: {detected['speaker']['name']} (Index: {speaker_index})")
-        else:
-            logging.warning("No speaker detected. Disabling speaker recording.")
-            record_speaker = False
-
     # Create Recorder
     try:
         recorder = RecordMyMeeting(
@@ -153,6 +219,22 @@ def main():
             session_name=args.session_name,
             video_fps=args.fps,
             audio_rate=args.audio_rate,
+            live_merge=args.live_merge,
+            audio_format=args.audio_format,
+            audio_bitrate=args.audio_bitrate,
+            audio_layout=args.audio_layout,
+            mux_format=args.mux,
+            mux_all_tracks=args.mux_all_tracks,
+            segment_minutes=args.segment_minutes,
+            monitor=args.monitor,
+            region=args.region,
+            video_size=args.resolution,
+            grayscale=args.grayscale,
+            video_encoder=args.video_encoder,
+            video_codec=args.video_codec,
+            video_crf=args.crf,
+            video_preset=args.preset,
+            video_threads=args.video_threads,
         )
     except Exception as e:
         logging.error(f"Failed to initialize recorder: {e}")
@@ -204,8 +286,12 @@ def main():
     finally:
         # Stop recording
         logging.info("Stopping recording...")
-        recorder.stop()
-        logging.info(f"Recording saved to: {recorder.session_folder}")
+        job = recorder.stop()
+        if job:
+            # Capture has ended; wait for the files to be finalized before exiting
+            while not job.wait(0.5):
+                print(f"Finalizing... {job.progress():.0%}", end='\r', flush=True)
+            logging.info(f"Recording saved to: {job.name}")
 
 if __name__ == '__main__':
     main()
@@ -1,17 +1,43 @@
 import os
-import cv2
 import sys
-import numpy as np
 import pyaudio
-import wave
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional
-import mss
+from typing import List, Optional, Tuple
 import logging
 
-from .device_manager import auto_detect_devices
+from .audio_writer import AUDIO_FORMATS, SegmentedWavWriter, StreamingAudioWriter, open_audio_file
+from .backends import AudioBackend, MssScreenBackend, PyAudioBackend, ScreenBackend
+from .capture import AudioCaptureStream
+from .device_profile import device_key
+from .device_watcher import DeviceWatcher
+from .ffmpeg import find_ffmpeg
+from .finalize import FinalizationJob
+from .mixer import (
+    AUDIO_LAYOUTS,
+    LIVE_STALL_TIMEOUT,
+    BlockInterleaver,
+    LiveMixer,
+    mix_wav_files,
+    speaker_alignment_segments,
+)
+from .mux import MUX_FORMATS, AudioTrack, mux_session
+from .segments import SEGMENT_INDEX_NAME, SegmentIndex
+from .video_process import ProcessVideoEncoder
+from .video_writer import (
+    QUEUE_POLICIES,
+    VIDEO_ENCODERS,
+    FrameChangeDetector,
+    FrameQueue,
+    SegmentedVideoEncoder,
+    VideoEncoder,
+    bgra_frame,
+    fit_size,
+    open_video_writer,
+    timestamps_path,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +56,31 @@ class RecordMyMeeting:
         audio_rate: Audio sample rate
         channels: Number of audio channels (1=mono, 2=stereo)
         session_name: Optional session name for the recording folder
+        live_merge: Whether merged.wav is mixed during recording instead of after stop()
+        audio_backend: Source of audio devices and input streams
+        screen_backend: Source of screen frames
+        frame_queue_size: Frames buffered between screen grabbing and encoding
+        frame_queue_policy: 'drop_oldest' or 'block' when the frame queue is full
+        skip_static_frames: Whether unchanged screen frames are left out of the video
+        monitor: Monitor captured (0 = all monitors combined)
+        region: Screen rectangle ``(left, top, width, height)`` captured instead of a monitor
+        video_size: ``(width, height)`` box the video is scaled down to fit
+        grayscale: Whether the video is recorded in grayscale
+        video_encoder_backend: Video encoder requested: 'auto', 'ffmpeg' or 'opencv'
+        video_codec: ffmpeg video codec
+        video_crf: ffmpeg constant rate factor
+        video_preset: ffmpeg encoder preset
+        video_threads: ffmpeg encoder threads (0 = all cores)
+        video_workers: Encoder processes (0 = encode in a thread of this process)
+        video_segment_seconds: Segment length encoded by each worker process in turn
+        mux_format: Container ('mkv' or 'mp4') the session is muxed into at stop, or None
+        mux_all_tracks: Also mux the separate microphone and speaker tracks
+        segment_seconds: Length of the rolling segment files, or None for one file per track
+        segment_index: Index of the current session's segment files (segment mode only)
+        finalize_workers: Threads finishing stopped sessions in the background
+        audio_format: Audio file format: 'wav', 'flac' or 'opus'
+        audio_bitrate: Opus bitrate, or None for the encoder default
+        audio_layout: 'separate' files per source or one 'interleaved' session track
     """
     def __init__(self,
                  output_dir: str = "./recordings",
@@ -41,7 +92,31 @@ class RecordMyMeeting:
                  video_fps: int = 10,
                  audio_rate: int = 44100,
                  channels: int = 1,
-                 session_name: Optional[str] = None):
+                 session_name: Optional[str] = None,
+                 live_merge: bool = False,
+                 audio_backend: Optional[AudioBackend] = None,
+                 screen_backend: Optional[ScreenBackend] = None,
+                 frame_queue_size: int = 8,
+                 frame_queue_policy: str = 'drop_oldest',
+                 skip_static_frames: bool = False,
+                 monitor: int = 0,
+                 region: Optional[Tuple[int, int, int, int]] = None,
+                 video_size: Optional[Tuple[int, int]] = None,
+                 grayscale: bool = False,
+                 video_encoder: str = 'auto',
+                 video_codec: str = 'libx264',
+                 video_crf: int = 23,
+                 video_preset: str = 'ultrafast',
+                 video_threads: int = 0,
+                 video_workers: int = 0,
+                 video_segment_seconds: float = 60.0,
+                 mux_format: Optional[str] = None,
+                 mux_all_tracks: bool = False,
+                 segment_minutes: Optional[float] = None,
+                 finalize_workers: int = 4,
+                 audio_format: str = 'wav',
+                 audio_bitrate: Optional[str] = None,
+                 audio_layout: str = 'separate'):
         """
         Initialize RecordMyMeeting.
 
@@ -56,6 +131,55 @@ class RecordMyMeeting:
             audio_rate: Audio sample rate in Hz
             channels: Number of audio channels (1=mono, 2=stereo)
             session_name: optional session name for the recording folder
+            live_merge: Mix mic and speaker into merged.wav as audio arrives,
+                skipping the post-stop merge pass
+            audio_backend: Audio backend (PyAudio if None)
+            screen_backend: Screen backend (mss if None)
+            frame_queue_size: Frames buffered between screen grabbing and encoding
+            frame_queue_policy: When the encoder falls behind, 'drop_oldest'
+                discards queued frames so grabbing keeps its cadence; 'block'
+                makes grabbing wait so no frame is lost
+            skip_static_frames: Only encode frames that differ from the previous
+                one and write variable frame rate video plus a timestamp sidecar
+            monitor: Monitor index as numbered by mss (0 = all monitors combined)
+            region: ``(left, top, width, height)`` in virtual screen coordinates;
+                overrides ``monitor``
+            video_size: ``(width, height)``; frames are shrunk with an area filter
+                to fit inside it, keeping the aspect ratio (None = native size)
+            grayscale: Record a single luma channel (e.g. for text/slides)
+            video_encoder: 'ffmpeg' pipes frames to a local ffmpeg process,
+                'opencv' uses cv2.VideoWriter (mp4v), 'auto' uses ffmpeg when
+                it is installed and falls back to OpenCV otherwise
+            video_codec: ffmpeg video codec (e.g. libx264, libx265)
+            video_crf: ffmpeg constant rate factor (lower = better quality)
+            video_preset: ffmpeg encoder preset
+            video_threads: ffmpeg encoder threads (0 = all cores)
+            video_workers: Number of worker processes that convert and encode
+                frames, fed through shared memory so video work never competes
+                with audio capture for the GIL (0 = encoder thread in this process)
+            video_segment_seconds: With several workers, each encodes
+                segments of this length in turn; they are joined at stop()
+            mux_format: At stop(), combine the video and the merged audio into
+                one 'mkv' or 'mp4' file, aligned by the capture start times
+                (None = keep separate files only)
+            mux_all_tracks: Add the microphone and speaker tracks to the muxed
+                file as extra audio tracks
+            segment_minutes: Roll audio and video over into new numbered files
+                (``screen_0000.mp4``, ``microphone_0000.wav``, ...) every N
+                minutes and list them with their start times in segments.json;
+                merged audio is then always mixed live (None = one file per track)
+            finalize_workers: Threads that finish stopped sessions (encoder
+                flush, audio merge, mux) in the background
+            audio_format: 'wav', or 'flac' (lossless) / 'opus' to compress every
+                audio track as it is recorded, encoded by a local ffmpeg process;
+                merged audio is then always mixed live. Falls back to 'wav'
+                when ffmpeg is not installed
+            audio_bitrate: Opus bitrate such as '48k' (None = encoder default)
+            audio_layout: 'separate' writes microphone, speaker and merged
+                files; 'interleaved' writes mic and speaker, aligned as they
+                are captured, as the left and right channel of a single
+                ``session`` file (see mixer.read_session_view for the
+                merged and per-source views)
         """
         self.output_dir = output_dir
         self.record_mic = record_mic
@@ -67,15 +191,71 @@ class RecordMyMeeting:
         self.format = pyaudio.paInt16
         self.frames_per_buffer = 1024
         self.session_name = session_name
+        self.live_merge = live_merge
+        self.audio_backend = audio_backend or PyAudioBackend()
+        self.screen_backend = screen_backend or MssScreenBackend()
+        if frame_queue_policy not in QUEUE_POLICIES:
+            raise ValueError(f"frame_queue_policy must be one of {QUEUE_POLICIES}")
+        self.frame_queue_size = frame_queue_size
+        self.frame_queue_policy = frame_queue_policy
+        self.skip_static_frames = skip_static_frames
+        if region is not None and (len(region) != 4 or region[2] <= 0 or region[3] <= 0):
+            raise ValueError("region must be (left, top, width, height) with a positive size")
+        if video_size is not None and (len(video_size) != 2 or min(video_size) <= 0):
+            raise ValueError("video_size must be (width, height) with a positive size")
+        self.monitor = monitor
+        self.region = tuple(region) if region else None
+        self.video_size = tuple(video_size) if video_size else None
+        self.grayscale = grayscale
+        if video_encoder not in VIDEO_ENCODERS:
+            raise ValueError(f"video_encoder must be one of {VIDEO_ENCODERS}")
+        self.video_encoder_backend = video_encoder
+        self.video_codec = video_codec
+        self.video_crf = video_crf
+        self.video_preset = video_preset
+        self.video_threads = video_threads
+        self.video_workers = max(0, video_workers)
+        self.video_segment_seconds = video_segment_seconds
+        if mux_format is not None and mux_format not in MUX_FORMATS:
+            raise ValueError(f"mux_format must be one of {MUX_FORMATS}")
+        self.mux_format = mux_format
+        self.mux_all_tracks = mux_all_tracks
+        if segment_minutes is not None and segment_minutes <= 0:
+            raise ValueError("segment_minutes must be positive")
+        if segment_minutes and mux_format:
+            raise ValueError("mux_format cannot be combined with segment_minutes")
+        self.segment_seconds = segment_minutes * 60 if segment_minutes else None
+        if self.segment_seconds and not self.live_merge:
+            # Segments are mixed as they are written; there is no single file to merge at stop
+            self.live_merge = True
+        self.segment_index = None
+        self.finalize_workers = max(1, finalize_workers)
+        if audio_format not in AUDIO_FORMATS:
+            raise ValueError(f"audio_format must be one of {AUDIO_FORMATS}")
+        if audio_format != 'wav' and not find_ffmpeg():
+            logger.warning(f"ffmpeg not found, recording audio as WAV instead of {audio_format}")
+            audio_format = 'wav'
+        self.audio_format = audio_format
+        self.audio_bitrate = audio_bitrate
+        if audio_layout not in AUDIO_LAYOUTS:
+            raise ValueError(f"audio_layout must be one of {AUDIO_LAYOUTS}")
+        self.audio_layout = audio_layout
+        if self.audio_format != 'wav' and not self.live_merge:
+            # The post-stop merge reads WAV files; compressed tracks are mixed from the capture rings
+            self.live_merge = True
 
         # Auto-detect devices ONLY if needed
         self.mic_index = mic_index
         self.speaker_index = speaker_index
+        # Auto-detected devices may come from the cached device profile and are
+        # re-detected if they fail to open
+        self._auto_mic = mic_index is None
+        self._auto_speaker = speaker_index is None
 
         # Only detect microphone if recording mic and not provided
         if self.record_mic and self.mic_index is None:
             logger.info("Auto-detecting microphone device...")
-            detected = auto_detect_devices()
+            detected = self.audio_backend.detect_devices()
             if 'mic' in detected and detected['mic']:
                 self.mic_index = detected['mic']['index']
                 logger.info(f"Using microphone: {detected['mic']['name']} (Index: {self.mic_index})")
@@ -85,62 +265,123 @@ class RecordMyMeeting:
         # Only detect speaker if recording speaker and not provided
         if self.record_speaker and self.speaker_index is None:
             logger.info("Auto-detecting speaker device...")
-            detected = auto_detect_devices()
+            detected = self.audio_backend.detect_devices()
             if 'speaker' in detected and detected['speaker']:
                 self.speaker_index = detected['speaker']['index']
                 logger.info(f"Using speaker: {detected['speaker']['name']}")
                 
-                # Test if we can actually record from this device
-                try:
-                    p = pyaudio.PyAudio()
-                    test_stream = p.open(
-                        format=self.format,
-                        channels=1,
-                        rate=self.audio_rate,
-                        input=True,
-                        input_device_index=self.speaker_index,
-                        frames_per_buffer=self.frames_per_buffer
-                    )
-                    # Try to read some data to verify it works
-                    test_stream.read(self.frames_per_buffer, exception_on_overflow=False)
-                    test_stream.stop_stream()
-                    test_stream.close()
-                    p.terminate()
-                    logger.info("Speaker recording test successful")
-                except Exception as e:
-                    logger.warning(f"Speaker recording test failed: {e}")
-                    logger.warning("No working speaker detected, disabling speaker recording.")
-                    self.record_speaker = False
+                # Test if we can actually record from this device, unless the
+                # device profile already knows it opens at this rate
+                if self._profile_supports(self.speaker_index):
+                    logger.info("Speaker known to work from device profile, skipping recording test")
+                else:
+                    try:
+                        p = self.audio_backend.create()
+                        test_stream = p.open(
+                            format=self.format,
+                            channels=1,
+                            rate=self.audio_rate,
+                            input=True,
+                            input_device_index=self.speaker_index,
+                            frames_per_buffer=self.frames_per_buffer
+                        )
+                        # Try to read some data to verify it works
+                        test_stream.read(self.frames_per_buffer, exception_on_overflow=False)
+                        test_stream.stop_stream()
+                        test_stream.close()
+                        p.terminate()
+                        logger.info("Speaker recording test successful")
+                    except Exception as e:
+                        logger.warning(f"Speaker recording test failed: {e}")
+                        logger.warning("No working speaker detected, disabling speaker recording.")
+                        self.record_speaker = False
             else:
                 logger.warning("No working speaker detected, disabling speaker recording.")
                 self.record_speaker = False
 
-        # Recording state
+        # Recording state; each session gets its own stop event so its threads
+        # never see the state of a session started after it
         self.recording = False
-        self.audio_frames = []
-        self.speaker_frames = []
+        self._stop_event = None
+
+        # Per-device capture streams and the writers draining them
+        # (opened by the audio thread once streams are live)
+        self.mic_capture = None
+        self.speaker_capture = None
+        self.mic_writer = None
+        self.speaker_writer = None
+        self.merge_writer = None
+        self.video_encoder = None
+        self._pending_devices = None
+        # Monotonic time the current recording started (video frame 0), and
+        # the same instant on the audio backend's clock
+        self._start_time = None
+        self._audio_start_time = None
 
         # File paths (set when recording starts)
         self.session_folder = None
         self.video_file = None
+        self.video_timestamps_file = None
         self.mic_file = None
         self.speaker_file = None
         self.merged_file = None
+        self.session_audio_file = None
+        self.muxed_file = None
+        self.segment_index_file = None
 
         # Threads
         self.video_thread = None
         self.audio_thread = None
 
+        # Stopped sessions still being finalized, and the pool running them
+        self._finalize_executor = None
+        self._finalizing: List[FinalizationJob] = []
+
+    def _profile_supports(self, device_index: int) -> bool:
+        """Whether the device profile records ``device_index`` opening at audio_rate in mono."""
+        profile = self.audio_backend.device_profile
+        if profile is None:
+            return False
+        p = self.audio_backend.create()
+        try:
+            info = p.get_device_info_by_index(device_index)
+            host_api = p.get_host_api_info_by_index(info['hostApi'])['name']
+            supported = profile.supported(
+                device_key(host_api, info['name'], int(info['maxInputChannels']))
+            )
+        except Exception:
+            return False
+        finally:
+            p.terminate()
+        return bool(supported) and self.audio_rate in supported['rates'] and 1 in supported['channels']
+
     def _create_session_folder(self) -> str:
-        """Create a timestamped session folder."""
+        """
+        Create a timestamped session folder.
+
+        A session started within the same second as the previous one (which
+        may still be finalizing its files) gets a ``_2``, ``_3``, ... suffix
+        instead of reusing the folder.
+        """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         if self.session_name:
             folder_name = f"{self.session_name}_{timestamp}"
         else:
             folder_name = f"recording_{timestamp}"
+        os.makedirs(self.output_dir, exist_ok=True)
         session_path = os.path.join(self.output_dir, folder_name)
-        os.makedirs(session_path, exist_ok=True)
-        return session_path
+        suffix = 1
+        while True:
+            try:
+                os.makedirs(session_path)
+                return session_path
+            except FileExistsError:
+                suffix += 1
+                session_path = os.path.join(self.output_dir, f"{folder_name}_{suffix}")
+
+    def _track_path(self, track: str) -> str:
+        """Audio file of ``track`` in the current session folder."""
+        return os.path.join(self.session_folder, f"{track}.{self.audio_format}")
 
     def start(self):
         """
@@ -155,73 +396,166 @@ class RecordMyMeeting:
         # Set file paths
         if self.record_screen:
             self.video_file = os.path.join(self.session_folder, "screen.mp4")
-        if self.record_mic:
-            self.mic_file = os.path.join(self.session_folder, "microphone.wav")
-        if self.record_speaker:
-            self.speaker_file = os.path.join(self.session_folder, "speaker.wav")
-        if self.record_mic and self.record_speaker:
-            self.merged_file = os.path.join(self.session_folder, "merged.wav")
+            if self.skip_static_frames and not self.segment_seconds:
+                self.video_timestamps_file = timestamps_path(self.video_file)
+        if self.record_mic and self.record_speaker and self.audio_layout == 'interleaved':
+            # One 2-channel track replaces the microphone, speaker and merged files
+            self.session_audio_file = os.path.join(self.session_folder, f"session.{self.audio_format}")
+        else:
+            if self.record_mic:
+                self.mic_file = self._track_path('microphone')
+            if self.record_speaker:
+                self.speaker_file = self._track_path('speaker')
+            if self.record_mic and self.record_speaker:
+                self.merged_file = self._track_path('merged')
 
         self.recording = True
-        self.audio_frames = []
-        self.speaker_frames = []
+        self._stop_event = threading.Event()
+        # Video and audio share the audio backend's clock, so both tracks
+        # keep the same timeline when the backend runs faster than real time
+        self._start_time = self.audio_backend.monotonic()
+        self._audio_start_time = self._start_time
+        if self.mux_format:
+            self.muxed_file = os.path.join(self.session_folder, f"recording.{self.mux_format}")
+        self.segment_index = None
+        if self.segment_seconds:
+            self.segment_index_file = os.path.join(self.session_folder, SEGMENT_INDEX_NAME)
+            self.segment_index = SegmentIndex(self.segment_index_file, self.segment_seconds)
+        self.mic_capture = None
+        self.speaker_capture = None
+        self.mic_writer = None
+        self.speaker_writer = None
+        self.merge_writer = None
+        self.video_encoder = None
 
         # Start recording threads
         if self.record_screen:
-            self.video_thread = threading.Thread(target=self._record_screen, daemon=True)
+            self.video_thread = threading.Thread(target=self._record_screen, args=(self._stop_event,), daemon=True)
             self.video_thread.start()
         if self.record_mic or self.record_speaker:
-            self.audio_thread = threading.Thread(target=self._record_audio, daemon=True)
+            self.audio_thread = threading.Thread(target=self._record_audio, args=(self._stop_event,), daemon=True)
             self.audio_thread.start()
 
         logger.info("Recording started")
 
-    def stop(self, save_output: bool = True):
+    def stop(self, save_output: bool = True) -> Optional[FinalizationJob]:
         """
-        Stop recording and save files.
+        Stop recording and finalize the files in the background.
+
+        Capture ends before this returns; flushing the encoders and writers,
+        merging and muxing then run as a graph of tasks on a thread pool, so
+        a new session can be started right away.
+
         Args:
             save_output: If False, recording data will be discarded.
+
+        Returns:
+            FinalizationJob: Handle to wait on the finalization and follow its
+            progress, or None if no recording was in progress
         """
         if not self.recording:
             logger.warning("No recording in progress")
-            return
+            return None
 
         logger.info(f"Stopping recording (save_output={save_output})...")
         self.recording = False
+        self._stop_event.set()
+        end_time = self.audio_backend.monotonic()
 
-        # Wait for threads to finish
+        # The threads only grab and supervise, so they end within a frame interval
         if self.video_thread and self.video_thread.is_alive():
             self.video_thread.join()
         if self.audio_thread and self.audio_thread.is_alive():
             self.audio_thread.join()
 
-        # Save audio files ONLY if save_output is True
-        if save_output:
-            if self.record_mic or self.record_speaker:
-                self._save_audio()
+        session = _Session(self, end_time)
+        job = self._finalize(session, save_output)
 
-            # Merge audio if both sources recorded
-            if self.record_mic and self.record_speaker:
-                # Ensure both lists are populated before attempting merge
-                if self.audio_frames and self.speaker_frames:
-                    self._merge_audio()
-                else:
-                    logger.warning("Cannot merge audio: one or both audio streams were not recorded.")
-            logger.info(f"Recording saved to: {self.session_folder}")
-        else:
-            logger.info("Recording stopped without saving output.")
-
-        # Always clear frames regardless of saving
-        self.audio_frames = []
-        self.speaker_frames = []
+        self.mic_capture = None
+        self.speaker_capture = None
+        self.mic_writer = None
+        self.speaker_writer = None
+        self.merge_writer = None
+        self.video_encoder = None
 
         # Reset file paths (optional, but good practice for next recording)
         self.session_folder = None
         self.video_file = None
+        self.video_timestamps_file = None
         self.mic_file = None
         self.speaker_file = None
         self.merged_file = None
+        self.session_audio_file = None
+        self.muxed_file = None
+        self.segment_index_file = None
+        self.segment_index = None
+        self.video_thread = None
+        self.audio_thread = None
+        return job
 
+    def _finalize(self, session: "_Session", save_output: bool) -> FinalizationJob:
+        """
+        Build and start the finalization graph of a stopped session.
+
+        The video encoder and the audio writers are flushed in parallel; the
+        post-stop merge waits for both audio files, the mux for the video and
+        every audio file, and the segment index is completed last.
+        """
+        if self._finalize_executor is None:
+            self._finalize_executor = ThreadPoolExecutor(max_workers=self.finalize_workers,
+                                                         thread_name_prefix='finalize')
+        job = FinalizationJob(session.folder, self._finalize_executor)
+        video, audio = [], []
+        if session.video_encoder:
+            job.add_task('video', lambda: self._close_video(session))
+            video.append('video')
+        for task, writer, path, label in (('microphone', session.mic_writer, session.mic_file, 'Microphone'),
+                                          ('speaker', session.speaker_writer, session.speaker_file, 'Speaker')):
+            if path:
+                job.add_task(task, lambda writer=writer, path=path, label=label:
+                             self._close_audio(writer, path, label))
+                audio.append(task)
+        if session.merge_writer:
+            task = 'session' if session.session_audio_file else 'merge'
+            job.add_task(task, lambda: self._close_merge(session))
+            audio.append(task)
+
+        if not save_output:
+            job.add_task('discard', lambda: self._discard_audio(session), deps=audio)
+        else:
+            if session.merged_file and not (session.merge_writer or session.segment_index):
+                job.add_task('merge', lambda: self._post_merge(session), deps=audio)
+                audio.append('merge')
+            if session.muxed_file:
+                job.add_task('mux', lambda: self._mux_session(session), deps=video + audio)
+            if session.segment_index:
+                job.add_task('index', lambda: self._finish_index(session), deps=video + audio)
+
+        def finished(job):
+            if save_output:
+                logger.info(f"Recording saved to: {session.folder}")
+            else:
+                logger.info("Recording stopped without saving output.")
+            if job in self._finalizing:
+                self._finalizing.remove(job)
+
+        self._finalizing.append(job)
+        job.add_done_callback(finished)
+        return job.start()
+
+    def wait_finalized(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every stopped session has been finalized.
+
+        Returns:
+            bool: False if some session was still finalizing after ``timeout`` seconds
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for job in list(self._finalizing):
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not job.wait(remaining):
+                return False
+        return True
 
     def get_status(self) -> dict:
         """
@@ -239,342 +573,520 @@ class RecordMyMeeting:
             'mic_file': self.mic_file,
             'speaker_file': self.speaker_file,
             'video_file': self.video_file,
+            'video_timestamps_file': self.video_timestamps_file,
             'merged_file': self.merged_file,
+            'session_audio_file': self.session_audio_file,
+            'muxed_file': self.muxed_file,
+            'segment_index_file': self.segment_index_file,
+            'finalizing': [
+                {'session_folder': job.name, 'progress': job.progress()} for job in list(self._finalizing)
+            ],
+            'audio_stats': {
+                capture.name: capture.stats()
+                for capture in (self.mic_capture, self.speaker_capture) if capture
+            },
+            'video_stats': self.video_encoder.stats() if self.video_encoder else None,
         }
 
-    def _record_screen(self):
+    def _record_screen(self, stop_event: threading.Event):
         """
-        Record screen in a separate thread.
+        Grab screen frames in a separate thread.
+
+        Frames are timestamped and handed to a VideoEncoder through a bounded
+        FrameQueue, so the grab cadence does not depend on encoding speed. The
+        encoder places frames on a constant frame rate timeline starting at
+        start(). Timestamps and pacing follow the audio backend's clock, so
+        the video stays in step with the audio even on a simulated clock. The
+        encoder is closed by the finalization of the session, not by this thread.
         """
         try:
-            with mss.mss() as sct:
-                monitor = sct.monitors[0]
-                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            with self.screen_backend.open() as sct:
+                monitor = self._capture_area(sct)
+                size = fit_size(monitor["width"], monitor["height"], self.video_size)
+                logger.info(f"Capturing {monitor['width']}x{monitor['height']} at "
+                            f"({monitor['left']}, {monitor['top']}), encoding {size[0]}x{size[1]}"
+                            f"{' grayscale' if self.grayscale else ''}")
                 os.makedirs(self.session_folder, exist_ok=True)
-                out = cv2.VideoWriter(self.video_file, fourcc, self.video_fps,
-                                      (monitor["width"], monitor["height"]))
-
-                next_frame_time = time.time()
-                while self.recording:
-                    img = np.array(sct.grab(monitor))
-                    frame = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                    out.write(frame)
-
-                    # Control frame rate
-                    next_frame_time += 1.0 / self.video_fps
-                    sleep_time = next_frame_time - time.time()
+                encoder = self._open_video_encoder(monitor, size)
+                self.video_encoder = encoder
+
+                clock = self.audio_backend.monotonic
+                time_scale = self.audio_backend.time_scale
+                interval = 1.0 / self.video_fps
+                next_frame_time = clock()
+                while not stop_event.is_set():
+                    timestamp = clock()
+                    # Zero-copy view of the grabbed buffer; the encoder converts it once
+                    img = bgra_frame(sct.grab(monitor))
+                    if not encoder.put(timestamp, img):
+                        logger.error("Video encoder stopped, ending screen recording")
+                        break
+
+                    # Control frame rate; after a stall resume the cadence from now
+                    next_frame_time += interval
+                    sleep_time = next_frame_time - clock()
                     if sleep_time > 0:
-                        time.sleep(sleep_time)
+                        time.sleep(sleep_time / time_scale)
+                    elif sleep_time < -interval:
+                        next_frame_time = clock()
 
-                out.release()
                 logger.info("Screen recording completed")
         except Exception as e:
             logger.error(f"Error during screen recording: {e}")
 
-    def _record_audio(self):
-        """Record audio from mic and/or speaker in a separate thread with dynamic device switching."""
-        p = pyaudio.PyAudio()
-        mic_stream = None
-        speaker_stream = None
-        detected_devices = auto_detect_devices()
-        
-        # Track current device indices for switching detection
-        current_mic_index = self.mic_index
-        current_speaker_index = self.speaker_index
-        last_device_check = time.time()
-        device_check_interval = 2.0  # Check for device changes every 2 seconds
+    def _open_video_encoder(self, monitor: dict, size: Tuple[int, int]):
+        """
+        Start the encoder for frames grabbed from ``monitor``.
+
+        Returns a VideoEncoder thread fed through a FrameQueue, or with
+        ``video_workers`` set a ProcessVideoEncoder; both take frames with
+        put(timestamp, frame).
+        """
+        writer_options = {
+            'encoder': self.video_encoder_backend, 'codec': self.video_codec,
+            'crf': self.video_crf, 'preset': self.video_preset, 'threads': self.video_threads,
+        }
+        on_open, on_close = self._video_segment_callbacks()
+        if self.video_workers:
+            return ProcessVideoEncoder(
+                self.video_file, self.video_fps, (monitor["height"], monitor["width"], 4), size,
+                workers=self.video_workers,
+                segment_seconds=self.segment_seconds or self.video_segment_seconds,
+                policy=self.frame_queue_policy, start_time=self._start_time,
+                vfr=self.skip_static_frames, grayscale=self.grayscale, writer_options=writer_options,
+                keep_segments=bool(self.segment_seconds),
+                on_segment_open=on_open, on_segment_close=on_close
+            )
+        queue = FrameQueue(self.frame_queue_size, self.frame_queue_policy)
+        if self.segment_seconds:
+            return SegmentedVideoEncoder(self.video_file, self.video_fps, size, queue, self.segment_seconds,
+                                         start_time=self._start_time, vfr=self.skip_static_frames,
+                                         grayscale=self.grayscale, writer_options=writer_options,
+                                         on_open=on_open, on_close=on_close)
+        writer = open_video_writer(self.video_file, self.video_fps, size, self.grayscale, **writer_options)
+        detector = FrameChangeDetector() if self.skip_static_frames else None
+        return VideoEncoder(self.video_file, self.video_fps, size, queue,
+                            start_time=self._start_time,
+                            change_detector=detector, vfr=self.skip_static_frames,
+                            grayscale=self.grayscale, writer=writer)
+
+    def _video_segment_callbacks(self):
+        """``(on_open, on_close)`` listing video segments in the segment index, or ``(None, None)``."""
+        index = self.segment_index
+        if index is None:
+            return None, None
+        track = os.path.splitext(os.path.basename(self.video_file))[0]
+        start = self._start_time
+        return (lambda i, path, t: index.opened(track, i, path, t - start),
+                lambda i, path, t: index.closed(track, i, t - start))
+
+    def _capture_area(self, sct) -> dict:
+        """The mss monitor dict to grab: the configured region or monitor."""
+        if self.region:
+            left, top, width, height = self.region
+            return {'left': left, 'top': top, 'width': width, 'height': height}
+        if not 0 <= self.monitor < len(sct.monitors):
+            raise ValueError(f"Monitor {self.monitor} not found ({len(sct.monitors) - 1} monitor(s) available)")
+        return sct.monitors[self.monitor]
+
+    def _record_audio(self, stop_event: threading.Event):
+        """
+        Supervise per-device audio capture with dynamic device switching.
+
+        Each source runs in PyAudio callback mode on its own PortAudio thread and
+        feeds its own ring buffer, so a stalled device never starves the other.
+        This thread only watches for device changes and dead streams.
+        """
+        p = self.audio_backend.create()
+
+        # Device changes are detected off this thread; see _on_devices_changed
+        self._pending_devices = None
+        watcher = DeviceWatcher(self._on_devices_changed,
+                                interval=2.0 / self.audio_backend.time_scale,
+                                source=self.audio_backend.snapshot)
+        # Earliest time each dead stream may be reopened again
+        retry_at = {}
 
         try:
             # Open microphone stream if recording mic
             if self.record_mic:
                 try:
-                    device_info = p.get_device_info_by_index(self.mic_index)
-                    max_channels = int(device_info.get('maxInputChannels', self.channels))
-                    actual_channels = min(self.channels, max_channels)
-                    
-                    mic_stream = p.open(
-                        format=self.format,
-                        channels=actual_channels,
-                        rate=self.audio_rate,
-                        input=True,
-                        input_device_index=self.mic_index,
-                        frames_per_buffer=self.frames_per_buffer
+                    self.mic_capture = self._open_capture(
+                        p, 'microphone', self.mic_index, 'mic' if self._auto_mic else None
                     )
-                    logger.info(f"Microphone stream opened (device {self.mic_index}, channels: {actual_channels})")
+                    self.mic_index = self.mic_capture.device_index
+                    if self.mic_file:
+                        self.mic_writer = self._open_audio_writer(self.mic_file, self.mic_capture)
                 except Exception as e:
                     logger.error(f"Failed to open microphone stream: {e}")
+                    self.mic_capture = None
                     self.record_mic = False
 
             # Open speaker stream if recording speaker
             if self.record_speaker:
                 try:
-                    if self.speaker_index is None and 'speaker' in detected_devices and detected_devices['speaker']:
-                        self.speaker_index = detected_devices['speaker']['index']
-                        logger.info(f"Using detected speaker device: {detected_devices['speaker']['name']}")
-                    
-                    if self.speaker_index is not None:
-                        device_info = p.get_device_info_by_index(self.speaker_index)
-                        max_channels = int(device_info.get('maxInputChannels', 0))
-                        
-                        # Validate that device supports input recording
-                        if max_channels == 0:
-                            raise Exception(f"Invalid audio channels: Device {self.speaker_index} does not support input recording (maxInputChannels=0). On Windows, try 'Stereo Mix' device.")
-                        
-                        actual_channels = min(self.channels, max_channels)
-
-                        # Open speaker stream (removed as_loopback parameter - not supported by PyAudio)
-                        speaker_stream = p.open(
-                            format=self.format,
-                            channels=actual_channels,
-                            rate=self.audio_rate,
-                            input=True,
-                            input_device_index=self.speaker_index,
-                            frames_per_buffer=self.frames_per_buffer
-                        )
-                        
-                        logger.info(f"Speaker stream opened (device {self.speaker_index}, channels: {actual_channels})")
-                    else:
+                    if self.speaker_index is None:
+                        detected_devices = self.audio_backend.detect_devices()
+                        if detected_devices.get('speaker'):
+                            self.speaker_index = detected_devices['speaker']['index']
+                            logger.info(f"Using detected speaker device: {detected_devices['speaker']['name']}")
+
+                    if self.speaker_index is None:
                         raise Exception("No valid speaker device found")
-                        
+
+                    # Open speaker stream (removed as_loopback parameter - not supported by PyAudio)
+                    self.speaker_capture = self._open_capture(
+                        p, 'speaker', self.speaker_index, 'speaker' if self._auto_speaker else None
+                    )
+                    self.speaker_index = self.speaker_capture.device_index
+                    if self.speaker_file:
+                        self.speaker_writer = self._open_audio_writer(self.speaker_file, self.speaker_capture)
                 except Exception as e:
                     logger.error(f"Failed to open speaker stream: {e}")
+                    self.speaker_capture = None
                     self.record_speaker = False
 
-            # Enhanced recording loop with device monitoring
-            while self.recording:
-                # Check for device changes periodically
-                current_time = time.time()
-                if current_time - last_device_check >= device_check_interval:
-                    last_device_check = current_time
-                    try:
-                        new_devices = auto_detect_devices()
-                        
-                        # Check if microphone changed
-                        if self.record_mic and mic_stream and new_devices.get('mic'):
-                            new_mic_index = new_devices['mic'].get('index')
-                            if new_mic_index is not None and new_mic_index != current_mic_index:
-                                logger.info(f"Microphone device changed from {current_mic_index} to {new_mic_index}. Switching...")
-                                try:
-                                    # Close old stream
-                                    mic_stream.stop_stream()
-                                    mic_stream.close()
-                                    
-                                    # Open new stream
-                                    device_info = p.get_device_info_by_index(new_mic_index)
-                                    max_channels = int(device_info.get('maxInputChannels', self.channels))
-                                    actual_channels = min(self.channels, max_channels)
-                                    
-                                    mic_stream = p.open(
-                                        format=self.format,
-                                        channels=actual_channels,
-                                        rate=self.audio_rate,
-                                        input=True,
-                                        input_device_index=new_mic_index,
-                                        frames_per_buffer=self.frames_per_buffer
-                                    )
-                                    current_mic_index = new_mic_index
-                                    self.mic_index = new_mic_index
-                                    logger.info(f"Successfully switched to new microphone device {new_mic_index}")
-                                except Exception as e:
-                                    logger.error(f"Failed to switch microphone device: {e}")
-                        
-                        # Check if speaker changed
-                        if self.record_speaker and speaker_stream and new_devices.get('speaker'):
-                            new_speaker_index = new_devices['speaker'].get('index')
-                            if new_speaker_index is not None and new_speaker_index != current_speaker_index:
-                                logger.info(f"Speaker device changed from {current_speaker_index} to {new_speaker_index}. Switching...")
-                                try:
-                                    # Close old stream
-                                    speaker_stream.stop_stream()
-                                    speaker_stream.close()
-                                    
-                                    # Open new stream
-                                    device_info = p.get_device_info_by_index(new_speaker_index)
-                                    max_channels = int(device_info.get('maxInputChannels', self.channels))
-                                    actual_channels = min(self.channels, max_channels)
-                                    
-                                    speaker_stream = p.open(
-                                        format=self.format,
-                                        channels=actual_channels,
-                                        rate=self.audio_rate,
-                                        input=True,
-                                        input_device_index=new_speaker_index,
-                                        frames_per_buffer=self.frames_per_buffer
-                                    )
-                                    current_speaker_index = new_speaker_index
-                                    self.speaker_index = new_speaker_index
-                                    logger.info(f"Successfully switched to new speaker device {new_speaker_index}")
-                                except Exception as e:
-                                    logger.error(f"Failed to switch speaker device: {e}")
-                        
-                    except Exception as e:
-                        logger.debug(f"Error checking for device changes: {e}")
-                
-                # Record from microphone with error recovery
-                if self.record_mic and mic_stream:
-                    try:
-                        mic_data = mic_stream.read(self.frames_per_buffer, exception_on_overflow=False)
-                        self.audio_frames.append(mic_data)
-                    except Exception as e:
-                        logger.warning(f"Mic read error: {e}")
-                        # Try to recover by reopening stream
-                        try:
-                            mic_stream.stop_stream()
-                            mic_stream.close()
-                            device_info = p.get_device_info_by_index(current_mic_index)
-                            max_channels = int(device_info.get('maxInputChannels', self.channels))
-                            actual_channels = min(self.channels, max_channels)
-                            mic_stream = p.open(
-                                format=self.format,
-                                channels=actual_channels,
-                                rate=self.audio_rate,
-                                input=True,
-                                input_device_index=current_mic_index,
-                                frames_per_buffer=self.frames_per_buffer
-                            )
-                            logger.info("Microphone stream recovered")
-                        except Exception as recovery_error:
-                            logger.error(f"Failed to recover microphone stream: {recovery_error}")
-                            break
+            # Mix merged.wav on the fly when both sources are live
+            if self.live_merge and self.mic_capture and self.speaker_capture and self.merged_file:
+                self.merge_writer = LiveMixer(
+                    self.merged_file, self.mic_capture.ring, self.speaker_capture.ring,
+                    pyaudio.get_sample_size(self.format), self.audio_rate,
+                    wav=self._audio_file(self.merged_file, self.mic_capture.ring),
+                    stall_timeout=LIVE_STALL_TIMEOUT
+                )
+            if self.session_audio_file:
+                self._open_session_audio()
 
-                # Record from speaker with error recovery
-                if self.record_speaker and speaker_stream:
-                    try:
-                        speaker_data = speaker_stream.read(self.frames_per_buffer, exception_on_overflow=False)
-                        self.speaker_frames.append(speaker_data)
-                    except Exception as e:
-                        logger.warning(f"Speaker read error: {e}")
-                        # Try to recover by reopening stream
+            watcher.start()
+
+            # Supervision loop: capture itself happens in the stream callbacks
+            while not stop_event.is_set():
+                # Apply device changes reported by the watcher
+                snapshot = self._pending_devices
+                if snapshot is not None:
+                    self._pending_devices = None
+                    self._apply_device_change(snapshot)
+
+                # Recover streams that stopped delivering audio
+                for capture in (self.mic_capture, self.speaker_capture):
+                    if capture and not stop_event.is_set() and not capture.is_active():
+                        if time.monotonic() < retry_at.get(capture.name, 0.0):
+                            continue
+                        logger.warning(f"{capture.name.capitalize()} stream stopped, reopening...")
                         try:
-                            speaker_stream.stop_stream()
-                            speaker_stream.close()
-                            device_info = p.get_device_info_by_index(current_speaker_index)
-                            max_channels = int(device_info.get('maxInputChannels', self.channels))
-                            actual_channels = min(self.channels, max_channels)
-                            speaker_stream = p.open(
-                                format=self.format,
-                                channels=actual_channels,
-                                rate=self.audio_rate,
-                                input=True,
-                                input_device_index=current_speaker_index,
-                                frames_per_buffer=self.frames_per_buffer
-                            )
-                            logger.info("Speaker stream recovered")
+                            capture.reopen()
+                            logger.info(f"{capture.name.capitalize()} stream recovered")
                         except Exception as recovery_error:
-                            logger.error(f"Failed to recover speaker stream: {recovery_error}")
-                            break
+                            logger.error(f"Failed to recover {capture.name} stream: {recovery_error}")
+                            # Wait for the device to come back or a device change
+                            retry_at[capture.name] = time.monotonic() + 1.0
 
-                time.sleep(0.001)
+                time.sleep(0.1)
 
             logger.info("Audio recording completed")
 
         except Exception as e:
             logger.error(f"Error during audio recording: {e}")
         finally:
+            watcher.stop()
             # Clean up streams
-            if mic_stream:
-                try:
-                    mic_stream.stop_stream()
-                    mic_stream.close()
-                except:
-                    pass
-            if speaker_stream:
-                try:
-                    speaker_stream.stop_stream()
-                    speaker_stream.close()
-                except:
-                    pass
+            for capture in (self.mic_capture, self.speaker_capture):
+                if capture:
+                    capture.close()
             p.terminate()
 
-    def _save_audio(self):
+    def _open_capture(self, p, name: str, device_index: int,
+                      redetect_role: Optional[str] = None) -> AudioCaptureStream:
         """
-        Save recorded audio to WAV files.
-        BUG FIX #1: Split condition check to ensure files are created even with empty frames.
+        Open a capture stream on ``device_index``.
+        If it fails and the device was auto-detected (``redetect_role`` is 'mic'
+        or 'speaker'), the cached device profile is treated as stale: devices are
+        probed again and the open is retried once on the newly detected device.
         """
-        p = pyaudio.PyAudio()
-        
-        # Save microphone audio - FIXED: Split condition check
-        if self.record_mic and self.mic_file:
-            if self.audio_frames:
-                try:
-                    wf = wave.open(self.mic_file, 'wb')
-                    wf.setnchannels(self.channels)
-                    wf.setsampwidth(p.get_sample_size(self.format))
-                    wf.setframerate(self.audio_rate)
-                    wf.writeframes(b''.join(self.audio_frames))
-                    wf.close()
-                    logger.info(f"Microphone audio saved: {self.mic_file}")
-                except Exception as e:
-                    logger.error(f"Error saving microphone audio: {e}")
-            else:
-                logger.warning("Microphone was set to record, but no audio frames were captured.")
+        capture = self._create_capture(p, name, device_index)
+        try:
+            capture.open()
+            return capture
+        except Exception as e:
+            if redetect_role is None:
+                raise
+            logger.warning(f"Failed to open {name} device {device_index} ({e}), re-detecting devices...")
 
-        # Save speaker audio - CRITICAL FIX: Split condition check!
-        if self.record_speaker and self.speaker_file:
-            if self.speaker_frames:
-                try:
-                    wf = wave.open(self.speaker_file, 'wb')
-                    wf.setnchannels(self.channels)
-                    wf.setsampwidth(p.get_sample_size(self.format))
-                    wf.setframerate(self.audio_rate)
-                    wf.writeframes(b''.join(self.speaker_frames))
-                    wf.close()
-                    logger.info(f"Speaker audio saved: {self.speaker_file}")
-                except Exception as e:
-                    logger.error(f"Error saving speaker audio: {e}")
-            else:
-                logger.warning("Speaker was set to record, but no audio frames were captured.")
-        
-        p.terminate()
+        profile = self.audio_backend.device_profile
+        if profile is not None:
+            profile.invalidate()
+        detected = self.audio_backend.detect_devices(refresh=True).get(redetect_role)
+        if not detected or detected['index'] == device_index:
+            raise Exception(f"No working {name} device found")
+        logger.info(f"Using re-detected {name} device: {detected['name']} (Index: {detected['index']})")
+        capture = self._create_capture(p, name, detected['index'])
+        capture.open()
+        return capture
+
+    def _create_capture(self, p, name: str, device_index: int) -> AudioCaptureStream:
+        """Build an unopened capture stream clocked and profiled by the audio backend."""
+        return AudioCaptureStream(
+            p, name, device_index, self.channels, self.audio_rate,
+            format=self.format, frames_per_buffer=self.frames_per_buffer,
+            clock=self.audio_backend.monotonic, profile=self.audio_backend.device_profile
+        )
+
+    def _on_devices_changed(self, snapshot: dict):
+        """DeviceWatcher callback: hand the new device snapshot to the audio thread."""
+        self.audio_backend.invalidate_devices()
+        self._pending_devices = snapshot
+
+    def _apply_device_change(self, snapshot: dict):
+        """
+        Follow the system default devices after a device change.
+        Candidates are chosen from the enumeration snapshot alone; no probe
+        streams are opened while recording. A device that fails to open is
+        rejected by _switch_capture_device, which keeps the old one.
+        """
+        devices = {d['index']: d for d in snapshot['devices']}
 
+        def usable(index):
+            return index is not None and devices.get(index, {}).get('input_channels', 0) > 0
 
-    def _merge_audio(self):
+        if self.mic_capture and usable(snapshot['default_input']):
+            self._switch_capture_device(self.mic_capture, snapshot['default_input'])
+            self.mic_index = self.mic_capture.device_index
+        if self.speaker_capture and usable(snapshot['default_output']):
+            self._switch_capture_device(self.speaker_capture, snapshot['default_output'])
+            self.speaker_index = self.speaker_capture.device_index
+
+    def _switch_capture_device(self, capture: AudioCaptureStream, new_index: Optional[int]):
+        """Move a capture stream to ``new_index`` if the preferred device changed."""
+        if new_index is None or new_index == capture.device_index:
+            return
+        old_index = capture.device_index
+        logger.info(f"{capture.name.capitalize()} device changed from {old_index} to {new_index}. Switching...")
+        try:
+            capture.reopen(new_index)
+            logger.info(f"Successfully switched to new {capture.name} device {new_index}")
+        except Exception as e:
+            logger.error(f"Failed to switch {capture.name} device: {e}")
+            try:
+                capture.reopen(old_index)
+            except Exception as recovery_error:
+                logger.error(f"Failed to reopen {capture.name} device {old_index}: {recovery_error}")
+
+    def _open_session_audio(self):
+        """
+        Start writing the interleaved session track (microphone left, speaker right).
+
+        The speaker is resampled onto the microphone's clock as it arrives,
+        like the live merge, so both channels stay sample-aligned. While the
+        speaker is not delivering (unplugged, stalled) its channel is silent.
+        If only one source opened, it is recorded to its own file instead.
+        """
+        if self.mic_capture and self.speaker_capture:
+            self.merge_writer = LiveMixer(
+                self.session_audio_file, self.mic_capture.ring, self.speaker_capture.ring,
+                pyaudio.get_sample_size(self.format), self.audio_rate,
+                wav=self._audio_file(self.session_audio_file, self.mic_capture.ring, channels=2),
+                mixer=BlockInterleaver(4096),
+                # The session track is the only copy of the microphone: never
+                # let a dead speaker stream hold it back
+                stall_timeout=LIVE_STALL_TIMEOUT
+            )
+            return
+        logger.warning("Only one audio source opened, recording it to its own file instead of a session track")
+        self.session_audio_file = None
+        if self.mic_capture:
+            self.mic_file = self._track_path('microphone')
+            self.mic_writer = self._open_audio_writer(self.mic_file, self.mic_capture)
+        if self.speaker_capture:
+            self.speaker_file = self._track_path('speaker')
+            self.speaker_writer = self._open_audio_writer(self.speaker_file, self.speaker_capture)
+
+    def _open_audio_writer(self, path: str, capture: AudioCaptureStream) -> StreamingAudioWriter:
+        """Open a streaming audio writer that drains ``capture``'s ring buffer."""
+        return StreamingAudioWriter(path, pyaudio.get_sample_size(self.format),
+                                    self.audio_rate, source=capture.ring,
+                                    wav=self._audio_file(path, capture.ring))
+
+    def _audio_file(self, path: str, ring, channels: Optional[int] = None):
+        """
+        Writer for the audio file ``path`` taking frames of ``ring``
+        (with ``channels`` channels, the ring's own count if None).
+
+        In segment mode this is a rolling SegmentedWavWriter whose segment
+        start and end times in the index come from ``ring``'s capture clock,
+        the timeline the file's frames were taken from.
+        """
+        sample_width = pyaudio.get_sample_size(self.format)
+        channels = channels or ring.channels
+        index = self.segment_index
+        if index is None:
+            return open_audio_file(path, channels, sample_width, self.audio_rate, self.audio_bitrate)
+        track = os.path.splitext(os.path.basename(path))[0]
+        start = self._audio_start_time
+        return SegmentedWavWriter(
+            path, channels, sample_width, self.audio_rate,
+            int(round(self.segment_seconds * self.audio_rate)),
+            on_open=lambda i, segment, frame: index.opened(track, i, segment, self._audio_time(ring, frame, start)),
+            on_close=lambda i, segment, frame: index.closed(track, i, self._audio_time(ring, frame, start)),
+            bitrate=self.audio_bitrate,
+        )
+
+    def _audio_time(self, ring, frame: int, start: float) -> float:
+        """Seconds from ``start`` (video frame 0 on the audio clock) to the capture of ``frame`` in ``ring``."""
+        timestamp = ring.time_of(frame)
+        if timestamp is None:
+            timestamp = (ring.first_timestamp or start) + frame / self.audio_rate
+        return timestamp - start
+
+    def _close_video(self, session: "_Session"):
+        """Drain and close the video encoder of a stopped session."""
+        encoder = session.video_encoder
+        encoder.close(end_time=session.end_time)
+        stats = encoder.stats()
+        if stats['queue_dropped'] or stats['queue_blocked']:
+            logger.warning(f"Video encoder fell behind: {stats['queue_dropped']} frame(s) dropped, "
+                           f"{stats['queue_blocked']} grab(s) blocked")
+        if stats['frames_duplicated'] or stats['frames_dropped']:
+            logger.info(f"Video timing: {stats['frames_duplicated']} frame(s) duplicated, "
+                        f"{stats['frames_dropped']} dropped")
+        if stats['frames_unchanged']:
+            logger.info(f"Skipped {stats['frames_unchanged']} unchanged screen frame(s)")
+        logger.info(f"Screen recording saved: {session.video_file}")
+        return session.video_file
+
+    def _close_audio(self, writer: Optional[StreamingAudioWriter], path: str, label: str) -> Optional[str]:
+        """
+        Finalize a streamed WAV file.
+        Audio is written to disk while recording, so this only drains the writer
+        queue and patches the header - it takes the same time for any session length.
+        """
+        if writer:
+            writer.close()
+        if writer and writer.frames_written:
+            logger.info(f"{label} audio saved: {path}")
+            return path
+        logger.warning(f"{label} was set to record, but no audio frames were captured.")
+        return None
+
+    def _close_merge(self, session: "_Session") -> Optional[str]:
+        """Finish the live mix (or the interleaved session track) of a stopped session."""
+        writer = session.merge_writer
+        writer.close()
+        if writer.frames_written:
+            label = 'Session' if writer.path == session.session_audio_file else 'Merged'
+            logger.info(f"{label} audio saved: {writer.path}")
+            return writer.path
+        logger.warning("Cannot merge audio: one or both audio streams were not recorded.")
+        return None
+
+    def _post_merge(self, session: "_Session") -> Optional[str]:
+        """Mix merged.wav from the finished microphone and speaker files."""
+        mic_frames = session.mic_writer.frames_written if session.mic_writer else 0
+        speaker_frames = session.speaker_writer.frames_written if session.speaker_writer else 0
+        if not (mic_frames and speaker_frames):
+            logger.warning("Cannot merge audio: one or both audio streams were not recorded.")
+            return None
+        return self._merge_audio(session)
+
+    def _finish_index(self, session: "_Session") -> str:
+        """Mark the segment index of a stopped session complete."""
+        session.segment_index.finish()
+        logger.info(f"Segment index saved: {session.segment_index_file}")
+        return session.segment_index_file
+
+    def _discard_audio(self, session: "_Session"):
+        """Remove streamed audio files when the recording is not being kept."""
+        for writer in (session.mic_writer, session.speaker_writer, session.merge_writer):
+            if not writer:
+                continue
+            for path in writer.paths:
+                if os.path.exists(path):
+                    try:
+                        os.remove(path)
+                    except OSError as e:
+                        logger.warning(f"Could not remove {path}: {e}")
+
+    def _track_offset(self, session: "_Session", capture) -> float:
+        """Seconds from video frame 0 to the first sample captured by ``capture``."""
+        if capture is None or capture.ring is None or capture.ring.first_timestamp is None:
+            return 0.0
+        return capture.ring.first_timestamp - session.audio_start_time
+
+    def _mux_session(self, session: "_Session") -> Optional[str]:
+        """Mux the video with the session's audio into ``recording.<mux_format>``."""
+        if not (session.video_file and os.path.exists(session.video_file)):
+            logger.warning("Cannot mux session: no video was recorded.")
+            return None
+        mic_offset = self._track_offset(session, session.mic_capture)
+        tracks = []
+        # merged.wav and the session track start at the microphone's first frame
+        if session.merged_file and os.path.exists(session.merged_file):
+            tracks.append(AudioTrack(session.merged_file, mic_offset, 'Merged'))
+        if session.session_audio_file and os.path.exists(session.session_audio_file):
+            tracks.append(AudioTrack(session.session_audio_file, mic_offset, 'Microphone + Speaker'))
+        if not tracks or self.mux_all_tracks:
+            for path, capture, title in ((session.mic_file, session.mic_capture, 'Microphone'),
+                                         (session.speaker_file, session.speaker_capture, 'Speaker')):
+                if path and os.path.exists(path):
+                    tracks.append(AudioTrack(path, self._track_offset(session, capture), title))
+        output = session.muxed_file
+        timestamps = session.video_timestamps_file
+        if timestamps and not os.path.exists(timestamps):
+            timestamps = None
+        if not mux_session(output, session.video_file, tracks, timestamps, fps=self.video_fps):
+            return None
+        logger.info(f"Muxed recording saved: {output}")
+        return output
+
+    def _merge_audio(self, session: "_Session") -> Optional[str]:
         """
         Merge microphone and speaker audio into a single file.
-        BUG FIX #2: Use wave.open() instead of audioread to avoid AttributeError.
+        Both files are streamed through the mixer block by block, so peak memory
+        stays at a few MB for any session length.
         """
-        if not (self.mic_file and self.speaker_file and self.merged_file):
+        if not (session.mic_file and session.speaker_file and session.merged_file):
             logger.warning("Cannot merge audio: one or more required file paths are missing.")
-            return
+            return None
 
         try:
-            # Read both audio files using wave module directly (FIXED)
-            with wave.open(self.mic_file, 'rb') as wf_mic:
-                mic_params = wf_mic.getparams()
-                mic_nframes = wf_mic.getnframes()  # Direct access (no AttributeError)
-                mic_audio_data = wf_mic.readframes(mic_nframes)
-
-            with wave.open(self.speaker_file, 'rb') as wf_speaker:
-                speaker_params = wf_speaker.getparams()
-                speaker_nframes = wf_speaker.getnframes()
-                speaker_audio_data = wf_speaker.readframes(speaker_nframes)
-
-            # Use the minimum length to avoid errors
-            min_frames = min(mic_nframes, speaker_nframes)
-            
-            # Convert to numpy arrays for mixing
-            mic_np = np.frombuffer(mic_audio_data, dtype=np.int16)
-            speaker_np = np.frombuffer(speaker_audio_data, dtype=np.int16)
-            
-            # Truncate to same length
-            min_samples = min(len(mic_np), len(speaker_np))
-            mic_np = mic_np[:min_samples]
-            speaker_np = speaker_np[:min_samples]
-
-            # Mix (simple average to avoid clipping)
-            merged_np = (mic_np.astype(np.int32) + speaker_np.astype(np.int32)) // 2
-            merged_audio_data = merged_np.astype(np.int16).tobytes()
-
-            # Write merged audio to file
-            with wave.open(self.merged_file, 'wb') as wf_merged:
-                wf_merged.setnchannels(mic_params.nchannels)
-                wf_merged.setsampwidth(mic_params.sampwidth)
-                wf_merged.setframerate(mic_params.framerate)
-                wf_merged.writeframes(merged_audio_data)
-
-            logger.info(f"Merged audio saved: {self.merged_file}")
+            # Compensate start offset and clock drift measured during capture,
+            # separately for each clock segment (device switches start a new one)
+            alignment = None
+            if session.mic_capture and session.speaker_capture:
+                alignment = speaker_alignment_segments(session.mic_capture.ring, session.speaker_capture.ring)
+            mix_wav_files(session.mic_file, session.speaker_file, session.merged_file, alignment=alignment)
+            logger.info(f"Merged audio saved: {session.merged_file}")
+            return session.merged_file
 
         except Exception as e:
             logger.error(f"Error merging audio: {e}")
             import traceback
             logger.error(traceback.format_exc())
+            return None
+
+
+class _Session:
+    """
+    Files and capture state of a stopped recording.
+
+    stop() takes this snapshot before resetting the recorder, so the
+    background finalization never sees the next session's state.
+    """
+    def __init__(self, recorder: RecordMyMeeting, end_time: float):
+        self.folder = recorder.session_folder
+        self.end_time = end_time
+        self.audio_start_time = recorder._audio_start_time
+        self.video_file = recorder.video_file
+        self.video_timestamps_file = recorder.video_timestamps_file
+        self.mic_file = recorder.mic_file if recorder.record_mic else None
+        self.speaker_file = recorder.speaker_file if recorder.record_speaker else None
+        self.merged_file = recorder.merged_file if recorder.record_mic and recorder.record_speaker else None
+        self.session_audio_file = recorder.session_audio_file
+        self.muxed_file = recorder.muxed_file
+        self.segment_index = recorder.segment_index
+        self.segment_index_file = recorder.segment_index_file
+        self.video_encoder = recorder.video_encoder
+        self.mic_capture = recorder.mic_capture
+        self.speaker_capture = recorder.speaker_capture
+        self.mic_writer = recorder.mic_writer
+        self.speaker_writer = recorder.speaker_writer
+        self.merge_writer = recorder.merge_writer
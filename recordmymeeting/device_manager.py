@@ -1,10 +1,28 @@
 import pyaudio
+import copy
 import logging
+import queue
 import re
-from typing import Dict, List, Optional
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from .device_profile import get_device_profile
 
 logger = logging.getLogger(__name__)
 
+# Seconds a single device probe may take before it counts as failed
+PROBE_TIMEOUT = 2.0
+# Maximum number of devices probed at the same time
+PROBE_WORKERS = 8
+
+# How often probe_devices() checks whether a hung probe holds the PortAudio lock
+PROBE_POLL_INTERVAL = 0.1
+
+# PortAudio's stream open/close is not thread-safe; concurrent probes take
+# turns for those calls and only wait for audio in parallel
+_PORTAUDIO_LOCK = threading.Lock()
+
 
 def classify_device(device_name: str) -> Dict[str, bool]:
     """
@@ -110,6 +128,53 @@ def list_audio_devices() -> Dict[str, List[Dict]]:
     }
 
 
+def get_device_snapshot() -> Dict:
+    """
+    Enumerate devices and defaults cheaply, without opening any stream.
+
+    Returns:
+        Dict: 'fingerprint' (hashable tuple of index, name, host API and
+        channel counts plus the default devices), 'devices' (list of device
+        dicts as in list_audio_devices) and 'default_input' /
+        'default_output' indices (None if unavailable)
+    """
+    p = pyaudio.PyAudio()
+    devices = []
+    default_input = None
+    default_output = None
+    try:
+        for i in range(p.get_device_count()):
+            info = p.get_device_info_by_index(i)
+            devices.append({
+                'index': i,
+                'name': info['name'],
+                'host_api': p.get_host_api_info_by_index(info['hostApi'])['name'],
+                'input_channels': int(info['maxInputChannels']),
+                'output_channels': int(info['maxOutputChannels']),
+            })
+        try:
+            default_input = int(p.get_default_input_device_info()['index'])
+        except Exception:
+            pass
+        try:
+            default_output = int(p.get_default_output_device_info()['index'])
+        except Exception:
+            pass
+    finally:
+        p.terminate()
+
+    fingerprint = tuple(
+        (d['index'], d['name'], d['host_api'], d['input_channels'], d['output_channels'])
+        for d in devices
+    ) + (('defaults', default_input, default_output),)
+    return {
+        'fingerprint': fingerprint,
+        'devices': devices,
+        'default_input': default_input,
+        'default_output': default_output,
+    }
+
+
 def get_default_devices() -> Dict[str, Optional[int]]:
     """
     Get system default audio devices.
@@ -178,174 +243,344 @@ def test_device(device_index: int, duration: float = 0.5) -> bool:
         p.terminate()
 
 
+def _probe_input(p: pyaudio.PyAudio, device_index: int,
+                 report: Optional[Callable[[str], None]] = None) -> bool:
+    """
+    Open a short input test stream on ``device_index`` and read one buffer.
+
+    Opening and closing hold _PORTAUDIO_LOCK; the read, where a slow device
+    spends most of its time, runs without it. ``report`` is called with the
+    phase the probe enters: 'open' and 'close' once it holds the lock,
+    'read' in between, 'closing' while it waits for the lock again and
+    'done' at the end.
+    """
+    report = report or (lambda phase: None)
+    try:
+        with _PORTAUDIO_LOCK:
+            report('open')
+            test_stream = p.open(
+                format=pyaudio.paInt16,
+                channels=1,
+                rate=44100,
+                input=True,
+                input_device_index=device_index,
+                frames_per_buffer=1024
+            )
+        report('read')
+        try:
+            test_stream.read(1024, exception_on_overflow=False)
+        finally:
+            report('closing')
+            with _PORTAUDIO_LOCK:
+                report('close')
+                test_stream.stop_stream()
+                test_stream.close()
+        return True
+    except Exception as e:
+        logger.debug(f"Device {device_index} probe failed: {e}")
+        return False
+    finally:
+        report('done')
+
+
+def probe_devices(p: pyaudio.PyAudio,
+                  device_indices: List[int],
+                  timeout: float = PROBE_TIMEOUT,
+                  max_workers: int = PROBE_WORKERS) -> Dict[int, Optional[bool]]:
+    """
+    Probe several input devices concurrently.
+
+    Up to ``max_workers`` probes run at once. PortAudio cannot open streams
+    from several threads, so the opens and closes take turns, but the reads,
+    where a Bluetooth or USB device keeps a probe waiting, overlap. A probe
+    gets ``timeout`` seconds from the moment it holds the PortAudio lock to
+    open and read, and again to close; time spent queued for the lock does
+    not count, so devices waiting behind slow opens are not cut short. A
+    probe that takes longer counts as failed and frees its slot for the next
+    device. If it hangs while holding the lock, no other device can be probed
+    and the remaining ones count as timed out as well.
+
+    Args:
+        p: Shared PyAudio instance
+        device_indices: Devices to probe (duplicates are probed once)
+        timeout: Seconds each probe may take once it holds the lock
+        max_workers: Maximum concurrent probes
+
+    Returns:
+        Dict: Device index -> whether a test stream could be opened and read,
+        or None if the probe timed out
+    """
+    waiting = list(dict.fromkeys(device_indices))
+    finished = queue.Queue()
+    # Written by the probe threads: when each last got the lock (absent while
+    # it waits for it), and its current phase
+    started = {}
+    phases = {}
+    running = set()
+    abandoned = set()
+    results = {}
+
+    def run(index):
+        def report(phase):
+            if phase in ('open', 'close'):
+                started[index] = time.monotonic()
+            elif phase == 'closing':
+                started.pop(index, None)
+            phases[index] = phase
+        finished.put((index, _probe_input(p, index, report)))
+
+    while waiting or running:
+        while waiting and len(running) < max(1, max_workers):
+            index = waiting.pop(0)
+            running.add(index)
+            # Hung probes are abandoned, so they must not keep the process alive
+            threading.Thread(target=run, args=(index,), daemon=True,
+                             name=f"device-probe-{index}").start()
+
+        now = time.monotonic()
+        clocks = [started.get(index) for index in running]
+        waits = [clock + timeout - now for clock in clocks if clock is not None]
+        if len(waits) < len(running) or abandoned:
+            # Probes queued for the lock only start their clock once they get it
+            waits.append(PROBE_POLL_INTERVAL)
+        try:
+            index, ok = finished.get(timeout=max(0.0, min(waits)))
+        except queue.Empty:
+            pass
+        else:
+            # Results of probes that already timed out are ignored
+            if index in running:
+                running.discard(index)
+                results[index] = ok
+            abandoned.discard(index)
+
+        now = time.monotonic()
+        for index in [i for i in running if started.get(i, now) + timeout <= now]:
+            logger.warning(f"Device {index} probe timed out after {timeout}s")
+            results[index] = None
+            running.discard(index)
+            abandoned.add(index)
+        if any(phases.get(index) in ('open', 'close') for index in abandoned):
+            # A hung probe holds the PortAudio lock; nothing queued behind it can run
+            for index in [i for i in running if started.get(i) is None] + waiting:
+                logger.warning(f"Device {index} not probed: PortAudio is blocked by a hung probe")
+                results[index] = None
+                running.discard(index)
+            waiting = []
+    return results
+
+
 def auto_detect_devices() -> Dict[str, Optional[Dict]]:
     """
     Automatically detect working audio devices with smart prioritization.
     Handles headphones, built-in devices, and external audio interfaces.
 
+    Candidate devices are probed concurrently (see probe_devices); among the
+    ones that work, the highest get_device_priority() wins.
+
     Returns:
         Dict: Dictionary with 'mic' and 'speaker' device information
     """
     p = pyaudio.PyAudio()
     devices = {}
-    
+    probes_hung = False
+
     try:
         # First try to find default devices
         try:
-            default_input = p.get_default_input_device_info()
+            try:
+                default_input = p.get_default_input_device_info()
+            except Exception as e:
+                logger.warning(f"Could not get default input device: {e}")
+                default_input = None
             default_output = p.get_default_host_api_info().get('defaultOutputDevice')
-            
+            if default_output is not None and default_output < 0:
+                default_output = None
+
+            # Test default input and output (for loopback) devices together
+            default_indices = [int(default_input['index'])] if default_input else []
+            if default_output is not None:
+                default_indices.append(default_output)
+            results = probe_devices(p, default_indices)
+            probes_hung = probes_hung or None in results.values()
+
             if default_input:
-                # Test default input device
-                try:
-                    test_stream = p.open(
-                        format=pyaudio.paInt16,
-                        channels=1,
-                        rate=44100,
-                        input=True,
-                        input_device_index=int(default_input['index']),
-                        frames_per_buffer=1024
-                    )
-                    test_stream.stop_stream()
-                    test_stream.close()
-                    
+                if results.get(int(default_input['index'])):
                     devices['mic'] = {
                         'index': int(default_input['index']),
                         'name': default_input['name'],
                         'channels': int(default_input.get('maxInputChannels', 1))
                     }
                     logger.info(f"Default microphone detected: {default_input['name']}")
-                except Exception as e:
-                    logger.warning(f"Default microphone test failed: {e}")
-            
-            if default_output and default_output >= 0:
+                else:
+                    logger.warning("Default microphone test failed")
+
+            if default_output is not None:
                 output_info = p.get_device_info_by_index(default_output)
-                # Test output device for input capability (loopback)
-                try:
-                    test_stream = p.open(
-                        format=pyaudio.paInt16,
-                        channels=1,
-                        rate=44100,
-                        input=True,
-                        input_device_index=default_output,
-                        frames_per_buffer=1024
-                    )
-                    test_stream.stop_stream()
-                    test_stream.close()
-                    
+                if results.get(default_output):
                     devices['speaker'] = {
                         'index': default_output,
                         'name': output_info['name'],
                         'channels': int(output_info.get('maxInputChannels', 1))
                     }
                     logger.info(f"Default speaker detected: {output_info['name']}")
-                except Exception as e:
-                    logger.warning(f"Default speaker test failed: {e}")
-                    
+                else:
+                    logger.warning("Default speaker test failed")
+
         except Exception as e:
             logger.warning(f"Error getting default devices: {e}")
-            
+
         # If default devices not found or failed, scan all devices
         if not devices.get('mic') or not devices.get('speaker'):
             all_devices = list_audio_devices()
-            
+
+            mic_candidates = []
+            if not devices.get('mic'):
+                mic_candidates = sorted(all_devices.get('microphones', []),
+                                        key=get_device_priority,
+                                        reverse=True)
+
+            # For Windows, look for WASAPI loopback devices; elsewhere (or as
+            # fallback) for devices named like outputs/speakers
+            speaker_candidates = []
+            if not devices.get('speaker'):
+                speaker_candidates = [
+                    device for device in sorted(all_devices.get('speakers', []),
+                                                key=get_device_priority,
+                                                reverse=True)
+                    if 'wasapi' in device['host_api'].lower()
+                    or 'output' in device['name'].lower()
+                    or 'speaker' in device['name'].lower()
+                ]
+
+            results = probe_devices(p, [d['index'] for d in mic_candidates + speaker_candidates])
+            probes_hung = probes_hung or None in results.values()
+
             # Find best microphone if not already set
-            if not devices.get('mic') and all_devices.get('microphones'):
-                candidates = sorted(all_devices['microphones'], 
-                                 key=get_device_priority, 
-                                 reverse=True)
-                for device in candidates:
-                    try:
-                        test_stream = p.open(
-                            format=pyaudio.paInt16,
-                            channels=1,
-                            rate=44100,
-                            input=True,
-                            input_device_index=device['index'],
-                            frames_per_buffer=1024
-                        )
-                        test_stream.stop_stream()
-                        test_stream.close()
-                        
-                        devices['mic'] = {
-                            'index': device['index'],
-                            'name': device['name'],
-                            'channels': int(device.get('channels', 1))
-                        }
-                        logger.info(f"Best microphone found: {device['name']}")
-                        break
-                    except Exception as e:
-                        logger.debug(f"Failed to test microphone {device['name']}: {e}")
-                        continue
-            
+            for device in mic_candidates:
+                if results.get(device['index']):
+                    devices['mic'] = {
+                        'index': device['index'],
+                        'name': device['name'],
+                        'channels': int(device.get('channels', 1))
+                    }
+                    logger.info(f"Best microphone found: {device['name']}")
+                    break
+                logger.debug(f"Failed to test microphone {device['name']}")
+
             # Find best speaker if not already set
-            if not devices.get('speaker') and all_devices.get('speakers'):
-                candidates = sorted(all_devices['speakers'], 
-                                 key=get_device_priority, 
-                                 reverse=True)
-                for device in candidates:
-                    try:
-                        # For Windows, try to find WASAPI loopback device
-                        if 'wasapi' in device['host_api'].lower():
-                            test_stream = p.open(
-                                format=pyaudio.paInt16,
-                                channels=1,
-                                rate=44100,
-                                input=True,
-                                input_device_index=device['index'],
-                                frames_per_buffer=1024
-                            )
-                            test_stream.stop_stream()
-                            test_stream.close()
-                            
-                            devices['speaker'] = {
-                                'index': device['index'],
-                                'name': device['name'],
-                                'channels': int(device.get('channels', 1)),
-                                'is_loopback': True
-                            }
-                            logger.info(f"Found WASAPI loopback device: {device['name']}")
-                            break
-                        # For other platforms or as fallback
-                        elif 'output' in device['name'].lower() or 'speaker' in device['name'].lower():
-                            test_stream = p.open(
-                                format=pyaudio.paInt16,
-                                channels=1,
-                                rate=44100,
-                                input=True,
-                                input_device_index=device['index'],
-                                frames_per_buffer=1024
-                            )
-                            test_stream.stop_stream()
-                            test_stream.close()
-                            
-                            devices['speaker'] = {
-                                'index': device['index'],
-                                'name': device['name'],
-                                'channels': int(device.get('channels', 1))
-                            }
-                            logger.info(f"Found speaker device: {device['name']}")
-                            break
-                    except Exception as e:
-                        logger.debug(f"Failed to test speaker {device['name']}: {e}")
-                        continue
-                    
+            for device in speaker_candidates:
+                if results.get(device['index']):
+                    devices['speaker'] = {
+                        'index': device['index'],
+                        'name': device['name'],
+                        'channels': int(device.get('channels', 1))
+                    }
+                    if 'wasapi' in device['host_api'].lower():
+                        devices['speaker']['is_loopback'] = True
+                        logger.info(f"Found WASAPI loopback device: {device['name']}")
+                    else:
+                        logger.info(f"Found speaker device: {device['name']}")
+                    break
+                logger.debug(f"Failed to test speaker {device['name']}")
+
     except Exception as e:
         logger.error(f"Error during device detection: {e}")
     finally:
-        try:
-            p.terminate()
-        except:
-            pass
-        
+        # Terminating PortAudio under a still-running probe could crash the process
+        if probes_hung:
+            logger.warning("Leaving PortAudio initialized because a device probe is still running")
+        else:
+            try:
+                p.terminate()
+            except:
+                pass
+
     return devices
 
 
+def detect_devices() -> Dict[str, Optional[Dict]]:
+    """
+    auto_detect_devices() backed by the persistent device profile.
+
+    If the device-list fingerprint matches the one the last-known-good mic
+    and speaker were detected under, they are returned without opening a
+    single probe stream. Otherwise devices are probed and the profile updated.
+
+    Returns:
+        Dict: Dictionary with 'mic' and 'speaker' device information
+    """
+    profile = get_device_profile()
+    try:
+        snapshot = get_device_snapshot()
+    except Exception as e:
+        logger.debug(f"Device snapshot failed, probing devices: {e}")
+        return auto_detect_devices()
+
+    cached = profile.last_known_good(snapshot)
+    if cached is not None:
+        logger.info("Device list unchanged, using cached device profile (no probing)")
+        return cached
+
+    detected = auto_detect_devices()
+    profile.remember(snapshot, detected)
+    return detected
+
+
+class DeviceRegistry:
+    """
+    Process-wide cache of device enumeration and auto-detection results.
+
+    Every probe-based detection opens and closes several test streams, so the
+    recorder, CLI and GUI share one registry instead of detecting on their
+    own. Results are reused for ``ttl`` seconds or until invalidate() is
+    called (e.g. by the DeviceWatcher when the device list changes).
+
+    Attributes:
+        ttl: Seconds a cached result stays valid
+    """
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        # Held while loading so concurrent callers wait for a single detection
+        self._lock = threading.Lock()
+        self._cache: Dict[str, tuple] = {}
+
+    def _get(self, key: str, loader: Callable[[], Dict], refresh: bool) -> Dict:
+        with self._lock:
+            entry = self._cache.get(key)
+            if refresh or entry is None or time.monotonic() - entry[0] > self.ttl:
+                entry = (time.monotonic(), loader())
+                self._cache[key] = entry
+            # Callers may modify the result; never hand out the cached object
+            return copy.deepcopy(entry[1])
+
+    def list_devices(self, refresh: bool = False) -> Dict[str, List[Dict]]:
+        """Cached list_audio_devices()."""
+        return self._get('list', list_audio_devices, refresh)
+
+    def detected_devices(self, refresh: bool = False) -> Dict[str, Optional[Dict]]:
+        """Cached detect_devices() (auto-detection backed by the device profile)."""
+        return self._get('detect', detect_devices, refresh)
+
+    def invalidate(self):
+        """Drop all cached results; the next lookup enumerates again."""
+        with self._lock:
+            self._cache.clear()
+
+
+_registry = DeviceRegistry()
+
+
+def get_device_registry() -> DeviceRegistry:
+    """Return the process-wide DeviceRegistry."""
+    return _registry
+
+
 def print_all_devices():
     """
     Print all available devices in a formatted way with classifications.
     """
-    devices = list_audio_devices()
+    devices = get_device_registry().list_devices()
 
     print("\n" + "=" * 80)
     print("AVAILABLE AUDIO DEVICES")
@@ -401,7 +636,7 @@ def print_all_devices():
     print("AUTO-DETECTED WORKING DEVICES (Smart Priority Selection)")
     print("=" * 80 + "\n")
 
-    working = auto_detect_devices()
+    working = get_device_registry().detected_devices()
     if working.get('mic'):
         mic_classification = classify_device(working['mic']['name'])
         device_type = ""
@@ -0,0 +1,141 @@
+"""Persistent on-disk profile of audio device capabilities."""
+import json
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Default location of the persisted profile
+PROFILE_PATH = os.path.join(os.path.expanduser("~"), ".recordmymeeting", "device_profile.json")
+
+
+def device_key(host_api: str, name: str, channels: int) -> str:
+    """Stable identifier of a device across launches (indices can change)."""
+    return f"{host_api}|{name}|{channels}"
+
+
+def _normalize(fingerprint) -> list:
+    """Convert a snapshot fingerprint to its JSON form for comparison."""
+    return json.loads(json.dumps(fingerprint))
+
+
+class DeviceProfile:
+    """
+    Remember which devices worked so start-up can skip probe streams.
+
+    The profile stores, per device key (host API, name, channel count), the
+    sample rates and channel counts that opened successfully, plus the
+    last-known-good mic and speaker together with the device-list fingerprint
+    they were detected under. While the fingerprint is unchanged the cached
+    detection is reused as is; invalidate() forces the next detection to
+    probe again (e.g. after a stream failed to open).
+
+    Attributes:
+        path: JSON file backing the profile
+    """
+    def __init__(self, path: str = PROFILE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _load(self) -> Dict:
+        if self._data is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError):
+                self._data = {}
+            self._data.setdefault('devices', {})
+        return self._data
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.debug(f"Could not save device profile {self.path}: {e}")
+
+    def last_known_good(self, snapshot: Dict) -> Optional[Dict]:
+        """
+        Cached detection result if the device list is unchanged.
+
+        Args:
+            snapshot: Result of device_manager.get_device_snapshot()
+
+        Returns:
+            Dict: 'mic'/'speaker' entries as returned by auto_detect_devices,
+            or None if the profile is missing, stale or invalidated
+        """
+        with self._lock:
+            data = self._load()
+            last_good = data.get('last_good')
+            if not last_good or data.get('fingerprint') != _normalize(snapshot['fingerprint']):
+                return None
+            return {role: dict(device) for role, device in last_good.items() if device}
+
+    def remember(self, snapshot: Dict, detected: Dict):
+        """
+        Store a fresh detection result for the current device list.
+
+        Args:
+            snapshot: Result of device_manager.get_device_snapshot()
+            detected: Result of auto_detect_devices()
+        """
+        if not detected:
+            return
+        devices = {d['index']: d for d in snapshot['devices']}
+        with self._lock:
+            data = self._load()
+            data['fingerprint'] = _normalize(snapshot['fingerprint'])
+            data['last_good'] = {role: dict(device) for role, device in detected.items() if device}
+            # Detection probes at 44100 Hz mono
+            for device in data['last_good'].values():
+                info = devices.get(device['index'])
+                if info:
+                    key = device_key(info['host_api'], info['name'], info['input_channels'])
+                    self._add_supported(data, key, 44100, 1)
+            self._save()
+
+    def _add_supported(self, data: Dict, key: str, rate: int, channels: int):
+        entry = data['devices'].setdefault(key, {'rates': [], 'channels': []})
+        if rate not in entry['rates']:
+            entry['rates'].append(rate)
+        if channels not in entry['channels']:
+            entry['channels'].append(channels)
+
+    def note_supported(self, key: str, rate: int, channels: int):
+        """Record that device ``key`` opened at ``rate`` Hz with ``channels`` channels."""
+        with self._lock:
+            data = self._load()
+            entry = data['devices'].get(key)
+            if entry and rate in entry['rates'] and channels in entry['channels']:
+                return
+            self._add_supported(data, key, rate, channels)
+            self._save()
+
+    def supported(self, key: str) -> Optional[Dict]:
+        """Known-good ``{'rates': [...], 'channels': [...]}`` for device ``key``, if any."""
+        with self._lock:
+            entry = self._load()['devices'].get(key)
+            return dict(entry) if entry else None
+
+    def invalidate(self):
+        """Forget the last-known-good devices so the next detection probes again."""
+        with self._lock:
+            data = self._load()
+            if data.pop('last_good', None) is not None:
+                data.pop('fingerprint', None)
+                self._save()
+
+
+_profile = DeviceProfile()
+
+
+def get_device_profile() -> DeviceProfile:
+    """Return the process-wide DeviceProfile."""
+    return _profile
@@ -0,0 +1,78 @@
+"""Background watcher that reports audio device changes."""
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+from .device_manager import get_device_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceWatcher:
+    """
+    Poll a cheap fingerprint of the audio device list in a background thread.
+
+    The fingerprint covers each device's index, name, host API and channel
+    counts plus the default devices. It is built from enumeration only - no
+    stream is ever opened - and ``on_change`` is called only when it differs
+    from the previous poll, so capture threads never pay for device checks.
+
+    Attributes:
+        interval: Seconds between polls
+        snapshot: Latest result of get_device_snapshot()
+    """
+    def __init__(self, on_change: Callable[[Dict], None], interval: float = 2.0,
+                 source: Optional[Callable[[], Dict]] = None):
+        """
+        Args:
+            on_change: Called from the watcher thread with the new snapshot
+            interval: Seconds between polls
+            source: Returns a snapshot shaped like get_device_snapshot() (the default)
+        """
+        self.on_change = on_change
+        self.interval = interval
+        self.source = source
+        self.snapshot: Optional[Dict] = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Take the initial snapshot and start polling."""
+        if self._thread and self._thread.is_alive():
+            return
+        try:
+            self.snapshot = self._poll()
+        except Exception as e:
+            logger.debug(f"Initial device snapshot failed: {e}")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _poll(self) -> Dict:
+        return self.source() if self.source else get_device_snapshot()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                snapshot = self._poll()
+            except Exception as e:
+                logger.debug(f"Error checking for device changes: {e}")
+                continue
+            if self.snapshot is None:
+                self.snapshot = snapshot
+                continue
+            if snapshot['fingerprint'] == self.snapshot['fingerprint']:
+                continue
+            self.snapshot = snapshot
+            logger.info("Audio device configuration changed")
+            try:
+                self.on_change(snapshot)
+            except Exception as e:
+                logger.error(f"Device change handler failed: {e}")
+
+    def stop(self):
+        """Stop polling and wait for the watcher thread to exit."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,272 @@
+"""Helpers for driving a local ffmpeg executable."""
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def find_ffmpeg() -> Optional[str]:
+    """Path of the ffmpeg executable on PATH, or None if it is not installed."""
+    return shutil.which('ffmpeg')
+
+
+class _FfmpegPipe:
+    """
+    Base for writers feeding an ffmpeg process through its stdin.
+
+    When ffmpeg exits early (bad arguments, full disk, ...), the first write
+    into its closed pipe marks the writer failed and is logged; later data is
+    dropped instead of raising on every call. Why ffmpeg failed is logged
+    once more on close, from its captured stderr.
+    """
+    def _start(self, command: List[str]):
+        self.command = command
+        self.failed = False
+        # Errors go to a file rather than a pipe nobody drains
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(self.command, stdin=subprocess.PIPE,
+                                         stdout=subprocess.DEVNULL, stderr=self._stderr)
+
+    def _send(self, view: memoryview) -> bool:
+        """Write ``view`` to ffmpeg; returns False once ffmpeg stopped accepting data."""
+        if self.failed:
+            return False
+        try:
+            self._process.stdin.write(view)
+        except (OSError, ValueError) as e:
+            self.failed = True
+            logger.error(f"ffmpeg stopped accepting data for {self.path} ({e}), dropping the rest")
+            return False
+        return True
+
+    def _finish(self, timeout: float):
+        """Close ffmpeg's input, wait for it to finish the file and report a failure."""
+        if self._process.stdin.closed:
+            return
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self._process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            logger.error(f"ffmpeg did not finish {self.path} in {timeout}s, killing it")
+            self._process.kill()
+            self._process.wait()
+        if self._process.returncode:
+            self._stderr.seek(0)
+            message = self._stderr.read().decode(errors='replace').strip()
+            logger.error(f"ffmpeg failed writing {self.path} (exit {self._process.returncode}): {message}")
+        self._stderr.close()
+
+
+class FfmpegVideoWriter(_FfmpegPipe):
+    """
+    cv2.VideoWriter look-alike that pipes raw frames into an ffmpeg process.
+
+    Frames are written as raw ``bgr24`` (or ``gray``) bytes to ffmpeg's stdin;
+    ffmpeg encodes them on its own threads, so the Python side only copies
+    each frame into the pipe. Output must have even dimensions for yuv420p,
+    so an odd last row/column is cropped.
+
+    MP4/MOV output is fragmented by default: the index is written up front and
+    each fragment is self-contained, so a file cut off by a crash or power
+    loss stays playable up to its last complete fragment.
+
+    Attributes:
+        path: Output video file path
+        command: ffmpeg command line in use
+        failed: Whether ffmpeg stopped accepting frames
+    """
+    def __init__(self,
+                 path: str,
+                 fps: float,
+                 size: Tuple[int, int],
+                 grayscale: bool = False,
+                 codec: str = 'libx264',
+                 crf: Optional[int] = 23,
+                 preset: Optional[str] = 'ultrafast',
+                 threads: int = 0,
+                 output_args: Optional[List[str]] = None,
+                 ffmpeg: Optional[str] = None,
+                 fragment_seconds: Optional[float] = 2.0):
+        """
+        Start the ffmpeg process.
+
+        Args:
+            path: Output video file path
+            fps: Input frame rate
+            size: ``(width, height)`` of the frames
+            grayscale: Frames are single-channel instead of BGR
+            codec: ffmpeg video encoder (e.g. libx264, libx265, h264_nvenc)
+            crf: Constant rate factor, or None to use the codec default
+            preset: Encoder preset, or None to use the codec default
+            threads: Encoder threads (0 lets ffmpeg use every core)
+            output_args: Extra arguments placed before the output path
+            ffmpeg: ffmpeg executable (found on PATH if None)
+            fragment_seconds: Keyframe and fragment interval for MP4/MOV output
+                (None = regular MP4 with the index written on release)
+        """
+        ffmpeg = ffmpeg or find_ffmpeg()
+        if not ffmpeg:
+            raise RuntimeError("ffmpeg not found on PATH")
+        self.path = path
+        width, height = size
+        self._frame_bytes = width * height * (1 if grayscale else 3)
+        command = [
+            ffmpeg, '-hide_banner', '-loglevel', 'error', '-y',
+            '-f', 'rawvideo', '-pix_fmt', 'gray' if grayscale else 'bgr24',
+            '-s', f'{width}x{height}', '-framerate', str(fps), '-i', 'pipe:0',
+            '-vf', 'crop=trunc(iw/2)*2:trunc(ih/2)*2',
+            '-c:v', codec, '-pix_fmt', 'yuv420p', '-threads', str(threads),
+        ]
+        if crf is not None:
+            command += ['-crf', str(crf)]
+        if preset:
+            command += ['-preset', preset]
+        if fragment_seconds and os.path.splitext(path)[1].lower() in ('.mp4', '.mov'):
+            # A fragment is cut at every keyframe and written out right away
+            command += ['-g', str(max(1, int(round(fps * fragment_seconds)))),
+                        '-movflags', '+frag_keyframe+empty_moov+default_base_moof',
+                        '-flush_packets', '1']
+        self._start(command + list(output_args or []) + [path])
+
+    def isOpened(self) -> bool:
+        return not self.failed and self._process.poll() is None
+
+    def write(self, frame: np.ndarray):
+        """Send one frame to ffmpeg (blocks while ffmpeg's input pipe is full)."""
+        if frame.nbytes != self._frame_bytes:
+            raise ValueError(f"Frame of {frame.nbytes} bytes, expected {self._frame_bytes}")
+        self._send(memoryview(np.ascontiguousarray(frame)).cast('B'))
+
+    def release(self, timeout: float = 60.0):
+        """Close ffmpeg's input and wait for it to finish the file."""
+        self._finish(timeout)
+
+
+# ffmpeg raw sample formats by bytes per sample (8-bit PCM is unsigned)
+RAW_AUDIO_FORMATS = {1: 'u8', 2: 's16le', 3: 's24le', 4: 's32le'}
+
+# Encoder arguments by output extension
+AUDIO_CODEC_ARGS = {
+    '.flac': ['-c:a', 'flac'],
+    '.opus': ['-c:a', 'libopus', '-application', 'voip'],
+}
+
+
+class FfmpegAudioWriter(_FfmpegPipe):
+    """
+    Streaming audio file writer that pipes raw PCM into an ffmpeg process.
+
+    Has the interface of WavStreamWriter, so it can stand in for it under a
+    StreamingAudioWriter or LiveMixer. Encoding (FLAC or Opus, picked by the
+    file extension) runs in the ffmpeg process, so the writing thread only
+    copies chunks into the pipe; the capture callbacks never wait on it.
+
+    Attributes:
+        path: Output file path
+        channels: Number of interleaved channels
+        sample_width: Bytes per sample
+        rate: Sample rate in Hz
+        frames_written: Number of audio frames handed to ffmpeg so far
+        command: ffmpeg command line in use
+        failed: Whether ffmpeg stopped accepting data
+    """
+    def __init__(self,
+                 path: str,
+                 channels: int,
+                 sample_width: int,
+                 rate: int,
+                 bitrate: Optional[str] = None,
+                 ffmpeg: Optional[str] = None):
+        """
+        Start the ffmpeg process.
+
+        Args:
+            path: Output file path ending in .flac or .opus
+            channels: Number of interleaved channels
+            sample_width: Bytes per sample of the PCM written
+            rate: Sample rate in Hz
+            bitrate: Encoder bitrate (e.g. '48k') for lossy codecs, or None for the codec default
+            ffmpeg: ffmpeg executable (found on PATH if None)
+        """
+        ext = os.path.splitext(path)[1].lower()
+        if ext not in AUDIO_CODEC_ARGS:
+            raise ValueError(f"Unsupported audio file type: {path}")
+        if sample_width not in RAW_AUDIO_FORMATS:
+            raise ValueError(f"Unsupported sample width: {sample_width}")
+        ffmpeg = ffmpeg or find_ffmpeg()
+        if not ffmpeg:
+            raise RuntimeError("ffmpeg not found on PATH")
+        self.path = path
+        self.channels = channels
+        self.sample_width = sample_width
+        self.rate = rate
+        self.frames_written = 0
+        self._data_bytes = 0
+        command = [
+            ffmpeg, '-hide_banner', '-loglevel', 'error', '-y',
+            '-f', RAW_AUDIO_FORMATS[sample_width], '-ar', str(rate), '-ac', str(channels), '-i', 'pipe:0',
+        ] + AUDIO_CODEC_ARGS[ext]
+        if bitrate and ext != '.flac':
+            command += ['-b:a', bitrate]
+        # Hand each packet to the OS as it is muxed, so a crash loses little audio
+        self._start(command + ['-flush_packets', '1', path])
+
+    @property
+    def paths(self) -> List[str]:
+        """Files written by this writer."""
+        return [self.path]
+
+    def write(self, data):
+        """Send raw interleaved PCM data (bytes or any contiguous buffer) to ffmpeg."""
+        view = memoryview(data).cast('B')
+        if not self._send(view):
+            return
+        self._data_bytes += view.nbytes
+        self.frames_written = self._data_bytes // (self.channels * self.sample_width)
+
+    def close(self, timeout: float = 60.0):
+        """Close ffmpeg's input and wait for it to finish the file."""
+        self._finish(timeout)
+
+
+def concat_videos(parts: List[str], output: str, ffmpeg: Optional[str] = None) -> bool:
+    """
+    Join video files with identical encoding settings without re-encoding.
+
+    Uses ffmpeg's concat demuxer with stream copy, so the cost is one pass of
+    file I/O.
+
+    Returns:
+        bool: Whether ``output`` was written
+    """
+    ffmpeg = ffmpeg or find_ffmpeg()
+    if not ffmpeg:
+        logger.error("ffmpeg not found on PATH, cannot join video segments")
+        return False
+    list_path = output + '.parts.txt'
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for part in parts:
+            escaped = os.path.abspath(part).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    try:
+        result = subprocess.run(
+            [ffmpeg, '-hide_banner', '-loglevel', 'error', '-y',
+             '-f', 'concat', '-safe', '0', '-i', list_path, '-c', 'copy', output],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+    finally:
+        os.remove(list_path)
+    if result.returncode:
+        logger.error(f"ffmpeg failed joining segments into {output}: "
+                     f"{result.stderr.decode(errors='replace').strip()}")
+        return False
+    return True
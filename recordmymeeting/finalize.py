@@ -0,0 +1,168 @@
+"""Background finalization of a stopped session as a graph of tasks."""
+import logging
+import threading
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Task states
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+
+class FinalizationJob:
+    """
+    Handle on the finalization of one session.
+
+    Tasks are added with their dependencies, then start() hands every task
+    whose dependencies are done to the executor; the rest are submitted as
+    their dependencies finish, so independent tasks run in parallel. A task
+    that raises is logged and marks every task depending on it as skipped;
+    the other tasks still run.
+
+    Attributes:
+        name: Label used in log messages (the session folder)
+    """
+    def __init__(self, name: str, executor: Executor):
+        self.name = name
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        self._tasks = {}
+        self._order = []
+        self._results = {}
+        self._errors = {}
+        self._callbacks = []
+        self._started = False
+
+    def add_task(self, name: str, func: Callable[[], Any], deps: Iterable[str] = ()):
+        """
+        Add a task run once every task in ``deps`` is done.
+
+        Args:
+            name: Unique task name
+            func: Callable taking no arguments; its return value is kept in result()
+            deps: Names of tasks added earlier that must finish first
+        """
+        deps = list(deps)
+        for dep in deps:
+            if dep not in self._tasks:
+                raise ValueError(f"Task {name!r} depends on unknown task {dep!r}")
+        if name in self._tasks or self._started:
+            raise ValueError(f"Cannot add task {name!r}")
+        self._tasks[name] = {'func': func, 'deps': deps, 'state': PENDING}
+        self._order.append(name)
+
+    def start(self) -> "FinalizationJob":
+        """Submit the tasks that have no pending dependencies."""
+        with self._lock:
+            self._started = True
+            ready = self._ready()
+        self._submit(ready)
+        self._check_finished()
+        return self
+
+    def _ready(self) -> List[str]:
+        """Pending tasks whose dependencies are done, marked running (lock held)."""
+        ready = []
+        for name in self._order:
+            task = self._tasks[name]
+            if task['state'] == PENDING and all(self._tasks[d]['state'] == DONE for d in task['deps']):
+                task['state'] = RUNNING
+                ready.append(name)
+        return ready
+
+    def _skip_dependents(self, failed: str):
+        """Mark everything downstream of ``failed`` as skipped (lock held)."""
+        for name in self._order:
+            task = self._tasks[name]
+            if task['state'] == PENDING and failed in task['deps']:
+                task['state'] = SKIPPED
+                logger.warning(f"Skipping {name} of {self.name}: {failed} did not complete")
+                self._skip_dependents(name)
+
+    def _submit(self, names: List[str]):
+        for name in names:
+            self._executor.submit(self._run, name)
+
+    def _run(self, name: str):
+        task = self._tasks[name]
+        try:
+            result = task['func']()
+        except Exception as e:
+            logger.error(f"Finalization task {name} of {self.name} failed: {e}", exc_info=True)
+            with self._lock:
+                task['state'] = FAILED
+                self._errors[name] = e
+                self._skip_dependents(name)
+                ready = self._ready()
+        else:
+            with self._lock:
+                task['state'] = DONE
+                self._results[name] = result
+                ready = self._ready()
+        self._submit(ready)
+        self._check_finished()
+
+    def _check_finished(self):
+        with self._lock:
+            if self._finished.is_set() or any(t['state'] in (PENDING, RUNNING) for t in self._tasks.values()):
+                return
+            self._finished.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            self._call(callback)
+
+    def _call(self, callback: Callable[["FinalizationJob"], None]):
+        try:
+            callback(self)
+        except Exception as e:
+            logger.error(f"Finalization callback of {self.name} failed: {e}")
+
+    def done(self) -> bool:
+        """Whether every task has finished, failed or been skipped."""
+        return self._finished.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job is done; returns False on timeout."""
+        return self._finished.wait(timeout)
+
+    def result(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Wait for the job and return the results of the tasks that completed.
+
+        Raises:
+            TimeoutError: If the job is not done within ``timeout`` seconds
+        """
+        if not self.wait(timeout):
+            raise TimeoutError(f"Finalization of {self.name} still running")
+        return dict(self._results)
+
+    def errors(self) -> Dict[str, BaseException]:
+        """Exceptions raised by failed tasks, by task name."""
+        with self._lock:
+            return dict(self._errors)
+
+    def status(self) -> Dict[str, str]:
+        """State of every task (PENDING, RUNNING, DONE, FAILED or SKIPPED) in the order added."""
+        with self._lock:
+            return {name: self._tasks[name]['state'] for name in self._order}
+
+    def progress(self) -> float:
+        """Fraction of tasks that are no longer pending or running (0.0 to 1.0)."""
+        states = self.status().values()
+        if not states:
+            return 1.0
+        return sum(state not in (PENDING, RUNNING) for state in states) / len(states)
+
+    def add_done_callback(self, callback: Callable[["FinalizationJob"], None]):
+        """Call ``callback(job)`` once the job is done (at once if it already is)."""
+        with self._lock:
+            if not self._finished.is_set():
+                self._callbacks.append(callback)
+                return
+        self._call(callback)
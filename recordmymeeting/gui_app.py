@@ -12,7 +12,7 @@ from typing import Optional
 
 # Assuming these exist in your project structure
 from recordmymeeting.core import RecordMyMeeting
-from recordmymeeting.device_manager import list_audio_devices
+from recordmymeeting.device_manager import get_device_registry
 
 logger = logging.getLogger(__name__)
 
@@ -176,7 +176,7 @@ class RecordMyMeetingGUI:
         self.spk_combo = ttk.Combobox(device_frame, state='readonly', width=50)
         self.spk_combo.grid(row=1, column=1, sticky='ew', padx=8, pady=4)
 
-        ttk.Button(device_frame, text="🔄 Refresh Devices", command=self._refresh_audio_devices).grid(row=2, column=0, columnspan=2, pady=(8,0))
+        ttk.Button(device_frame, text="🔄 Refresh Devices", command=lambda: self._refresh_audio_devices(force=True)).grid(row=2, column=0, columnspan=2, pady=(8,0))
 
         # NEW: Device Testing Section
         test_frame = ttk.LabelFrame(frame, text="Test Devices", padding="10")
@@ -289,10 +289,13 @@ class RecordMyMeetingGUI:
         self.root.after(0, lambda: self._update_button_states(idle=True)) # Reset buttons when toggling schedule
 
 
-    def _refresh_audio_devices(self):
-        """Refresh the list of available audio devices."""
+    def _refresh_audio_devices(self, force: bool = False):
+        """Refresh the list of available audio devices (force=True bypasses the shared cache)."""
         try:
-            devices = list_audio_devices()
+            registry = get_device_registry()
+            if force:
+                registry.invalidate()
+            devices = registry.list_devices()
 
             mic_options = [f"[{dev['index']}] {dev['name']}" for dev in devices['microphones']]
             spk_options = [f"[{dev['index']}] {dev['name']}" for dev in devices['speakers']]
@@ -666,17 +669,15 @@ class RecordMyMeetingGUI:
                     self.root.after(0, lambda: self._update_status("Stopping recording...", info=True))
                     # Get session folder before stopping
                     session_folder = self._recorder.session_folder
-                    self._recorder.stop()
+                    job = self._recorder.stop()
 
                     self._active_recording = False
                     self._scheduled = False 
 
-                    # Use captured session_folder
-                    if session_folder and not self._is_closing:
-                        self.root.after(0, lambda: self._safe_messagebox("info", "Recording Complete", 
-                                                                        f"Recording saved to: {session_folder}"))
-                        logger.info(f"Recording stopped, saved to: {session_folder}")
-                        self.root.after(0, lambda: self._update_status(f"Recording saved to: {session_folder}", info=True))
+                    # Files are finalized in the background; a new recording can start meanwhile
+                    if job and session_folder and not self._is_closing:
+                        self.root.after(0, lambda: self._update_status("Finalizing recording...", info=True))
+                        job.add_done_callback(lambda job: self._on_finalized(session_folder))
                     else:
                         logger.warning("Recording stopped but no session folder was available")
                         self.root.after(0, lambda: self._update_status("Recording stopped (no save location available)", warning=True))
@@ -695,6 +696,17 @@ class RecordMyMeetingGUI:
                     self.root.after(0, lambda: self._update_button_states(idle=True))
 
 
+    def _on_finalized(self, session_folder: str):
+        """Report a session whose files were finalized in the background."""
+        logger.info(f"Recording stopped, saved to: {session_folder}")
+        if self._is_closing:
+            return
+        self.root.after(0, lambda: self._safe_messagebox("info", "Recording Complete",
+                                                        f"Recording saved to: {session_folder}"))
+        if not self._active_recording:
+            self.root.after(0, lambda: self._update_status(f"Recording saved to: {session_folder}", info=True))
+
+
     def _run_scheduled_recording(self, duration_seconds: int):
         """Run for a specified duration for scheduled recordings."""
         try:
@@ -873,7 +885,9 @@ class RecordMyMeetingGUI:
                         try:
                             # CRITICAL FIX: Capture session_folder BEFORE stopping
                             saved_folder = self._recorder.session_folder
-                            self._recorder.stop(save_output=True)  # Explicitly save output
+                            job = self._recorder.stop(save_output=True)  # Explicitly save output
+                            if job:
+                                job.wait()  # Finish writing the files before the window closes
                             logger.info(f"Recording stopped and saved to: {saved_folder}")
                             if self.root.winfo_exists():  # Check if root still exists
                                 messagebox.showinfo("Recording Complete", f"Recording saved to: {saved_folder}")
@@ -0,0 +1,612 @@
+"""Audio mixing helpers for producing the merged track."""
+import logging
+import math
+import threading
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .audio_writer import WavReader, WavStreamWriter, open_audio_file
+from .ring_buffer import SampleRing
+
+logger = logging.getLogger(__name__)
+
+# Frames mixed per block; 64k mono frames is ~1.5 s at 44.1 kHz and ~0.5 MB of scratch
+DEFAULT_BLOCK_FRAMES = 65536
+# How a mic + speaker session is stored: three files (microphone, speaker,
+# merged) or one 2-channel session track with the microphone left and the
+# speaker right
+AUDIO_LAYOUTS = ('separate', 'interleaved')
+# Views derived from an interleaved session track
+SESSION_VIEWS = ('microphone', 'speaker', 'merged')
+# Seconds of master audio a live mix holds back for a second source that has
+# stopped delivering before writing the master alone
+LIVE_STALL_TIMEOUT = 1.0
+
+
+def match_channels(block: np.ndarray, channels: int) -> np.ndarray:
+    """
+    Adapt a ``(frames, n)`` block to ``channels`` channels.
+
+    Mono is broadcast to every channel (no copy); anything else is averaged
+    down to mono first.
+    """
+    if block.shape[1] == channels:
+        return block
+    if block.shape[1] != 1:
+        block = block.mean(axis=1, dtype=np.int32).astype(block.dtype)[:, None]
+    return np.broadcast_to(block, (block.shape[0], channels))
+
+
+class BlockMixer:
+    """
+    Average two int16 sources block by block into reusable scratch buffers.
+
+    Attributes:
+        channels: Channels of the mixed output
+        block_frames: Largest block mix() accepts
+    """
+    def __init__(self, channels: int, block_frames: int = DEFAULT_BLOCK_FRAMES):
+        self.channels = channels
+        self.block_frames = block_frames
+        self._acc = np.empty((block_frames, channels), dtype=np.int32)
+        self._out = np.empty((block_frames, channels), dtype=np.int16)
+
+    def mix(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """
+        Mix two equally long ``(frames, channels)`` blocks.
+
+        Returns:
+            np.ndarray: View into the internal output buffer, valid until the next call
+        """
+        n = len(a)
+        acc = self._acc[:n]
+        np.add(match_channels(a, self.channels), match_channels(b, self.channels), out=acc, dtype=np.int32)
+        # Simple average to avoid clipping (floor division, as before)
+        np.right_shift(acc, 1, out=acc)
+        out = self._out[:n]
+        out[...] = acc
+        return out
+
+
+class BlockInterleaver:
+    """
+    Put two int16 sources side by side as the left and right channel.
+
+    Each source is first downmixed to mono. Has the interface of BlockMixer,
+    so LiveMixer can write a 2-channel session track instead of a mix.
+
+    Attributes:
+        channels: Always 2
+        block_frames: Largest block mix() accepts
+    """
+    channels = 2
+
+    def __init__(self, block_frames: int = DEFAULT_BLOCK_FRAMES):
+        self.block_frames = block_frames
+        self._out = np.empty((block_frames, 2), dtype=np.int16)
+
+    def mix(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """
+        Interleave two equally long blocks into ``(frames, 2)``.
+
+        Returns:
+            np.ndarray: View into the internal output buffer, valid until the next call
+        """
+        n = len(a)
+        out = self._out[:n]
+        out[:, 0] = match_channels(a, 1)[:, 0]
+        out[:, 1] = match_channels(b, 1)[:, 0]
+        return out
+
+
+class DriftResampler:
+    """
+    Streaming, vectorized linear-interpolation resampler for clock drift.
+
+    Maps consecutive frames of a master clock onto fractional frame positions
+    of a second source whose clock runs slightly faster or slower. Callers
+    supply the ideal source position for each block (from timestamps); small
+    phase errors are pulled in by nudging the step, large ones (e.g. after a
+    device switch) by jumping.
+
+    Attributes:
+        position: Fractional source frame aligned with the next master frame
+        resyncs: Number of jumps taken to recover from large phase errors
+    """
+    # Phase errors beyond this many seconds are fixed by jumping instead of slewing
+    RESYNC_THRESHOLD = 0.05
+    # Largest step adjustment used to pull the phase back (2000 ppm)
+    MAX_SLEW = 0.002
+
+    def __init__(self, channels: int, rate: int, block_frames: int):
+        """
+        Args:
+            channels: Channels of the resampled source
+            rate: Nominal sample rate in Hz
+            block_frames: Largest number of output frames per call
+        """
+        self.rate = rate
+        self.block_frames = block_frames
+        self.position = None
+        self.resyncs = 0
+        self._ramp = np.arange(block_frames, dtype=np.float64)
+        self._out = np.empty((block_frames, channels), dtype=np.int16)
+
+    def plan(self, target: float, ratio: float) -> float:
+        """
+        Choose the step for the next block.
+
+        Args:
+            target: Ideal source position of the next master frame
+            ratio: Estimated source frames per master frame
+
+        Returns:
+            float: Source frames to advance per output frame
+        """
+        error = target - self.position if self.position is not None else 0.0
+        if self.position is None or abs(error) > self.RESYNC_THRESHOLD * self.rate:
+            if self.position is not None:
+                self.resyncs += 1
+            self.position = target
+            error = 0.0
+        # Correct the remaining phase error over roughly one second
+        return ratio + min(max(error / self.rate, -self.MAX_SLEW), self.MAX_SLEW)
+
+    def span(self, step: float, frames: int):
+        """Source frame range ``[start, end)`` needed to produce ``frames`` frames."""
+        start = int(np.floor(self.position))
+        end = int(np.floor(self.position + step * (frames - 1))) + 2
+        return start, end
+
+    def frames_until(self, step: float, end_frame: int, frames: int) -> int:
+        """Largest output count <= ``frames`` that only needs source frames below ``end_frame``."""
+        fit = int(np.floor((end_frame - 2 - self.position) / step)) + 1
+        return max(0, min(frames, fit))
+
+    def resample(self, window: np.ndarray, step: float, frames: int) -> np.ndarray:
+        """
+        Interpolate ``frames`` output frames and advance the position.
+
+        Args:
+            window: Source frames ``[start, end)`` as returned by span()
+            step: Step returned by plan()
+            frames: Number of output frames
+
+        Returns:
+            np.ndarray: View into the internal output buffer, valid until the next call
+        """
+        start = np.floor(self.position)
+        positions = (self.position - start) + step * self._ramp[:frames]
+        index = positions.astype(np.int64)
+        frac = (positions - index)[:, None]
+        lower = window[index].astype(np.float32)
+        upper = window[index + 1].astype(np.float32)
+        out = self._out[:frames]
+        np.rint(lower + (upper - lower) * frac, out=lower)
+        out[...] = lower
+        self.position += step * frames
+        return out
+
+
+class _WavWindow:
+    """Serve forward-moving frame ranges of an open WAV file, zero-filled outside it."""
+    def __init__(self, wf: WavReader):
+        self._wf = wf
+        self._channels = wf.getnchannels()
+        self._nframes = wf.getnframes()
+        self._base = 0
+        self._buf = np.zeros((0, self._channels), dtype=np.int16)
+
+    def fetch(self, start: int, end: int) -> np.ndarray:
+        # Forget frames before ``start`` and read ahead up to ``end``
+        if start > self._base:
+            drop = min(start - self._base, len(self._buf))
+            self._buf = self._buf[drop:]
+            self._base += drop
+        wanted = min(end, self._nframes) - (self._base + len(self._buf))
+        if wanted > 0:
+            more = np.frombuffer(self._wf.readframes(wanted), dtype=np.int16).reshape(-1, self._channels)
+            self._buf = np.concatenate([self._buf, more])
+            if self._base < start:
+                drop = min(start - self._base, len(self._buf))
+                self._buf = self._buf[drop:]
+                self._base += drop
+
+        window = np.zeros((end - start, self._channels), dtype=np.int16)
+        lo = max(start, self._base)
+        hi = min(end, self._base + len(self._buf))
+        if hi > lo:
+            window[lo - start:hi - start] = self._buf[lo - self._base:hi - self._base]
+        return window
+
+
+def speaker_alignment(master: SampleRing, source: SampleRing):
+    """
+    Map master frames onto ``source`` frames using both capture clocks.
+
+    Returns:
+        tuple: ``(offset, ratio)`` so that master frame ``m`` lines up with
+        source frame ``offset + ratio * m``; ``(0.0, 1.0)`` without timestamps
+    """
+    master_clock = master.clock()
+    source_clock = source.clock()
+    if master_clock is None or source_clock is None:
+        return 0.0, 1.0
+    master_origin, master_rate = master_clock
+    source_origin, source_rate = source_clock
+    return (master_origin - source_origin) * source_rate, source_rate / master_rate
+
+
+def speaker_alignment_segments(master: SampleRing, source: SampleRing) -> List[Tuple[int, Optional[float], float]]:
+    """
+    Piecewise speaker_alignment() over the clock segments of both rings.
+
+    A device switch starts a new clock segment (see
+    SampleRing.mark_discontinuity()), so a single offset/ratio only fits the
+    latest segments. Each piece applies from master frame ``start`` up to the
+    next piece. Its ``offset`` is None where the master timeline falls in a
+    gap between two source segments; that stretch is mixed with silence.
+
+    Returns:
+        list: ``(start, offset, ratio)`` pieces ordered by ``start``, the first
+        starting at 0; ``[(0, 0.0, 1.0)]`` without timestamps
+    """
+    master_segments = master.clock_segments()
+    source_segments = source.clock_segments()
+    if not master_segments or not source_segments:
+        return [(0, 0.0, 1.0)]
+
+    pieces = []
+
+    def add(start: float, offset: Optional[float], ratio: float):
+        start = max(0, int(math.ceil(start)))
+        if pieces and pieces[-1][0] >= start:
+            # The previous piece covers no whole frame
+            pieces.pop()
+        pieces.append((start, offset, ratio))
+
+    for k, (master_start, master_origin, master_rate) in enumerate(master_segments):
+        master_end = master_segments[k + 1][0] if k + 1 < len(master_segments) else math.inf
+        cursor = master_start if k else 0
+        for j, (source_start, source_origin, source_rate) in enumerate(source_segments):
+            # Master frames captured while this source segment was capturing
+            begin = -math.inf
+            if j:
+                begin = (source_origin + source_start / source_rate - master_origin) * master_rate
+            end = math.inf
+            if j + 1 < len(source_segments):
+                next_start = source_segments[j + 1][0]
+                end = (source_origin + next_start / source_rate - master_origin) * master_rate
+            begin, end = max(begin, cursor), min(end, master_end)
+            if end <= begin:
+                continue
+            if begin > cursor:
+                add(cursor, None, 1.0)
+            add(begin, (master_origin - source_origin) * source_rate, source_rate / master_rate)
+            cursor = end
+        if cursor < master_end:
+            add(cursor, None, 1.0)
+    return pieces
+
+
+def mix_wav_files(first_path: str, second_path: str, output_path: str,
+                  block_frames: int = DEFAULT_BLOCK_FRAMES,
+                  offset: float = 0.0, ratio: float = 1.0,
+                  alignment: Optional[List[Tuple[int, Optional[float], float]]] = None) -> int:
+    """
+    Mix two 16-bit PCM WAV (or RF64) files into ``output_path`` without loading them.
+
+    Both inputs are read in fixed-size blocks, mixed and appended to the
+    output, so peak memory is a few blocks regardless of the recording length.
+    The output is as long as the shorter input.
+
+    When ``offset``/``ratio`` are given (see speaker_alignment()), frame ``m``
+    of the first file is mixed with the second file resampled at frame
+    ``offset + ratio * m``, compensating start offset and clock drift. With
+    ``alignment`` (see speaker_alignment_segments()) each clock segment of the
+    recording gets its own offset and ratio.
+
+    Args:
+        first_path: First input WAV (its channel count and rate are used for the output)
+        second_path: Second input WAV
+        output_path: Merged WAV to create
+        block_frames: Frames processed per block
+        offset: Frame of the second file aligned with frame 0 of the first
+        ratio: Second-file frames per first-file frame
+        alignment: ``(start, offset, ratio)`` pieces replacing ``offset``/``ratio``
+
+    Returns:
+        int: Number of frames written
+    """
+    with WavReader(first_path) as wf_a, WavReader(second_path) as wf_b:
+        if wf_a.getsampwidth() != 2 or wf_b.getsampwidth() != 2:
+            raise ValueError("Only 16-bit PCM audio can be merged")
+        if wf_a.getframerate() != wf_b.getframerate():
+            logger.warning(f"Sample rates differ ({wf_a.getframerate()} vs {wf_b.getframerate()}), mixing at {wf_a.getframerate()} Hz")
+
+        channels_a = wf_a.getnchannels()
+        channels_b = wf_b.getnchannels()
+        remaining = min(wf_a.getnframes(), wf_b.getnframes())
+        mixer = BlockMixer(channels_a, block_frames)
+        out = WavStreamWriter(output_path, channels_a, 2, wf_a.getframerate())
+        try:
+            if alignment is None:
+                alignment = [(0, offset, ratio)]
+            if any(piece_offset != 0.0 or piece_ratio != 1.0 for _, piece_offset, piece_ratio in alignment):
+                _mix_resampled(wf_a, wf_b, out, mixer, alignment)
+                return out.frames_written
+            while remaining > 0:
+                n = min(block_frames, remaining)
+                a = np.frombuffer(wf_a.readframes(n), dtype=np.int16).reshape(-1, channels_a)
+                b = np.frombuffer(wf_b.readframes(n), dtype=np.int16).reshape(-1, channels_b)
+                n = min(len(a), len(b))
+                if n == 0:
+                    break
+                out.write(mixer.mix(a[:n], b[:n]))
+                remaining -= n
+        finally:
+            out.close()
+        return out.frames_written
+
+
+def _mix_resampled(wf_a: WavReader, wf_b: WavReader, out: WavStreamWriter,
+                   mixer: BlockMixer, alignment: List[Tuple[int, Optional[float], float]]):
+    """Mix ``wf_a`` with ``wf_b`` resampled onto its timeline, block by block and piece by piece."""
+    channels_a = wf_a.getnchannels()
+    resampler = DriftResampler(wf_b.getnchannels(), wf_a.getframerate(), mixer.block_frames)
+    window = _WavWindow(wf_b)
+    silence = np.zeros((mixer.block_frames, wf_b.getnchannels()), dtype=np.int16)
+    piece = 0
+    m = 0
+    while True:
+        while piece + 1 < len(alignment) and alignment[piece + 1][0] <= m:
+            piece += 1
+        frames = mixer.block_frames
+        if piece + 1 < len(alignment):
+            frames = min(frames, alignment[piece + 1][0] - m)
+        a = np.frombuffer(wf_a.readframes(frames), dtype=np.int16).reshape(-1, channels_a)
+        if len(a) == 0:
+            return
+        _, offset, ratio = alignment[piece]
+        if offset is None:
+            # The second source was not capturing (between two clock segments)
+            out.write(mixer.mix(a, silence[:len(a)]))
+            m += len(a)
+            continue
+        step = resampler.plan(offset + ratio * m, ratio)
+        n = resampler.frames_until(step, wf_b.getnframes(), len(a))
+        if n == 0:
+            return
+        start, end = resampler.span(step, n)
+        b = resampler.resample(window.fetch(start, end), step, n)
+        out.write(mixer.mix(a[:n], b))
+        m += n
+        if n < len(a):
+            return
+
+
+class LiveMixer:
+    """
+    Mix two capture rings into a WAV file while recording is in progress.
+
+    The first ring is the master clock: each of its frames is written once.
+    The second source is resampled onto the master timeline using both rings'
+    timestamped clocks, so different start times and drifting device clocks
+    stay aligned over hours. Nothing is re-read from disk when recording stops.
+    With a BlockInterleaver as ``mixer`` the aligned sources are written as
+    the two channels of a session track instead of being mixed.
+
+    Master frames from before the second source's current stream (e.g. while
+    its device was being switched) are mixed with silence. With
+    ``stall_timeout`` set, a second source that stops delivering (unplugged,
+    stalled) only holds the output back that long; the master is then written
+    with silence in place of the second source, and close() writes out every
+    remaining master frame the same way.
+
+    Attributes:
+        path: Output file path
+        frames_written: Number of mixed frames written so far
+        silent_frames: Master frames written with silence for the second source
+    """
+    def __init__(self,
+                 path: str,
+                 first: SampleRing,
+                 second: SampleRing,
+                 sample_width: int,
+                 rate: int,
+                 block_frames: int = 4096,
+                 poll_interval: float = 0.01,
+                 wav=None,
+                 mixer=None,
+                 stall_timeout: Optional[float] = None):
+        """
+        Open the output file and start the mixing thread.
+
+        Args:
+            path: Merged WAV file path
+            first: Master source ring (its channel count is used for the output)
+            second: Source ring resampled onto the master timeline
+            sample_width: Bytes per sample
+            rate: Sample rate in Hz
+            block_frames: Largest block mixed at once
+            poll_interval: Seconds to sleep while waiting for both sources
+            wav: Opened output writer (e.g. a SegmentedWavWriter); opened
+                with open_audio_file on ``path`` if None
+            mixer: Block combiner (a BlockMixer with the master's channel
+                count if None); its channels and block_frames are used
+            stall_timeout: Seconds of master audio to wait for a second source
+                that falls behind before writing without it (None = wait forever)
+        """
+        self.path = path
+        self.poll_interval = poll_interval
+        self._first = first
+        self._second = second
+        self._reader = first.reader(from_start=True)
+        self._mixer = mixer or BlockMixer(first.channels, block_frames)
+        block_frames = self._mixer.block_frames
+        self._resampler = DriftResampler(second.channels, rate, block_frames)
+        # Room for a block at the largest step the resampler can choose
+        window_frames = int(block_frames * (1 + SampleRing.MAX_DRIFT + DriftResampler.MAX_SLEW)) + 4
+        self._window = np.zeros((window_frames, second.channels), dtype=np.int16)
+        self._silence = np.zeros((block_frames, second.channels), dtype=np.int16)
+        self._stall_frames = None if stall_timeout is None else int(stall_timeout * rate)
+        self.silent_frames = 0
+        self._wav = wav or open_audio_file(path, self._mixer.channels, sample_width, rate)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def frames_written(self) -> int:
+        return self._wav.frames_written
+
+    @property
+    def paths(self) -> List[str]:
+        return self._wav.paths
+
+    @property
+    def resyncs(self) -> int:
+        return self._resampler.resyncs
+
+    def _fetch(self, start: int, end: int) -> np.ndarray:
+        """Copy source frames ``[start, end)`` into the scratch window, zero-filling gaps."""
+        window = self._window[:end - start]
+        window.fill(0)
+        ring = self._second
+        lo = max(start, ring.frames_written - ring.capacity, 0)
+        offset = lo - start
+        for view in ring.views(lo, min(end, ring.frames_written)):
+            window[offset:offset + len(view)] = view
+            offset += len(view)
+        return window
+
+    def _align(self, a: np.ndarray):
+        """
+        The second source under the master frames of ``a``.
+
+        Returns:
+            tuple: ``(n, block)`` for the first ``n`` frames of ``a``; ``n`` is
+            0 while the second source has not covered them yet
+        """
+        second = self._second
+        if not second.frames_written:
+            return 0, None
+        if second.first_timestamp is not None and second.clock() is None:
+            # A new stream was opened and has not delivered its first chunk yet
+            return 0, None
+        offset, ratio = speaker_alignment(self._first, second)
+        target = offset + ratio * self._reader.position
+        segment_start = second.segment_start
+        if segment_start and target < segment_start:
+            # The second source was not capturing before its current stream started
+            n = min(len(a), int(math.ceil((segment_start - target) / ratio)))
+            self.silent_frames += n
+            return n, self._silence[:n]
+        step = self._resampler.plan(target, ratio)
+        n = self._resampler.frames_until(step, second.frames_written, len(a))
+        if n == 0:
+            return 0, None
+        start, end = self._resampler.span(step, n)
+        return n, self._resampler.resample(self._fetch(start, end), step, n)
+
+    def _mix_available(self, flush: bool = False) -> int:
+        """
+        Mix every master frame the second source can already cover. Returns frames written.
+
+        Frames the second source holds back for more than the stall timeout,
+        or all remaining ones with ``flush``, are written with silence for it.
+        """
+        total = 0
+        while True:
+            views = self._reader.peek(self._mixer.block_frames)
+            if not views:
+                return total
+            a = views[0]
+
+            n, b = self._align(a)
+            if n == 0:
+                pending = self._first.frames_written - self._reader.position
+                if not (flush or (self._stall_frames is not None and pending > self._stall_frames)):
+                    return total
+                # The second source stopped delivering; keep writing the master
+                n, b = len(a), self._silence[:len(a)]
+                self.silent_frames += n
+            try:
+                self._wav.write(self._mixer.mix(a[:n], b))
+            except Exception as e:
+                logger.error(f"Error writing merged audio to {self.path}: {e}")
+            self._reader.advance(n)
+            total += n
+
+    def _run(self):
+        """Mixer thread: mix aligned blocks until close() is requested."""
+        while not self._stop.is_set():
+            if not self._mix_available():
+                self._stop.wait(self.poll_interval)
+        # With a stall timeout nothing of the master is left behind
+        self._mix_available(flush=self._stall_frames is not None)
+
+    def close(self):
+        """Mix the remaining aligned frames, patch the WAV header and close the file."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        self._wav.close()
+
+
+def read_session_view(path: str, view: str, block_frames: int = DEFAULT_BLOCK_FRAMES) -> Iterator[np.ndarray]:
+    """
+    Derive a mono view of an interleaved session track block by block.
+
+    Nothing is written: 'microphone' and 'speaker' are the left and right
+    channel, 'merged' is their average (as the separate layout mixes it).
+
+    Args:
+        path: 2-channel 16-bit session WAV (or RF64)
+        view: One of SESSION_VIEWS
+        block_frames: Frames per yielded block
+
+    Yields:
+        np.ndarray: ``(frames, 1)`` int16 blocks
+    """
+    if view not in SESSION_VIEWS:
+        raise ValueError(f"view must be one of {SESSION_VIEWS}")
+    with WavReader(path) as wf:
+        if wf.getnchannels() != 2 or wf.getsampwidth() != 2:
+            raise ValueError(f"{path} is not a 2-channel 16-bit session track")
+        mixer = BlockMixer(1, block_frames)
+        while True:
+            block = np.frombuffer(wf.readframes(block_frames), dtype=np.int16).reshape(-1, 2)
+            if not len(block):
+                return
+            if view == 'merged':
+                yield mixer.mix(block[:, :1], block[:, 1:]).copy()
+            else:
+                yield block[:, :1] if view == 'microphone' else block[:, 1:]
+
+
+def export_session_view(path: str, view: str, output_path: str,
+                        block_frames: int = DEFAULT_BLOCK_FRAMES) -> int:
+    """
+    Write a view of an interleaved session track to a mono audio file.
+
+    Args:
+        path: 2-channel 16-bit session WAV (or RF64)
+        view: One of SESSION_VIEWS
+        output_path: File to create (.wav, .flac or .opus, see open_audio_file)
+        block_frames: Frames processed per block
+
+    Returns:
+        int: Number of frames written
+    """
+    with WavReader(path) as wf:
+        rate = wf.getframerate()
+    out = open_audio_file(output_path, 1, 2, rate)
+    try:
+        for block in read_session_view(path, view, block_frames):
+            out.write(np.ascontiguousarray(block))
+    finally:
+        out.close()
+    return out.frames_written
@@ -0,0 +1,151 @@
+"""Mux a session's video and audio tracks into a single file."""
+import logging
+import os
+import shutil
+import subprocess
+from typing import List, Optional
+
+import cv2
+
+from .ffmpeg import find_ffmpeg
+from .video_writer import VideoEncoder, open_video_writer
+
+logger = logging.getLogger(__name__)
+
+# Containers mux_session() can write
+MUX_FORMATS = ('mkv', 'mp4')
+
+
+def find_mkvmerge() -> Optional[str]:
+    """Path of the mkvmerge executable on PATH, or None if it is not installed."""
+    return shutil.which('mkvmerge')
+
+
+class AudioTrack:
+    """
+    An audio file to mux and where it sits on the video's timeline.
+
+    Attributes:
+        path: Audio file path
+        offset: Seconds between video frame 0 and the first audio sample
+            (negative if the audio started before the video)
+        title: Track title shown by players
+    """
+    def __init__(self, path: str, offset: float = 0.0, title: Optional[str] = None):
+        self.path = path
+        self.offset = offset
+        self.title = title or os.path.splitext(os.path.basename(path))[0]
+
+
+def read_timestamps(path: str) -> List[float]:
+    """Frame times in seconds from a "timestamp format v2" sidecar."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [float(line) / 1000 for line in f if line.strip() and not line.startswith('#')]
+
+
+def retime_vfr_video(video: str, timestamps: str, output: str, fps: float) -> bool:
+    """
+    Re-encode a variable frame rate video as constant frame rate.
+
+    Each frame is placed at the time recorded in the sidecar, duplicating it
+    until the next one, so the result plays in sync without the sidecar.
+    """
+    times = read_timestamps(timestamps)
+    cap = cv2.VideoCapture(video)
+    size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    encoder = VideoEncoder(output, fps, size, None, start_time=0.0,
+                           writer=open_video_writer(output, fps, size))
+    try:
+        for timestamp in times:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            encoder.submit(timestamp, cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA))
+    finally:
+        cap.release()
+        encoder.close()
+    return encoder.frames_written > 0
+
+
+def _mux_mkvmerge(output: str, video: str, tracks: List[AudioTrack], timestamps: str) -> bool:
+    command = [find_mkvmerge(), '--quiet', '-o', output, '--timestamps', f'0:{timestamps}', video]
+    for track in tracks:
+        command += ['--sync', f'0:{round(track.offset * 1000)}', '--track-name', f'0:{track.title}', track.path]
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    # mkvmerge exits with 1 for warnings only
+    if result.returncode > 1:
+        logger.error(f"mkvmerge failed writing {output}: {result.stdout.decode(errors='replace').strip()}")
+        return False
+    return True
+
+
+def _mux_ffmpeg(output: str, video: str, tracks: List[AudioTrack], container: str) -> bool:
+    ffmpeg = find_ffmpeg()
+    if not ffmpeg:
+        logger.error("ffmpeg not found on PATH, cannot mux the session")
+        return False
+    command = [ffmpeg, '-hide_banner', '-loglevel', 'error', '-y', '-i', video]
+    for track in tracks:
+        if track.offset >= 0:
+            command += ['-itsoffset', f'{track.offset:.6f}']
+        else:
+            # Audio started first: skip the part before video frame 0
+            command += ['-ss', f'{-track.offset:.6f}']
+        command += ['-i', track.path]
+    command += ['-map', '0:v']
+    for i, track in enumerate(tracks):
+        command += ['-map', f'{i + 1}:a', f'-metadata:s:a:{i}', f'title={track.title}',
+                    f'-metadata:s:a:{i}', f'handler_name={track.title}']
+    # Video is always copied; MP4 cannot carry PCM, so audio is encoded to AAC there
+    command += ['-c:v', 'copy', '-c:a', 'copy' if container == 'mkv' else 'aac']
+    if container == 'mp4':
+        command += ['-b:a', '192k', '-movflags', '+faststart']
+    command.append(output)
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode:
+        logger.error(f"ffmpeg failed writing {output}: {result.stderr.decode(errors='replace').strip()}")
+        return False
+    return True
+
+
+def mux_session(output: str,
+                video: str,
+                tracks: List[AudioTrack],
+                video_timestamps: Optional[str] = None,
+                fps: float = 10.0) -> bool:
+    """
+    Combine a session's video and audio tracks into one MKV or MP4 file.
+
+    Streams are copied rather than re-encoded where the container allows
+    (PCM audio is encoded to AAC for MP4), and each audio track is shifted by
+    its offset so all tracks share the video's timeline. A variable frame
+    rate video is muxed with its timestamps by mkvmerge when writing MKV;
+    otherwise it is first re-encoded at constant frame rate.
+
+    Args:
+        output: Output path; the extension (.mkv or .mp4) selects the container
+        video: Video file
+        tracks: Audio tracks, the first one becomes the default track
+        video_timestamps: Timestamp sidecar of a variable frame rate video
+        fps: Frame rate used when re-encoding a variable frame rate video
+
+    Returns:
+        bool: Whether ``output`` was written
+    """
+    container = os.path.splitext(output)[1].lstrip('.').lower()
+    if container not in MUX_FORMATS:
+        raise ValueError(f"Unsupported container: {container}")
+    if video_timestamps and container == 'mkv' and find_mkvmerge():
+        return _mux_mkvmerge(output, video, tracks, video_timestamps)
+    if not video_timestamps:
+        return _mux_ffmpeg(output, video, tracks, container)
+
+    retimed = os.path.splitext(output)[0] + '_cfr' + os.path.splitext(video)[1]
+    try:
+        if not retime_vfr_video(video, video_timestamps, retimed, fps):
+            logger.error(f"Could not re-time {video}")
+            return False
+        return _mux_ffmpeg(output, retimed, tracks, container)
+    finally:
+        if os.path.exists(retimed):
+            os.remove(retimed)
@@ -0,0 +1,232 @@
+"""Recover the files of a session that was interrupted by a crash."""
+import glob
+import logging
+import os
+import struct
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+
+from .audio_writer import MAX_RIFF_SIZE, WAV_HEADER_SIZE, WavReader, wav_header
+from .ffmpeg import find_ffmpeg
+from .mux import read_timestamps
+from .segments import SEGMENT_INDEX_NAME, SegmentIndex
+from .video_writer import timestamps_path
+
+logger = logging.getLogger(__name__)
+
+# Outcomes reported for each file
+OK = 'ok'
+REPAIRED = 'repaired'
+FAILED = 'failed'
+
+
+def repair_wav(path: str) -> str:
+    """
+    Fix the sizes in the header of a WAV file that was not finalized.
+
+    Everything after the data chunk header is taken as audio (a trailing
+    partial frame is cut off), so only the header is rewritten. Files with
+    the layout WavStreamWriter writes get a complete new header, as RF64 if
+    the audio passed 4 GB.
+
+    Returns:
+        str: OK if the header was already right, REPAIRED or FAILED
+    """
+    file_size = os.path.getsize(path)
+    with open(path, 'r+b') as f:
+        head = f.read(12)
+        if len(head) < 12 or head[:4] not in (b'RIFF', b'RF64') or head[8:] != b'WAVE':
+            logger.error(f"{path} is not a WAV file")
+            return FAILED
+        position = 12
+        fmt = None
+        while True:
+            f.seek(position)
+            header = f.read(8)
+            if len(header) < 8:
+                logger.error(f"{path} has no data chunk")
+                return FAILED
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                fmt = struct.unpack('<HHIIHH', f.read(16))
+            if chunk_id == b'data':
+                break
+            position += 8 + chunk_size + (chunk_size & 1)
+        if not fmt:
+            logger.error(f"{path} has no format chunk")
+            return FAILED
+        _, channels, rate, _, block_align, bits = fmt
+
+        data_start = position + 8
+        data_bytes = file_size - data_start
+        data_bytes -= data_bytes % block_align
+        f.seek(0)
+        current = f.read(data_start)
+        if data_start == WAV_HEADER_SIZE and current[12:16] in (b'JUNK', b'ds64'):
+            header = wav_header(channels, bits // 8, rate, data_bytes)
+        elif data_start - 8 + data_bytes + (data_bytes & 1) <= MAX_RIFF_SIZE:
+            # Some other layout: patch the two sizes in place
+            header = bytearray(current)
+            struct.pack_into('<I', header, 4, data_start - 8 + data_bytes + (data_bytes & 1))
+            struct.pack_into('<I', header, position + 4, data_bytes)
+            header = bytes(header)
+        else:
+            logger.error(f"{path} holds more than 4 GB of audio but has no room for an RF64 header")
+            return FAILED
+        if header == current and file_size == data_start + data_bytes + (data_bytes & 1):
+            return OK
+        f.seek(0)
+        f.write(header)
+        f.truncate(data_start + data_bytes)
+        if data_bytes & 1:
+            f.seek(0, os.SEEK_END)
+            f.write(b'\x00')
+    logger.info(f"Repaired WAV header of {path} ({data_bytes // block_align} frames)")
+    return REPAIRED
+
+
+def mp4_boxes(path: str) -> Tuple[List[str], bool]:
+    """
+    Top-level box types of an MP4 file, read from the box headers only.
+
+    Returns:
+        tuple: ``(types, complete)`` where ``complete`` is False if the last
+        box is cut off
+    """
+    file_size = os.path.getsize(path)
+    boxes = []
+    position = 0
+    with open(path, 'rb') as f:
+        while position + 8 <= file_size:
+            f.seek(position)
+            size, kind = struct.unpack('>I4s', f.read(8))
+            if size == 1:
+                size = struct.unpack('>Q', f.read(8))[0]
+            elif size == 0:
+                size = file_size - position
+            if size < 8:
+                return boxes, False
+            boxes.append(kind.decode('latin-1'))
+            position += size
+    return boxes, position == file_size
+
+
+def repair_mp4(path: str) -> str:
+    """
+    Rebuild the index of an MP4 file that was not finalized.
+
+    A fragmented MP4 cut off mid-fragment is remuxed with ffmpeg stream copy
+    (one pass over the file, no re-encoding) into a regular MP4 that keeps
+    every complete fragment. A non-fragmented MP4 without its index cannot
+    be recovered this way.
+
+    Returns:
+        str: OK if the file was complete, REPAIRED or FAILED
+    """
+    boxes, complete = mp4_boxes(path)
+    if not boxes or boxes[0] != 'ftyp':
+        logger.error(f"{path} is not an MP4 file")
+        return FAILED
+    if complete and 'moov' in boxes:
+        return OK
+    if 'moof' not in boxes:
+        logger.error(f"{path} was not written as fragmented MP4 and lost its index; "
+                     f"it can only be recovered by re-encoding (e.g. with untrunc)")
+        return FAILED
+    ffmpeg = find_ffmpeg()
+    if not ffmpeg:
+        logger.error(f"ffmpeg not found on PATH, cannot repair {path}")
+        return FAILED
+    root, ext = os.path.splitext(path)
+    repaired = f"{root}.repaired{ext}"
+    result = subprocess.run(
+        [ffmpeg, '-hide_banner', '-loglevel', 'error', '-y', '-i', path, '-c', 'copy', repaired],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    if not os.path.exists(repaired) or not mp4_boxes(repaired)[1]:
+        logger.error(f"ffmpeg failed repairing {path}: {result.stderr.decode(errors='replace').strip()}")
+        if os.path.exists(repaired):
+            os.remove(repaired)
+        return FAILED
+    os.replace(repaired, path)
+    logger.info(f"Rebuilt the index of {path}")
+    return REPAIRED
+
+
+def _duration(path: str) -> Optional[float]:
+    """Length in seconds of a recorded WAV or video file."""
+    try:
+        if path.lower().endswith('.wav'):
+            with WavReader(path) as wf:
+                return wf.getnframes() / wf.getframerate()
+        timestamps = timestamps_path(path)
+        if os.path.exists(timestamps):
+            times = read_timestamps(timestamps)
+            return times[-1] if times else 0.0
+        cap = cv2.VideoCapture(path)
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            return cap.get(cv2.CAP_PROP_FRAME_COUNT) / fps if fps else None
+        finally:
+            cap.release()
+    except Exception as e:
+        logger.debug(f"Could not read the length of {path}: {e}")
+        return None
+
+
+def repair_segment_index(path: str) -> str:
+    """
+    Complete the segment index of an interrupted session.
+
+    Segments that were still open get their end time from the length of
+    their (repaired) file, and the index is marked complete.
+
+    Returns:
+        str: OK if the index was already complete, REPAIRED or FAILED
+    """
+    try:
+        index = SegmentIndex.load(path)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not read segment index {path}: {e}")
+        return FAILED
+    if index.complete:
+        return OK
+    folder = os.path.dirname(path)
+    for entry in index.segments():
+        if entry['end'] is not None:
+            continue
+        duration = _duration(os.path.join(folder, entry['file']))
+        if duration is not None:
+            index.closed(entry['track'], entry['index'], entry['start'] + duration)
+    index.finish()
+    logger.info(f"Completed segment index {path}")
+    return REPAIRED
+
+
+def repair_session(folder: str) -> Dict[str, str]:
+    """
+    Repair every recording file of a session folder in place.
+
+    WAV headers are patched, fragmented MP4 files get a rebuilt index and
+    the segment index (if any) is completed. Files that are already fine are
+    left untouched, so running it on a healthy session is harmless.
+
+    Args:
+        folder: Session folder
+
+    Returns:
+        dict: Outcome (OK, REPAIRED or FAILED) by file path
+    """
+    if not os.path.isdir(folder):
+        raise FileNotFoundError(f"No such session folder: {folder}")
+    results = {}
+    for path in sorted(glob.glob(os.path.join(folder, '*.wav'))):
+        results[path] = repair_wav(path)
+    for path in sorted(glob.glob(os.path.join(folder, '*.mp4'))):
+        results[path] = repair_mp4(path)
+    index_path = os.path.join(folder, SEGMENT_INDEX_NAME)
+    if os.path.exists(index_path):
+        results[index_path] = repair_segment_index(index_path)
+    return results
@@ -0,0 +1,287 @@
+"""Preallocated ring buffers that hand captured audio from capture to consumers."""
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+class SampleRing:
+    """
+    Contiguous, preallocated int16 ring of interleaved audio frames.
+
+    A single producer (an audio callback) copies each chunk straight into the
+    preallocated array; nothing is allocated on the capture path. Any number of
+    consumers (writers, mixers, level meters) attach a RingReader and get
+    zero-copy ndarray views of the frames they have not consumed yet.
+
+    ``frames_written`` is a running sample counter: it only grows and is
+    published after the data is in place, so readers never see partial chunks.
+    The producer never waits for readers; a reader that falls more than
+    ``capacity`` frames behind loses the overwritten frames (see RingReader).
+
+    Each timestamped chunk also records a ``(start frame, monotonic time)``
+    stamp in small preallocated tables, from which clock() estimates the
+    device's real sample rate and the monotonic time of frame 0. Two devices
+    nominally running at the same rate can then be aligned sample-accurately.
+
+    Attributes:
+        capacity: Number of frames held before the oldest are overwritten
+        channels: Interleaved channels per frame
+        rate: Nominal sample rate in Hz (None disables clock estimation)
+        frames_written: Total frames ever written
+        first_timestamp: Monotonic time of the first chunk (None until written)
+        last_timestamp: Monotonic time of the most recent chunk
+        overruns: Frames lost by readers that fell behind
+    """
+    # Stamps kept from the start and the end of the current clock segment
+    STAMP_WINDOW = 32
+    # Measure the real rate only once stamps span this many seconds
+    MIN_CLOCK_SPAN = 10.0
+    # Largest believable deviation from the nominal rate (5000 ppm)
+    MAX_DRIFT = 0.005
+
+    def __init__(self, capacity: int, channels: int = 1, dtype=np.int16, rate: Optional[int] = None):
+        """
+        Args:
+            capacity: Ring size in frames
+            channels: Interleaved channels per frame
+            dtype: Sample type (int16 for paInt16 capture)
+            rate: Nominal sample rate in Hz, used for clock estimation
+        """
+        self.capacity = capacity
+        self.channels = channels
+        self.dtype = np.dtype(dtype)
+        self.rate = rate
+        self.frames_written = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.overruns = 0
+        self._buffer = np.zeros((capacity, channels), dtype=self.dtype)
+        self._early_stamps = np.zeros((self.STAMP_WINDOW, 2), dtype=np.float64)
+        self._recent_stamps = np.zeros((self.STAMP_WINDOW, 2), dtype=np.float64)
+        self._early_count = 0
+        self._recent_count = 0
+        # (start frame, origin, rate) of every finished clock segment
+        self._segments = []
+
+    @classmethod
+    def for_duration(cls, seconds: float, rate: int, channels: int = 1, dtype=np.int16) -> "SampleRing":
+        """Create a ring holding ``seconds`` of audio at ``rate``."""
+        return cls(max(1, int(seconds * rate)), channels, dtype, rate=rate)
+
+    def write(self, data, timestamp: Optional[float] = None) -> int:
+        """
+        Copy a chunk of interleaved samples into the ring (producer side).
+
+        Args:
+            data: bytes or any buffer of interleaved samples
+            timestamp: Monotonic capture time of the chunk's first frame
+
+        Returns:
+            int: Number of frames written
+        """
+        samples = np.frombuffer(data, dtype=self.dtype).reshape(-1, self.channels)
+        n = len(samples)
+        if n > self.capacity:
+            # Only the newest ``capacity`` frames can survive anyway
+            self.frames_written += n - self.capacity
+            samples = samples[-self.capacity:]
+            n = self.capacity
+
+        start = self.frames_written % self.capacity
+        first = min(n, self.capacity - start)
+        self._buffer[start:start + first] = samples[:first]
+        if first < n:
+            self._buffer[:n - first] = samples[first:]
+
+        if timestamp is not None:
+            if self.first_timestamp is None:
+                self.first_timestamp = timestamp
+            self.last_timestamp = timestamp
+            self._record_stamp(self.frames_written, timestamp)
+        # Publish only after the data is in place
+        self.frames_written += n
+        return n
+
+    def write_silence(self, frames: int) -> int:
+        """
+        Append ``frames`` frames of silence, e.g. for audio lost to an input overflow.
+
+        Zeroes the ring in place, so the frames that follow keep their position
+        on the capture timeline without allocating on the capture path.
+
+        Returns:
+            int: Number of frames appended
+        """
+        if frames <= 0:
+            return 0
+        n = min(frames, self.capacity)
+        # Only the newest ``capacity`` frames can survive anyway
+        start = (self.frames_written + frames - n) % self.capacity
+        first = min(n, self.capacity - start)
+        self._buffer[start:start + first] = 0
+        if first < n:
+            self._buffer[:n - first] = 0
+        self.frames_written += frames
+        return frames
+
+    def _record_stamp(self, frame: int, timestamp: float):
+        """Remember when ``frame`` was captured (single row assignments, no allocation)."""
+        if self._early_count < self.STAMP_WINDOW:
+            self._early_stamps[self._early_count] = (frame, timestamp)
+            self._early_count += 1
+        self._recent_stamps[self._recent_count % self.STAMP_WINDOW] = (frame, timestamp)
+        self._recent_count += 1
+
+    def mark_discontinuity(self):
+        """
+        Start a new clock segment, e.g. after the device was switched.
+
+        Frames keep their running indices; only the clock model is re-anchored
+        at the next chunk, so a capture gap shows up as a jump in time_of().
+        The clock of the finished segment is kept for clock_segments().
+        """
+        segment = self._segment_clock()
+        if segment is not None:
+            self._segments.append(segment)
+        self._early_count = 0
+        self._recent_count = 0
+
+    def clock(self) -> Optional[Tuple[float, float]]:
+        """
+        Estimate the capture clock of this ring.
+
+        Callback timestamps include scheduling jitter, so among the first and the
+        most recent stamps the one closest to the nominal clock (the smallest
+        delay) is used as an anchor. The measured rate is the frame distance
+        between the anchors over their time distance.
+
+        Returns:
+            tuple: ``(origin, rate)`` so that frame ``f`` was captured at
+            ``origin + f / rate``, or None if no timestamps are known yet
+        """
+        if not self._early_count or not self.rate:
+            return None
+        early = self._early_stamps[:self._early_count]
+        recent = self._recent_stamps[:min(self._recent_count, self.STAMP_WINDOW)]
+        first = early[np.argmin(early[:, 1] - early[:, 0] / self.rate)]
+        last = recent[np.argmin(recent[:, 1] - recent[:, 0] / self.rate)]
+
+        rate = float(self.rate)
+        span = last[1] - first[1]
+        if span >= self.MIN_CLOCK_SPAN and last[0] > first[0]:
+            measured = (last[0] - first[0]) / span
+            rate = min(max(measured, rate * (1 - self.MAX_DRIFT)), rate * (1 + self.MAX_DRIFT))
+        return float(first[1] - first[0] / rate), rate
+
+    @property
+    def segment_start(self) -> int:
+        """Frame where the current clock segment starts (0 until its first timestamped chunk)."""
+        return int(self._early_stamps[0, 0]) if self._early_count else 0
+
+    def _segment_clock(self) -> Optional[Tuple[int, float, float]]:
+        """``(start frame, origin, rate)`` of the current clock segment, if stamped."""
+        clock = self.clock()
+        if clock is None:
+            return None
+        return self.segment_start, clock[0], clock[1]
+
+    def clock_segments(self) -> List[Tuple[int, float, float]]:
+        """
+        Clock of every segment recorded so far, oldest first.
+
+        clock() only describes the current segment; frames captured before a
+        mark_discontinuity() follow the clock of their own segment.
+
+        Returns:
+            list: ``(start_frame, origin, rate)`` per segment; frame ``f`` of
+            a segment was captured at ``origin + f / rate``
+        """
+        segments = list(self._segments)
+        current = self._segment_clock()
+        if current is not None:
+            segments.append(current)
+        return segments
+
+    def time_of(self, frame: float) -> Optional[float]:
+        """Monotonic capture time of ``frame`` according to clock()."""
+        clock = self.clock()
+        if clock is None:
+            return None
+        origin, rate = clock
+        return origin + frame / rate
+
+    def frame_at(self, timestamp: float) -> Optional[float]:
+        """Fractional frame index captured at monotonic ``timestamp``."""
+        clock = self.clock()
+        if clock is None:
+            return None
+        origin, rate = clock
+        return (timestamp - origin) * rate
+
+    def views(self, start_frame: int, end_frame: int) -> List[np.ndarray]:
+        """
+        Zero-copy views of frames ``[start_frame, end_frame)``.
+
+        Returns one view, or two when the range wraps around the end of the
+        buffer. The caller is responsible for staying within ``capacity``.
+        """
+        if end_frame <= start_frame:
+            return []
+        start = start_frame % self.capacity
+        end = start + (end_frame - start_frame)
+        if end <= self.capacity:
+            return [self._buffer[start:end]]
+        return [self._buffer[start:], self._buffer[:end - self.capacity]]
+
+    def latest(self, frames: int) -> List[np.ndarray]:
+        """Zero-copy views of the most recent ``frames`` frames (e.g. for level meters)."""
+        end = self.frames_written
+        start = max(end - min(frames, self.capacity), 0)
+        return self.views(start, end)
+
+    def reader(self, from_start: bool = False) -> "RingReader":
+        """
+        Attach a new consumer.
+
+        Args:
+            from_start: Start at frame 0 (or the oldest retained frame) instead
+                of the current write position
+        """
+        return RingReader(self, 0 if from_start else None)
+
+
+class RingReader:
+    """
+    Independent read cursor over a SampleRing.
+
+    Attributes:
+        ring: The ring being consumed
+        position: Absolute frame index of the next unread frame
+        lost_frames: Frames overwritten before this reader consumed them
+    """
+    def __init__(self, ring: SampleRing, position: Optional[int] = None):
+        self.ring = ring
+        self.position = ring.frames_written if position is None else position
+        self.lost_frames = 0
+
+    def available(self) -> int:
+        """Number of unread frames, after skipping any that were overwritten."""
+        behind = self.ring.frames_written - self.position
+        if behind > self.ring.capacity:
+            lost = behind - self.ring.capacity
+            self.position += lost
+            self.lost_frames += lost
+            self.ring.overruns += lost
+            behind = self.ring.capacity
+        return behind
+
+    def peek(self, max_frames: Optional[int] = None) -> List[np.ndarray]:
+        """Zero-copy views of unread frames without consuming them."""
+        count = self.available()
+        if max_frames is not None:
+            count = min(count, max_frames)
+        return self.ring.views(self.position, self.position + count)
+
+    def advance(self, frames: int):
+        """Mark ``frames`` frames as consumed."""
+        self.position += frames
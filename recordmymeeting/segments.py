@@ -0,0 +1,119 @@
+"""Rolling segment files and the index that lists them."""
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Index file written into a segmented session folder
+SEGMENT_INDEX_NAME = "segments.json"
+
+
+def segment_path(path: str, index: int) -> str:
+    """Numbered file for segment ``index`` of ``path`` (``screen.mp4`` -> ``screen_0003.mp4``)."""
+    root, ext = os.path.splitext(path)
+    return f"{root}_{index:04d}{ext}"
+
+
+class SegmentIndex:
+    """
+    JSON index of the segment files of a session.
+
+    Every segment is listed when its file is opened and gets its end time
+    once it is closed, so tools can pick up finished segments while the
+    recording is still running. The file is replaced atomically on each
+    change and only lists files that exist, so after a crash it describes
+    every segment on disk.
+
+    Times are seconds from the session start (video frame 0).
+
+    Attributes:
+        path: JSON file backing the index
+        segment_seconds: Nominal segment length
+    """
+    def __init__(self, path: str, segment_seconds: float, started_at: Optional[datetime] = None):
+        self.path = path
+        self.segment_seconds = segment_seconds
+        self._lock = threading.Lock()
+        self._data = {
+            'started_at': (started_at or datetime.now()).isoformat(timespec='milliseconds'),
+            'segment_seconds': segment_seconds,
+            'complete': False,
+            'segments': [],
+        }
+        self._save()
+
+    @classmethod
+    def load(cls, path: str) -> "SegmentIndex":
+        """Open an existing index, e.g. to complete it after a crash."""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        index = cls.__new__(cls)
+        index.path = path
+        index.segment_seconds = data.get('segment_seconds')
+        index._lock = threading.Lock()
+        index._data = data
+        return index
+
+    def _save(self):
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Could not write segment index {self.path}: {e}")
+
+    def _find(self, track: str, index: int) -> Optional[Dict]:
+        for entry in self._data['segments']:
+            if entry['track'] == track and entry['index'] == index:
+                return entry
+        return None
+
+    def opened(self, track: str, index: int, path: str, start: float):
+        """
+        List a new segment file.
+
+        Args:
+            track: Track name ('screen', 'microphone', 'speaker', 'merged' or 'session')
+            index: Segment number within the track
+            path: Segment file path (stored relative to the index)
+            start: Seconds from the session start to the segment's first frame
+        """
+        with self._lock:
+            self._data['segments'].append({
+                'track': track,
+                'index': index,
+                'file': os.path.relpath(path, os.path.dirname(self.path)),
+                'start': round(start, 6),
+                'end': None,
+            })
+            self._save()
+
+    def closed(self, track: str, index: int, end: float):
+        """Record that a segment file is complete and ends at ``end`` seconds."""
+        with self._lock:
+            entry = self._find(track, index)
+            if entry is None:
+                return
+            entry['end'] = round(end, 6)
+            self._save()
+
+    @property
+    def complete(self) -> bool:
+        return bool(self._data.get('complete'))
+
+    def finish(self):
+        """Mark the session as complete (every listed segment is final)."""
+        with self._lock:
+            self._data['complete'] = True
+            self._save()
+
+    def segments(self, track: Optional[str] = None) -> List[Dict]:
+        """Listed segments, optionally only those of ``track``."""
+        with self._lock:
+            return [dict(entry) for entry in self._data['segments']
+                    if track is None or entry['track'] == track]
@@ -0,0 +1,381 @@
+"""Deterministic simulated audio and screen backends for hardware-free testing."""
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pyaudio
+
+from .backends import AudioBackend, ScreenBackend
+
+logger = logging.getLogger(__name__)
+
+HOST_API_NAME = 'Simulated'
+
+
+class SimulatedDevice:
+    """
+    A simulated audio input device.
+
+    Attributes:
+        name: Device name
+        channels: Input channels
+        rate: Nominal sample rate in Hz
+        signal: 'tone', 'noise' or 'silence'
+        frequency: Tone frequency in Hz
+        amplitude: Peak amplitude (0.0-1.0)
+        drift_ppm: Clock error; the device really runs at rate * (1 + drift_ppm / 1e6)
+        overflow_every: Drop one chunk and flag paInputOverflow every N chunks (0 = never)
+        stall_every: Stop delivering audio every N seconds (0 = never)
+        stall_duration: Seconds each stall lasts; the audio is lost and flagged as overflow
+        is_output: Whether the device is an output that can be captured (loopback)
+        seed: Seed for the noise generator
+    """
+    def __init__(self,
+                 name: str,
+                 channels: int = 1,
+                 rate: int = 44100,
+                 signal: str = 'tone',
+                 frequency: float = 440.0,
+                 amplitude: float = 0.3,
+                 drift_ppm: float = 0.0,
+                 overflow_every: int = 0,
+                 stall_every: float = 0.0,
+                 stall_duration: float = 0.0,
+                 is_output: bool = False,
+                 seed: int = 0):
+        self.name = name
+        self.channels = channels
+        self.rate = rate
+        self.signal = signal
+        self.frequency = frequency
+        self.amplitude = amplitude
+        self.drift_ppm = drift_ppm
+        self.overflow_every = overflow_every
+        self.stall_every = stall_every
+        self.stall_duration = stall_duration
+        self.is_output = is_output
+        self.seed = seed
+
+    @property
+    def actual_rate(self) -> float:
+        return self.rate * (1 + self.drift_ppm / 1e6)
+
+    def generate(self, start_sample: int, frames: int, channels: int) -> bytes:
+        """Samples ``[start_sample, start_sample + frames)`` as interleaved int16 bytes."""
+        if self.signal == 'noise':
+            rng = np.random.default_rng((self.seed, start_sample))
+            mono = rng.normal(0.0, self.amplitude / 3, frames)
+        elif self.signal == 'tone':
+            t = (start_sample + np.arange(frames)) / self.actual_rate
+            mono = self.amplitude * np.sin(2 * np.pi * self.frequency * t)
+        else:
+            mono = np.zeros(frames)
+        samples = np.clip(mono * 32767, -32768, 32767).astype(np.int16)
+        return np.repeat(samples[:, None], channels, axis=1).tobytes()
+
+
+class SimulatedAudioBackend(AudioBackend):
+    """
+    Audio backend producing deterministic signals on a simulated clock.
+
+    Time runs ``speed`` times faster than the wall clock, so a pipeline can be
+    load-tested faster than real time; captured chunks are timestamped with
+    the simulated clock. Hot-plug events add or remove devices at given
+    simulated times.
+
+    Attributes:
+        devices: Devices present at start
+        speed: Simulated seconds per wall-clock second
+        hotplug: ``(time, 'add' | 'remove', device)`` events, time in simulated seconds
+    """
+    name = 'simulated'
+
+    def __init__(self,
+                 devices: Optional[List[SimulatedDevice]] = None,
+                 speed: float = 1.0,
+                 hotplug: Optional[List[Tuple[float, str, SimulatedDevice]]] = None):
+        if devices is None:
+            devices = [
+                SimulatedDevice('Simulated Microphone', frequency=440.0),
+                SimulatedDevice('Simulated Speaker Output', frequency=660.0, is_output=True),
+            ]
+        self.devices = list(devices)
+        self.speed = speed
+        self.hotplug = sorted(hotplug or [], key=lambda event: event[0])
+        self._start = time.monotonic()
+
+    @property
+    def time_scale(self) -> float:
+        return self.speed
+
+    def monotonic(self) -> float:
+        return self._start + (time.monotonic() - self._start) * self.speed
+
+    def elapsed(self) -> float:
+        """Simulated seconds since the backend was created."""
+        return self.monotonic() - self._start
+
+    def sleep(self, seconds: float):
+        """Sleep for ``seconds`` of simulated time."""
+        if seconds > 0:
+            time.sleep(seconds / self.speed)
+
+    def present_devices(self) -> List[SimulatedDevice]:
+        """Devices present at the current simulated time, in index order."""
+        devices = list(self.devices)
+        now = self.elapsed()
+        for at, action, device in self.hotplug:
+            if at > now:
+                break
+            if action == 'add' and device not in devices:
+                devices.append(device)
+            elif action == 'remove' and device in devices:
+                devices.remove(device)
+        return devices
+
+    def create(self) -> "SimulatedAudioSession":
+        return SimulatedAudioSession(self)
+
+    def detect_devices(self, refresh: bool = False) -> Dict[str, Optional[Dict]]:
+        detected = {}
+        for index, device in enumerate(self.present_devices()):
+            role = 'speaker' if device.is_output else 'mic'
+            if role not in detected:
+                detected[role] = {'index': index, 'name': device.name, 'channels': device.channels}
+        return detected
+
+    def snapshot(self) -> Dict:
+        present = self.present_devices()
+        devices = [{
+            'index': index,
+            'name': device.name,
+            'host_api': HOST_API_NAME,
+            'input_channels': device.channels,
+            'output_channels': device.channels if device.is_output else 0,
+        } for index, device in enumerate(present)]
+        detected = self.detect_devices()
+        default_input = detected['mic']['index'] if 'mic' in detected else None
+        default_output = detected['speaker']['index'] if 'speaker' in detected else None
+        fingerprint = tuple(
+            (d['index'], d['name'], d['host_api'], d['input_channels'], d['output_channels'])
+            for d in devices
+        ) + (('defaults', default_input, default_output),)
+        return {
+            'fingerprint': fingerprint,
+            'devices': devices,
+            'default_input': default_input,
+            'default_output': default_output,
+        }
+
+
+class SimulatedAudioSession:
+    """PyAudio-compatible session over a SimulatedAudioBackend."""
+    def __init__(self, backend: SimulatedAudioBackend):
+        self.backend = backend
+
+    def _device(self, index: int) -> SimulatedDevice:
+        present = self.backend.present_devices()
+        if index is None or not 0 <= index < len(present):
+            raise IOError(f"Invalid device index {index}")
+        return present[index]
+
+    def get_device_count(self) -> int:
+        return len(self.backend.present_devices())
+
+    def get_device_info_by_index(self, index: int) -> Dict:
+        device = self._device(index)
+        return {
+            'index': index,
+            'name': device.name,
+            'hostApi': 0,
+            'maxInputChannels': device.channels,
+            'maxOutputChannels': device.channels if device.is_output else 0,
+            'defaultSampleRate': float(device.rate),
+        }
+
+    def get_host_api_info_by_index(self, index: int) -> Dict:
+        return {'index': 0, 'name': HOST_API_NAME}
+
+    def get_sample_size(self, format: int) -> int:
+        return pyaudio.get_sample_size(format)
+
+    def open(self, format=pyaudio.paInt16, channels=1, rate=44100, input=True,
+             input_device_index=None, frames_per_buffer=1024, stream_callback=None, **kwargs):
+        device = self._device(input_device_index)
+        if channels > device.channels:
+            raise IOError(f"Invalid number of channels for {device.name}")
+        if rate != device.rate:
+            raise IOError(f"Invalid sample rate {rate} for {device.name}")
+        return SimulatedStream(self.backend, device, channels, frames_per_buffer, stream_callback)
+
+    def terminate(self):
+        pass
+
+
+class SimulatedStream:
+    """
+    A simulated input stream in blocking or callback mode.
+
+    In callback mode a thread delivers one chunk per ``frames_per_buffer``
+    frames of simulated time, applying the device's drift, overflows and
+    stalls; the stream stops being active when its device is unplugged.
+    """
+    def __init__(self, backend: SimulatedAudioBackend, device: SimulatedDevice,
+                 channels: int, frames_per_buffer: int, callback=None):
+        self.backend = backend
+        self.device = device
+        self.channels = channels
+        self.frames_per_buffer = frames_per_buffer
+        self.callback = callback
+        self._sample = 0
+        self._active = False
+        self._thread = None
+
+    def start_stream(self):
+        if self.callback is None or self._active:
+            return
+        self._active = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        device = self.device
+        fpb = self.frames_per_buffer
+        start = self.backend.monotonic()
+        next_stall = device.stall_every
+        status = 0
+        chunk = 0
+        while self._active:
+            if device not in self.backend.present_devices():
+                logger.info(f"Simulated device unplugged: {device.name}")
+                break
+            due = start + (self._sample + fpb) / device.actual_rate
+            self.backend.sleep(due - self.backend.monotonic())
+
+            if device.stall_every and self.backend.monotonic() - start >= next_stall:
+                # The device stops delivering; the audio it would have produced is lost
+                self.backend.sleep(device.stall_duration)
+                self._sample += int(device.stall_duration * device.actual_rate)
+                next_stall += device.stall_every + device.stall_duration
+                status = pyaudio.paInputOverflow
+                continue
+
+            chunk += 1
+            if device.overflow_every and chunk % device.overflow_every == 0:
+                self._sample += fpb
+                status = pyaudio.paInputOverflow
+                continue
+
+            data = device.generate(self._sample, fpb, self.channels)
+            # Stream time of the chunk's first frame, as PortAudio reports it
+            time_info = {'input_buffer_adc_time': start + self._sample / device.actual_rate}
+            self._sample += fpb
+            self.callback(data, fpb, time_info, status)
+            status = 0
+        self._active = False
+
+    def is_active(self) -> bool:
+        return self._active
+
+    def read(self, frames: int, exception_on_overflow: bool = True) -> bytes:
+        data = self.device.generate(self._sample, frames, self.channels)
+        self._sample += frames
+        return data
+
+    def stop_stream(self):
+        self._active = False
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def close(self):
+        self.stop_stream()
+
+
+class SimulatedScreenBackend(ScreenBackend):
+    """
+    Screen backend producing synthetic BGRA frames.
+
+    Frames show a moving bar whose position follows ``clock``, so dropped or
+    duplicated frames are visible in the output. Pass the ``monotonic`` of a
+    SimulatedAudioBackend to move the content on the simulated clock. With
+    ``change_every`` set, content only changes every N seconds, mimicking a
+    static slide deck.
+
+    Attributes:
+        width: Width of each monitor in pixels
+        height: Height of each monitor in pixels
+        monitors: Number of side-by-side monitors
+        change_every: Seconds between content changes (0 = every frame)
+        clock: Monotonic clock the content follows (the wall clock if None)
+    """
+    name = 'simulated'
+
+    def __init__(self, width: int = 640, height: int = 360, monitors: int = 1,
+                 change_every: float = 0.0, clock: Optional[Callable[[], float]] = None):
+        self.width = width
+        self.height = height
+        self.monitors = monitors
+        self.change_every = change_every
+        self.clock = clock or time.monotonic
+
+    def open(self) -> "SimulatedScreen":
+        return SimulatedScreen(self)
+
+
+class SimulatedShot:
+    """mss.ScreenShot look-alike owning a BGRA pixel buffer."""
+    def __init__(self, raw: bytearray, width: int, height: int):
+        self.raw = raw
+        self.width = width
+        self.height = height
+        self.size = (width, height)
+
+    @property
+    def bgra(self) -> bytes:
+        return bytes(self.raw)
+
+    def __array__(self, dtype=None, copy=None):
+        frame = np.frombuffer(self.raw, dtype=np.uint8).reshape(self.height, self.width, 4)
+        return frame if dtype is None else frame.astype(dtype)
+
+
+class SimulatedScreen:
+    """mss.mss() look-alike over a SimulatedScreenBackend."""
+    def __init__(self, backend: SimulatedScreenBackend):
+        self.backend = backend
+        self._start = backend.clock()
+        total_width = backend.width * backend.monitors
+        self.monitors = [{'left': 0, 'top': 0, 'width': total_width, 'height': backend.height}]
+        for i in range(backend.monitors):
+            self.monitors.append({'left': i * backend.width, 'top': 0,
+                                  'width': backend.width, 'height': backend.height})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        pass
+
+    def grab(self, monitor: Dict) -> SimulatedShot:
+        elapsed = self.backend.clock() - self._start
+        if self.backend.change_every:
+            elapsed = int(elapsed / self.backend.change_every) * self.backend.change_every
+        width, height = monitor['width'], monitor['height']
+        # Like mss, every grab fills a new buffer owned by its screenshot
+        raw = bytearray(width * height * 4)
+        frame = np.frombuffer(raw, dtype=np.uint8).reshape(height, width, 4)
+        frame[...] = 32
+        frame[..., 3] = 255
+        # A bar sweeping across the captured area once every 4 seconds
+        x = int((elapsed / 4.0 % 1.0) * width)
+        frame[:, x:x + max(1, width // 50), :3] = (0, 200, 255)
+        # Vertical position encodes the monitor offset so regions are distinguishable
+        y = (monitor['left'] // 7) % max(1, height)
+        frame[y:y + max(1, height // 50), :, :3] = 255
+        return SimulatedShot(raw, width, height)
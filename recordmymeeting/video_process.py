@@ -0,0 +1,385 @@
+"""Screen encoding in worker processes fed through shared memory."""
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .ffmpeg import concat_videos, find_ffmpeg
+from .segments import segment_path
+from .video_writer import BLOCK, FrameChangeDetector, VideoEncoder, open_video_writer, timestamps_path
+
+logger = logging.getLogger(__name__)
+
+# Per-worker counters shared with the parent, in this order (see VideoEncoder.stats())
+_COUNTERS = ('frames_encoded', 'frames_duplicated', 'frames_dropped', 'frames_unchanged', 'frames_received')
+
+
+class SharedFrameRing:
+    """
+    Fixed number of BGRA frame slots in one shared memory block.
+
+    The parent copies each grabbed frame into a free slot and passes only the
+    slot number to a worker process, which reads the frame in place and hands
+    the slot back once it has been converted.
+
+    Attributes:
+        name: Shared memory block name (to attach from another process)
+        slots: Number of frame slots
+        shape: ``(height, width, 4)`` of each frame
+        frames: ``(slots, height, width, 4)`` uint8 view of the block
+    """
+    def __init__(self, slots: int, shape: Tuple[int, int, int], name: Optional[str] = None):
+        """
+        Args:
+            slots: Number of frame slots
+            shape: Frame shape
+            name: Attach to an existing block instead of creating one
+        """
+        self.slots = slots
+        self.shape = tuple(shape)
+        size = slots * int(np.prod(self.shape))
+        self._owner = name is None
+        self._shm = shared_memory.SharedMemory(name=name, create=self._owner, size=size)
+        self.name = self._shm.name
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self._shm.buf)
+
+    def close(self):
+        """Detach from the block, and free it if this process created it."""
+        # The view must go before the mapping can be closed
+        self.frames = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+def _encode_worker(worker_id: int, ring_name: str, slots: int, shape: Tuple[int, int, int],
+                   commands, free_slots, finished, counters, ready, options: Dict):
+    """
+    Worker process: encode the segments and frames sent on ``commands``.
+
+    Messages are ``('open', path, start_time)``, ``('frame', slot, timestamp)``,
+    ``('close', end_time)`` and ``('stop',)``. Every frame slot is returned on
+    ``free_slots`` as soon as the frame has been converted, and the path of
+    each closed segment is put on ``finished``. ``ready`` is set once the
+    worker is up.
+    """
+    ring = SharedFrameRing(slots, shape, name=ring_name)
+    ready.set()
+    encoder = None
+    base = worker_id * len(_COUNTERS)
+    # Totals of the segments already closed
+    done = dict.fromkeys(_COUNTERS, 0)
+
+    def publish():
+        current = encoder.stats() if encoder is not None else {}
+        for i, key in enumerate(_COUNTERS):
+            counters[base + i] = done[key] + current.get(key, 0)
+
+    try:
+        while True:
+            message = commands.get()
+            kind = message[0]
+            if kind == 'frame':
+                _, slot, timestamp = message
+                done['frames_received'] += 1
+                try:
+                    if encoder is not None:
+                        encoder.submit(timestamp, ring.frames[slot])
+                except Exception as e:
+                    logger.error(f"Error encoding video frame to {encoder.path}: {e}")
+                finally:
+                    free_slots.put(slot)
+            elif kind == 'open':
+                _, path, start_time = message
+                writer = open_video_writer(path, options['fps'], options['size'], options['grayscale'],
+                                           **options['writer'])
+                encoder = VideoEncoder(path, options['fps'], options['size'], None,
+                                       start_time=start_time,
+                                       change_detector=FrameChangeDetector() if options['vfr'] else None,
+                                       vfr=options['vfr'], grayscale=options['grayscale'], writer=writer)
+            elif kind == 'close':
+                if encoder is not None:
+                    encoder.close(message[1])
+                    for key, value in encoder.stats().items():
+                        done[key] += value
+                    finished.put(encoder.path)
+                    encoder = None
+            elif kind == 'stop':
+                break
+            publish()
+    finally:
+        if encoder is not None:
+            encoder.close()
+        ring.close()
+
+
+class ProcessVideoEncoder:
+    """
+    Encode screen frames in worker processes so the recorder process only captures.
+
+    Conversion and encoding run outside this interpreter, so they never hold
+    the GIL that the audio capture callbacks need. Grabbed frames are copied
+    once into a SharedFrameRing; only slot numbers cross the process
+    boundary. The interface matches VideoEncoder (put/close/stats).
+
+    With one worker the video is encoded straight into ``path``. With more,
+    the recording is cut into ``segment_seconds`` long segments handed to the
+    workers in turn, so several segments encode in parallel; close() joins
+    them with ffmpeg stream copy (without ffmpeg a single worker is used).
+    With ``keep_segments`` the segments are kept as numbered files instead
+    (see segments.segment_path), whatever the number of workers.
+
+    Attributes:
+        path: Output video file path
+        workers: Number of encoder processes
+        segment_seconds: Length of each segment when more than one worker is used
+        pushed: Frames handed to the workers
+        dropped: Frames discarded because every slot was busy (policy 'drop_oldest')
+        blocked: put() calls that had to wait for a free slot (policy 'block')
+    """
+    def __init__(self,
+                 path: str,
+                 fps: float,
+                 frame_shape: Tuple[int, int, int],
+                 size: Tuple[int, int],
+                 workers: int = 1,
+                 segment_seconds: float = 60.0,
+                 slots: Optional[int] = None,
+                 policy: str = 'drop_oldest',
+                 start_time: Optional[float] = None,
+                 vfr: bool = False,
+                 grayscale: bool = False,
+                 writer_options: Optional[Dict] = None,
+                 keep_segments: bool = False,
+                 on_segment_open: Optional[Callable[[int, str, float], None]] = None,
+                 on_segment_close: Optional[Callable[[int, str, float], None]] = None):
+        """
+        Create the shared frame ring and start the workers.
+
+        Args:
+            path: Output video file path
+            fps: Output frame rate
+            frame_shape: ``(height, width, 4)`` of the grabbed BGRA frames
+            size: ``(width, height)`` of the output video
+            workers: Number of encoder processes
+            segment_seconds: Segment length when more than one worker is used
+            slots: Frame slots in shared memory (default: 2 per worker + 2)
+            policy: 'drop_oldest' drops incoming frames while every slot is
+                busy (slots already handed to a worker cannot be reclaimed);
+                'block' waits for a free slot
+            start_time: Monotonic time of output frame 0 (now if None)
+            vfr: Skip unchanged frames and write a timestamp sidecar
+            grayscale: Encode a single luma channel
+            writer_options: Keyword arguments for open_video_writer()
+            keep_segments: Keep every segment as its own file instead of joining them
+            on_segment_open: Called with ``(index, path, start_time)`` when a segment is started
+            on_segment_close: Called with ``(index, path, end_time)`` once a worker
+                has finished a segment file (from put() or close())
+        """
+        if workers > 1 and not keep_segments and not find_ffmpeg():
+            logger.warning("ffmpeg not found, cannot join parallel segments; using one encoder process")
+            workers = 1
+        self.path = path
+        self.fps = fps
+        self.workers = max(1, workers)
+        self.segment_seconds = segment_seconds
+        self.policy = policy
+        self.start_time = time.monotonic() if start_time is None else start_time
+        self.vfr = vfr
+        self.keep_segments = keep_segments
+        self.on_segment_open = on_segment_open
+        self.on_segment_close = on_segment_close
+        self.pushed = 0
+        self.dropped = 0
+        self.blocked = 0
+        self._segment = None
+        self._parts: List[str] = []
+        # Segment index and end time of each part, by path
+        self._part_info: Dict[str, Tuple[int, Optional[float]]] = {}
+        self._closed = False
+        # Segments are cut on output frame boundaries so they join seamlessly
+        self._segment_frames = max(1, int(round(segment_seconds * fps)))
+
+        slots = slots or 2 * self.workers + 2
+        self.ring = SharedFrameRing(slots, frame_shape)
+        # spawn: forking a process that runs capture threads is unsafe
+        context = multiprocessing.get_context('spawn')
+        self._free = context.Queue()
+        for slot in range(slots):
+            self._free.put(slot)
+        self._finished = context.Queue()
+        self._counters = context.Array('q', self.workers * len(_COUNTERS), lock=False)
+        options = {'fps': fps, 'size': tuple(size), 'grayscale': grayscale, 'vfr': vfr,
+                   'writer': dict(writer_options or {})}
+        self._commands = []
+        self._processes = []
+        started = []
+        for worker_id in range(self.workers):
+            commands = context.Queue()
+            ready = context.Event()
+            process = context.Process(
+                target=_encode_worker,
+                args=(worker_id, self.ring.name, slots, self.ring.shape, commands,
+                      self._free, self._finished, self._counters, ready, options),
+                daemon=True,
+            )
+            process.start()
+            self._commands.append(commands)
+            self._processes.append(process)
+            started.append(ready)
+        # Spawning takes a moment; frames grabbed meanwhile would only be dropped
+        for ready in started:
+            if not ready.wait(30):
+                logger.warning("Video encoder process is slow to start")
+
+    def _part_path(self, index: int) -> str:
+        if self.keep_segments:
+            return segment_path(self.path, index)
+        root, ext = os.path.splitext(self.path)
+        return f"{root}_part{index:04d}{ext}"
+
+    def _segment_start(self, index: int) -> float:
+        return self.start_time + index * self._segment_frames / self.fps
+
+    def _route(self, timestamp: float):
+        """Commands queue of the worker encoding the segment ``timestamp`` falls in."""
+        if self.workers == 1 and not self.keep_segments:
+            index = 0
+        else:
+            slot = max(int(round((timestamp - self.start_time) * self.fps)), 0)
+            index = slot // self._segment_frames
+        if index != self._segment:
+            if self._segment is not None:
+                end_time = None if self.vfr and not self.keep_segments else self._segment_start(self._segment + 1)
+                self._close_part(end_time)
+            path = self._part_path(index) if self.keep_segments or self.workers > 1 else self.path
+            # CFR slots count from the segment start; VFR timestamps of joined
+            # parts from the session start, of kept segments from their own start
+            start = self.start_time if self.vfr and not self.keep_segments else self._segment_start(index)
+            self._commands[index % self.workers].put(('open', path, start))
+            self._parts.append(path)
+            self._part_info[path] = (index, None)
+            self._segment = index
+            if self.on_segment_open:
+                self.on_segment_open(index, path, self._segment_start(index))
+        return self._commands[index % self.workers]
+
+    def _close_part(self, end_time: Optional[float]):
+        """Ask the worker of the current segment to finish it."""
+        self._part_info[self._parts[-1]] = (self._segment, end_time)
+        self._commands[self._segment % self.workers].put(('close', end_time))
+
+    def _collect_finished(self):
+        """Report the segments workers have finished since the last call."""
+        while True:
+            try:
+                path = self._finished.get_nowait()
+            except queue.Empty:
+                return
+            index, end_time = self._part_info[path]
+            if end_time is None:
+                end_time = self._segment_start(index + 1)
+            if self.on_segment_close:
+                self.on_segment_close(index, path, end_time)
+
+    def _reclaim(self, block: bool) -> Optional[int]:
+        try:
+            return self._free.get(block, 0.5 if block else None)
+        except queue.Empty:
+            return None
+
+    def _workers_alive(self) -> bool:
+        """Whether every worker is running; logs the exit code of the first dead one."""
+        for process in self._processes:
+            if not process.is_alive():
+                logger.error(f"Video encoder process died (exit code {process.exitcode})")
+                return False
+        return True
+
+    def put(self, timestamp: float, frame: np.ndarray) -> bool:
+        """
+        Copy a grabbed BGRA frame into shared memory and send it to its worker.
+
+        Returns:
+            bool: False if the encoder was closed or its workers died
+        """
+        if self._closed:
+            return False
+        self._collect_finished()
+        slot = self._reclaim(block=False)
+        if slot is None:
+            # Slots held by a dead worker never come back, so check before dropping or waiting
+            if not self._workers_alive():
+                return False
+            if self.policy != BLOCK:
+                self.dropped += 1
+                return True
+            self.blocked += 1
+            while slot is None:
+                if not self._workers_alive():
+                    return False
+                slot = self._reclaim(block=True)
+        np.copyto(self.ring.frames[slot], frame)
+        self._route(timestamp).put(('frame', slot, timestamp))
+        self.pushed += 1
+        return True
+
+    def close(self, end_time: Optional[float] = None):
+        """
+        Let the workers finish, then join the segments into ``path``.
+
+        Args:
+            end_time: Monotonic time the recording stopped
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._segment is not None:
+            self._close_part(end_time)
+        for commands in self._commands:
+            commands.put(('stop',))
+        for process in self._processes:
+            process.join()
+            if process.exitcode:
+                logger.error(f"Video encoder process exited with code {process.exitcode}")
+        self._collect_finished()
+        self.ring.close()
+        if self.workers > 1 and not self.keep_segments and self._parts:
+            self._join_parts()
+
+    def _join_parts(self):
+        """Concatenate segment files (and VFR timestamp sidecars) into the final output."""
+        if not concat_videos(self._parts, self.path):
+            logger.warning(f"Video segments kept as {self._parts[0]} ...")
+            return
+        if self.vfr:
+            with open(timestamps_path(self.path), 'w', encoding='utf-8') as out:
+                out.write("# timestamp format v2\n")
+                for part in self._parts:
+                    with open(timestamps_path(part), 'r', encoding='utf-8') as f:
+                        out.writelines(line for line in f if not line.startswith('#'))
+        for part in self._parts:
+            for path in (part, timestamps_path(part)):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def stats(self) -> dict:
+        """Encoder counters summed over the workers, plus the shared ring's."""
+        stats = {
+            key: sum(self._counters[w * len(_COUNTERS) + i] for w in range(self.workers))
+            for i, key in enumerate(_COUNTERS)
+        }
+        received = stats.pop('frames_received')
+        stats.update({
+            'queue_queued': self.pushed - received,
+            'queue_pushed': self.pushed,
+            'queue_dropped': self.dropped,
+            'queue_blocked': self.blocked,
+            'workers': self.workers,
+        })
+        return stats
@@ -0,0 +1,634 @@
+"""Screen frame hand-off from the grab loop to a background video encoder."""
+import collections
+import logging
+import os
+import threading
+from typing import Callable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .ffmpeg import FfmpegVideoWriter, find_ffmpeg
+from .segments import segment_path
+
+logger = logging.getLogger(__name__)
+
+# What FrameQueue.put does when the queue is full
+DROP_OLDEST = 'drop_oldest'
+BLOCK = 'block'
+QUEUE_POLICIES = (DROP_OLDEST, BLOCK)
+
+# Video encoder backends for open_video_writer()
+VIDEO_ENCODERS = ('auto', 'ffmpeg', 'opencv')
+
+
+def bgra_frame(shot) -> np.ndarray:
+    """
+    View a screenshot's BGRA pixels as an ``(height, width, 4)`` uint8 array without copying.
+
+    The array shares memory with ``shot.raw`` (the buffer mss grabbed into)
+    and keeps it alive, so the grab loop can queue it as is.
+    """
+    height, width = shot.height, shot.width
+    raw = getattr(shot, 'raw', None)
+    if raw is None or len(raw) != height * width * 4:
+        # Padded rows or no raw buffer: fall back to the array interface (may copy)
+        return np.asarray(shot)[:, :, :4]
+    return np.frombuffer(raw, dtype=np.uint8).reshape(height, width, 4)
+
+
+class FrameQueue:
+    """
+    Bounded queue of ``(timestamp, frame)`` pairs between grabber and encoder.
+
+    With the ``'drop_oldest'`` policy a full queue discards its oldest frame,
+    so the grab loop never waits for the encoder; with ``'block'`` the grab
+    loop waits for a free slot and no frame is lost.
+
+    Attributes:
+        maxsize: Maximum number of queued frames
+        policy: 'drop_oldest' or 'block'
+        pushed: Frames accepted by put()
+        dropped: Frames discarded because the queue was full
+        blocked: put() calls that had to wait for a free slot
+        high_water: Largest queue depth seen
+    """
+    def __init__(self, maxsize: int = 8, policy: str = DROP_OLDEST):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Unknown frame queue policy: {policy}")
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.pushed = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.high_water = 0
+        self._items = collections.deque()
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, timestamp: float, frame: np.ndarray) -> bool:
+        """
+        Queue a frame captured at monotonic ``timestamp``.
+
+        Returns:
+            bool: False if the queue was closed and the frame was not queued
+        """
+        with self._cond:
+            if len(self._items) >= self.maxsize and not self._closed:
+                if self.policy == DROP_OLDEST:
+                    self._items.popleft()
+                    self.dropped += 1
+                else:
+                    self.blocked += 1
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        self._cond.wait()
+            if self._closed:
+                return False
+            self._items.append((timestamp, frame))
+            self.pushed += 1
+            self.high_water = max(self.high_water, len(self._items))
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[float, np.ndarray]]:
+        """
+        Next ``(timestamp, frame)``, waiting up to ``timeout`` seconds.
+
+        Returns None on timeout, or once the queue is closed and drained.
+        """
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self):
+        """Stop accepting frames and wake up any waiting producer or consumer."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            'queued': len(self._items),
+            'pushed': self.pushed,
+            'dropped': self.dropped,
+            'blocked': self.blocked,
+            'high_water': self.high_water,
+        }
+
+
+class FrameChangeDetector:
+    """
+    Cheap test of whether a frame differs from the last changed frame.
+
+    Frames are compared on a grid sampling every ``step``-th pixel in both
+    directions (1/16 of the pixels for the default step of 4, still fine
+    enough to catch a typed character or a moved cursor). The sample is
+    copied into a preallocated buffer and diffed against the sample of the
+    last frame reported as changed, so slow fades accumulate until they
+    cross ``threshold`` instead of slipping through frame by frame.
+
+    Attributes:
+        step: Sampling stride in pixels
+        threshold: Largest per-channel difference still treated as unchanged
+    """
+    def __init__(self, step: int = 4, threshold: int = 0):
+        self.step = max(1, step)
+        self.threshold = threshold
+        self._reference = None
+        self._sample = None
+        self._diff = None
+
+    def changed(self, frame: np.ndarray) -> bool:
+        """Whether ``frame`` (BGRA) differs from the last changed frame."""
+        view = frame[::self.step, ::self.step, :3]
+        if self._reference is None or self._reference.shape != view.shape:
+            self._reference = np.empty(view.shape, dtype=view.dtype)
+            self._sample = np.empty(view.shape, dtype=view.dtype)
+            self._diff = np.empty(view.shape, dtype=view.dtype)
+            np.copyto(self._reference, view)
+            return True
+        np.copyto(self._sample, view)
+        cv2.absdiff(self._sample, self._reference, dst=self._diff)
+        if self._diff.max() <= self.threshold:
+            return False
+        self._reference, self._sample = self._sample, self._reference
+        return True
+
+
+def fit_size(width: int, height: int, max_size: Optional[Tuple[int, int]] = None) -> Tuple[int, int]:
+    """
+    Output size for a ``width`` x ``height`` capture.
+
+    Args:
+        width: Captured width in pixels
+        height: Captured height in pixels
+        max_size: ``(width, height)`` box to scale down into, keeping the aspect
+            ratio and rounding to even dimensions; None keeps the native size
+
+    Returns:
+        tuple: ``(width, height)``; never larger than the capture
+    """
+    if not max_size:
+        return width, height
+    scale = min(max_size[0] / width, max_size[1] / height, 1.0)
+    if scale >= 1.0:
+        return width, height
+    return max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2)
+
+
+def timestamps_path(video_path: str) -> str:
+    """Sidecar file holding the presentation time of each frame of a variable frame rate video."""
+    return os.path.splitext(video_path)[0] + '_timestamps.txt'
+
+
+def open_video_writer(path: str,
+                      fps: float,
+                      size: Tuple[int, int],
+                      grayscale: bool = False,
+                      encoder: str = 'auto',
+                      fourcc: str = 'mp4v',
+                      **ffmpeg_options):
+    """
+    Open a frame writer with the ``cv2.VideoWriter`` interface (write/release).
+
+    Args:
+        path: Output video file path
+        fps: Frame rate
+        size: ``(width, height)`` of the frames
+        grayscale: Frames are single-channel
+        encoder: 'ffmpeg' pipes frames to a local ffmpeg (multi-threaded codecs),
+            'opencv' uses cv2.VideoWriter, 'auto' prefers ffmpeg when installed
+        fourcc: OpenCV codec code for the opencv encoder
+        **ffmpeg_options: codec, crf, preset, threads, fragment_seconds for FfmpegVideoWriter
+    """
+    if encoder not in VIDEO_ENCODERS:
+        raise ValueError(f"Unknown video encoder: {encoder}")
+    if encoder != 'opencv':
+        if find_ffmpeg():
+            try:
+                return FfmpegVideoWriter(path, fps, size, grayscale=grayscale, **ffmpeg_options)
+            except Exception as e:
+                logger.warning(f"Could not start ffmpeg ({e}), falling back to OpenCV")
+        else:
+            level = logging.WARNING if encoder == 'ffmpeg' else logging.DEBUG
+            logger.log(level, "ffmpeg not found, encoding video with OpenCV")
+    return cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size, isColor=not grayscale)
+
+
+class VideoEncoder:
+    """
+    Encode frames from a FrameQueue in a background thread as constant frame rate video.
+
+    The grab loop only captures and queues frames; conversion and encoding
+    happen here, so a slow encoder shows up as queue drops (or a blocked grab
+    loop) instead of silently stretching the capture interval.
+
+    Queued BGRA frames are converted to BGR straight into one of two
+    preallocated buffers (one holds the frame waiting for its slot), so each
+    frame is copied exactly once and nothing is allocated per frame. Frames
+    larger than ``size`` are first shrunk with INTER_AREA into a reused
+    scratch buffer; in ``grayscale`` mode the alpha and color channels are
+    dropped before resizing, so the resize only touches one channel.
+
+    With a ``change_detector`` frames identical to the previous one are not
+    converted at all. With ``vfr`` they are not encoded either: only changed
+    frames are written, and their times (ms since ``start_time``) go to a
+    sidecar file in mkvmerge's "timestamp format v2" (see timestamps_path())
+    for muxing the video back onto the real timeline.
+
+    Output frame N always shows the screen at ``start_time + N / fps``: each
+    grabbed frame is assigned to the slot nearest its capture timestamp and
+    held until a newer frame arrives. Slots no frame landed in repeat the
+    previous frame (duplicated); a frame superseded before its slot was
+    written is skipped (dropped). The video therefore keeps the wall-clock
+    duration of the recording however irregular the capture was.
+
+    Without a ``source`` queue no thread is started and the caller feeds
+    frames synchronously with submit() (e.g. from an encoder process).
+
+    Attributes:
+        path: Output video file path
+        source: Queue the encoder drains (None when fed through submit())
+        fps: Output frame rate
+        start_time: Monotonic time of output frame 0 (first frame's time if None)
+        frames_written: Frames handed to the video writer so far
+        frames_duplicated: Output frames that repeat an earlier frame
+        frames_dropped: Grabbed frames never written because a newer one replaced them
+        frames_unchanged: Grabbed frames the change detector found identical to the previous one
+        timestamps_file: Path of the timestamp sidecar (None unless vfr)
+    """
+    def __init__(self,
+                 path: str,
+                 fps: float,
+                 size: Tuple[int, int],
+                 source: Optional[FrameQueue],
+                 fourcc: str = 'mp4v',
+                 start_time: Optional[float] = None,
+                 change_detector: Optional[FrameChangeDetector] = None,
+                 vfr: bool = False,
+                 grayscale: bool = False,
+                 writer=None):
+        """
+        Open the video writer and start the encoder thread.
+
+        Args:
+            path: Output video file path
+            fps: Frame rate written into the container
+            size: ``(width, height)`` of the output video
+            source: Queue to drain, or None to encode synchronously
+            fourcc: OpenCV codec code
+            start_time: Monotonic time output frame 0 corresponds to
+            change_detector: Detector used to skip unchanged frames
+            vfr: Write only changed frames plus a timestamp sidecar instead
+                of constant frame rate video (requires change_detector)
+            grayscale: Encode a single luma channel
+            writer: Opened frame writer (see open_video_writer); an OpenCV
+                writer using ``fourcc`` if None
+        """
+        self.path = path
+        self.source = source
+        self.fps = fps
+        self.start_time = start_time
+        self.frames_written = 0
+        self.frames_duplicated = 0
+        self.frames_dropped = 0
+        self.frames_unchanged = 0
+        self.change_detector = change_detector
+        self.vfr = vfr and change_detector is not None
+        self.timestamps_file = timestamps_path(path) if self.vfr else None
+        self._timestamps = None
+        if self.vfr:
+            self._timestamps = open(self.timestamps_file, 'w', encoding='utf-8')
+            self._timestamps.write("# timestamp format v2\n")
+        self._last_time = None
+        self._pending = None
+        self._end_time = None
+        self.size = size
+        self.grayscale = grayscale
+        width, height = size
+        shape = (height, width) if grayscale else (height, width, 3)
+        self._buffers = [np.empty(shape, dtype=np.uint8) for _ in range(2)]
+        self._scratch = None
+        if writer is None:
+            writer = open_video_writer(path, fps, size, grayscale, encoder='opencv', fourcc=fourcc)
+        self._out = writer
+        self._thread = None
+        if source is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def put(self, timestamp: float, frame: np.ndarray) -> bool:
+        """Queue a grabbed BGRA frame; False once the encoder has stopped."""
+        return self.source.put(timestamp, frame)
+
+    def submit(self, timestamp: float, frame: np.ndarray):
+        """
+        Encode a grabbed BGRA frame on the calling thread.
+
+        ``frame`` is no longer referenced when this returns, so its memory
+        can be reused right away.
+        """
+        self._encode(timestamp, frame)
+
+    def _slot(self, timestamp: float) -> int:
+        """Output frame index nearest to monotonic ``timestamp``."""
+        return int(round((timestamp - self.start_time) * self.fps))
+
+    def _emit(self, frame: np.ndarray, count: int = 1):
+        """Write ``frame`` into the next ``count`` output slots."""
+        for _ in range(count):
+            self._out.write(frame)
+            self.frames_written += 1
+
+    def _scratch_buffer(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """Intermediate buffer for resizing, reallocated only if the shape changes."""
+        if self._scratch is None or self._scratch.shape != shape:
+            self._scratch = np.empty(shape, dtype=np.uint8)
+        return self._scratch
+
+    def _convert(self, frame: np.ndarray) -> np.ndarray:
+        """Convert (and shrink) a BGRA frame into whichever buffer is not holding the pending frame."""
+        dst = self._buffers[1] if self._pending is self._buffers[0] else self._buffers[0]
+        code = cv2.COLOR_BGRA2GRAY if self.grayscale else cv2.COLOR_BGRA2BGR
+        if frame.shape[:2] == dst.shape[:2]:
+            return cv2.cvtColor(frame, code, dst=dst)
+        if self.grayscale:
+            gray = self._scratch_buffer(frame.shape[:2])
+            cv2.cvtColor(frame, code, dst=gray)
+            return cv2.resize(gray, self.size, dst=dst, interpolation=cv2.INTER_AREA)
+        small = self._scratch_buffer(dst.shape[:2] + (4,))
+        cv2.resize(frame, self.size, dst=small, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, code, dst=dst)
+
+    def _write_vfr(self, timestamp: float, frame: np.ndarray):
+        """Write one frame and record its presentation time."""
+        self._out.write(frame)
+        self.frames_written += 1
+        self._timestamps.write(f"{(timestamp - self.start_time) * 1000:.3f}\n")
+        self._last_time = timestamp
+
+    def _encode(self, timestamp: float, frame: np.ndarray):
+        """Schedule a grabbed frame, writing the slots that precede it."""
+        if self.start_time is None:
+            self.start_time = timestamp
+        unchanged = (self._pending is not None and self.change_detector is not None
+                     and not self.change_detector.changed(frame))
+        if unchanged:
+            # Same picture as the pending frame, which already holds it converted
+            self.frames_unchanged += 1
+            converted = self._pending
+        else:
+            if self._pending is None and self.change_detector is not None:
+                self.change_detector.changed(frame)
+            converted = self._convert(frame)
+
+        if self.vfr:
+            if not unchanged:
+                self._write_vfr(max(timestamp, self.start_time), converted)
+                self._pending = converted
+            return
+
+        slot = self._slot(timestamp)
+        if self._pending is None:
+            # Nothing to show before the first frame, so it fills the leading slots
+            leading = max(slot - self.frames_written, 0)
+            self._emit(converted, leading)
+            self.frames_duplicated += leading
+        elif slot <= self.frames_written:
+            # Both frames belong to the same slot; keep the newer one
+            self.frames_dropped += 1
+        else:
+            gap = slot - self.frames_written
+            self._emit(self._pending, gap)
+            self.frames_duplicated += gap - 1
+        self._pending = converted
+
+    def _finish(self):
+        """Write the last frame and repeat it up to the end time."""
+        if self._pending is None:
+            return
+        if self.vfr:
+            # Repeat the last picture at the end so the video keeps its full duration
+            if self._end_time is not None and self._end_time > self._last_time:
+                self._write_vfr(self._end_time, self._pending)
+                self.frames_duplicated += 1
+            self._pending = None
+            return
+        count = 1
+        if self._end_time is not None:
+            count = max(self._slot(self._end_time) - self.frames_written, 1)
+        self._emit(self._pending, count)
+        self.frames_duplicated += count - 1
+        self._pending = None
+
+    def _run(self):
+        """Encoder thread: drain the queue until it is closed and empty."""
+        while True:
+            item = self.source.get(timeout=0.1)
+            if item is None:
+                if self.source.closed:
+                    break
+                continue
+            try:
+                self._encode(*item)
+            except Exception as e:
+                logger.error(f"Error encoding video frame to {self.path}: {e}")
+                # Unblock the grab loop; nothing more can be written
+                self.source.close()
+                return
+        try:
+            self._finish()
+        except Exception as e:
+            logger.error(f"Error encoding video frame to {self.path}: {e}")
+
+    def close(self, end_time: Optional[float] = None):
+        """
+        Encode the frames still queued and finalize the video file.
+
+        Args:
+            end_time: Monotonic time the recording stopped; the last frame is
+                repeated so the video lasts until then
+        """
+        self._end_time = end_time
+        if self.source is None:
+            try:
+                self._finish()
+            except Exception as e:
+                logger.error(f"Error encoding video frame to {self.path}: {e}")
+        else:
+            self.source.close()
+            if self._thread.is_alive():
+                self._thread.join()
+        self._out.release()
+        if self._timestamps:
+            self._timestamps.close()
+
+    def stats(self) -> dict:
+        """Encoder and queue counters for status reporting."""
+        stats = {
+            'frames_encoded': self.frames_written,
+            'frames_duplicated': self.frames_duplicated,
+            'frames_dropped': self.frames_dropped,
+            'frames_unchanged': self.frames_unchanged,
+        }
+        if self.source is not None:
+            stats.update({f'queue_{key}': value for key, value in self.source.stats().items()})
+        return stats
+
+
+class SegmentedVideoEncoder:
+    """
+    Encode grabbed frames into consecutive video files of ``segment_seconds`` each.
+
+    A background thread drains the FrameQueue like VideoEncoder does and
+    hands each frame to the VideoEncoder of the segment its output slot falls
+    in. Segments are cut on output frame boundaries and every segment is a
+    complete file with its own timeline (and timestamp sidecar in VFR mode)
+    starting at the segment start, so finished segments can be processed
+    while recording continues. The interface matches VideoEncoder.
+
+    Attributes:
+        path: Base path the segment file names are derived from
+        paths: Segment files opened so far
+    """
+    def __init__(self,
+                 path: str,
+                 fps: float,
+                 size: Tuple[int, int],
+                 source: FrameQueue,
+                 segment_seconds: float,
+                 start_time: Optional[float] = None,
+                 vfr: bool = False,
+                 grayscale: bool = False,
+                 writer_options: Optional[dict] = None,
+                 on_open: Optional[Callable[[int, str, float], None]] = None,
+                 on_close: Optional[Callable[[int, str, float], None]] = None):
+        """
+        Start the encoder thread.
+
+        Args:
+            path: Base output path
+            fps: Frame rate written into the containers
+            size: ``(width, height)`` of the output video
+            source: Queue to drain
+            segment_seconds: Length of each segment
+            start_time: Monotonic time output frame 0 corresponds to (first frame if None)
+            vfr: Skip unchanged frames and write variable frame rate segments
+            grayscale: Encode a single luma channel
+            writer_options: Keyword arguments for open_video_writer()
+            on_open: Called with ``(index, path, start_time)`` when a segment is started
+            on_close: Called with ``(index, path, end_time)`` once a segment file is complete
+        """
+        self.path = path
+        self.fps = fps
+        self.size = size
+        self.source = source
+        self.start_time = start_time
+        self.vfr = vfr
+        self.grayscale = grayscale
+        self.writer_options = dict(writer_options or {})
+        self.on_open = on_open
+        self.on_close = on_close
+        self.paths = []
+        self._segment_frames = max(1, int(round(segment_seconds * fps)))
+        self._encoder = None
+        self._index = None
+        # Counters of the segments already closed
+        self._done = {'frames_encoded': 0, 'frames_duplicated': 0, 'frames_dropped': 0, 'frames_unchanged': 0}
+        self._end_time = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _segment_start(self, index: int) -> float:
+        return self.start_time + index * self._segment_frames / self.fps
+
+    def _open_segment(self, index: int):
+        path = segment_path(self.path, index)
+        start = self._segment_start(index)
+        writer = open_video_writer(path, self.fps, self.size, self.grayscale, **self.writer_options)
+        self._encoder = VideoEncoder(path, self.fps, self.size, None, start_time=start,
+                                     change_detector=FrameChangeDetector() if self.vfr else None,
+                                     vfr=self.vfr, grayscale=self.grayscale, writer=writer)
+        self._index = index
+        self.paths.append(path)
+        if self.on_open:
+            self.on_open(index, path, start)
+
+    def _close_segment(self, end_time: Optional[float]):
+        if self._encoder is None:
+            return
+        self._encoder.close(end_time)
+        for key, value in self._encoder.stats().items():
+            self._done[key] += value
+        if self.on_close:
+            if end_time is None:
+                end_time = self._segment_start(self._index) + self._encoder.frames_written / self.fps
+            self.on_close(self._index, self._encoder.path, end_time)
+        self._encoder = None
+
+    def _encode(self, timestamp: float, frame: np.ndarray):
+        if self.start_time is None:
+            self.start_time = timestamp
+        slot = max(int(round((timestamp - self.start_time) * self.fps)), 0)
+        index = slot // self._segment_frames
+        if index != self._index:
+            self._close_segment(self._segment_start(self._index + 1) if self._index is not None else None)
+            self._open_segment(index)
+        self._encoder.submit(timestamp, frame)
+
+    def _run(self):
+        """Encoder thread: drain the queue until it is closed and empty."""
+        while True:
+            item = self.source.get(timeout=0.1)
+            if item is None:
+                if self.source.closed:
+                    break
+                continue
+            try:
+                self._encode(*item)
+            except Exception as e:
+                logger.error(f"Error encoding video frame to {self.path}: {e}")
+                self.source.close()
+                break
+        try:
+            self._close_segment(self._end_time)
+        except Exception as e:
+            logger.error(f"Error finishing video segment of {self.path}: {e}")
+
+    def put(self, timestamp: float, frame: np.ndarray) -> bool:
+        """Queue a grabbed BGRA frame; False once the encoder has stopped."""
+        return self.source.put(timestamp, frame)
+
+    def close(self, end_time: Optional[float] = None):
+        """
+        Encode the frames still queued and finalize the last segment.
+
+        Args:
+            end_time: Monotonic time the recording stopped
+        """
+        self._end_time = end_time
+        self.source.close()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def stats(self) -> dict:
+        """Encoder counters summed over the segments, plus the queue's."""
+        stats = dict(self._done)
+        encoder = self._encoder
+        if encoder is not None:
+            for key, value in encoder.stats().items():
+                stats[key] += value
+        stats.update({f'queue_{key}': value for key, value in self.source.stats().items()})
+        return stats
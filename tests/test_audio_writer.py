@@ -0,0 +1,58 @@
+import wave
+
+import numpy as np
+
+from recordmymeeting import audio_writer
+from recordmymeeting.audio_writer import StreamingAudioWriter, WavReader, WavStreamWriter
+from recordmymeeting.mixer import mix_wav_files
+from recordmymeeting.ring_buffer import SampleRing
+
+
+def test_wav_stream_writer_patches_header(tmp_path):
+    """Test that the header reflects the data appended before close."""
+    path = tmp_path / "out.wav"
+    writer = WavStreamWriter(str(path), channels=1, sample_width=2, rate=16000)
+    writer.write(b'\x01\x00' * 100)
+    writer.write(b'\x02\x00' * 50)
+    writer.close()
+
+    with wave.open(str(path), 'rb') as wf:
+        assert wf.getnchannels() == 1
+        assert wf.getframerate() == 16000
+        assert wf.getnframes() == 150
+
+
+def test_streaming_audio_writer_writes_chunks_in_order(tmp_path):
+    """Test that queued chunks end up on disk in capture order."""
+    path = tmp_path / "mic.wav"
+    ring = SampleRing(capacity=44100, channels=2)
+    writer = StreamingAudioWriter(str(path), sample_width=2, rate=44100, source=ring)
+    chunks = [bytes([i]) * 4096 for i in range(20)]
+    for i, chunk in enumerate(chunks):
+        ring.write(chunk, float(i))
+    writer.close()
+
+    assert writer.frames_written == 20 * 1024
+    assert writer.dropped_frames == 0
+    with wave.open(str(path), 'rb') as wf:
+        assert wf.readframes(wf.getnframes()) == b''.join(chunks)
+
+
+def test_wav_stream_writer_switches_to_rf64_past_riff_limit(tmp_path, monkeypatch):
+    """Past the RIFF size limit the header becomes RF64 and readers still see every frame."""
+    monkeypatch.setattr(audio_writer, 'MAX_RIFF_SIZE', 1000)
+    samples = np.arange(1000, dtype=np.int16)
+    for name in ('mic.wav', 'speaker.wav'):
+        writer = WavStreamWriter(str(tmp_path / name), channels=1, sample_width=2, rate=16000)
+        writer.write(samples.tobytes())
+        writer.close()
+
+    assert (tmp_path / 'mic.wav').read_bytes()[:4] == b'RF64'
+    with WavReader(str(tmp_path / 'mic.wav')) as wf:
+        assert wf.rf64 and wf.getnframes() == 1000
+        assert wf.readframes(1000) == samples.tobytes()
+
+    assert mix_wav_files(str(tmp_path / 'mic.wav'), str(tmp_path / 'speaker.wav'),
+                         str(tmp_path / 'merged.wav')) == 1000
+    with WavReader(str(tmp_path / 'merged.wav')) as wf:
+        assert wf.readframes(1000) == samples.tobytes()
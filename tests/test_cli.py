@@ -8,3 +8,13 @@ def test_core_imports():
     """Test that core module can be imported."""
     from recordmymeeting.core import RecordMyMeeting
     assert RecordMyMeeting is not None
+
+def test_parse_screen_options():
+    """Test --resolution and --region argument parsing."""
+    import argparse
+    import pytest
+    from recordmymeeting.cli import parse_region, parse_size
+    assert parse_size('1280x720') == (1280, 720)
+    assert parse_region('1920,0,2560,1440') == (1920, 0, 2560, 1440)
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_size('720p')
@@ -34,3 +34,120 @@ def test_get_device_priority():
     builtin_priority = device_manager.get_device_priority(builtin)
     
     assert headphone_priority > builtin_priority
+
+def test_device_registry_caches_until_invalidated(monkeypatch):
+    """Test that detection runs once and again only after invalidation."""
+    calls = []
+
+    def fake_detect():
+        calls.append(1)
+        return {'mic': {'index': len(calls), 'name': 'Mic', 'channels': 1}}
+
+    monkeypatch.setattr(device_manager, 'detect_devices', fake_detect)
+    registry = device_manager.DeviceRegistry(ttl=60)
+
+    first = registry.detected_devices()
+    first['mic']['index'] = 99
+    assert registry.detected_devices()['mic']['index'] == 1
+    assert len(calls) == 1
+
+    registry.invalidate()
+    assert registry.detected_devices()['mic']['index'] == 2
+    assert registry.detected_devices(refresh=True)['mic']['index'] == 3
+
+def test_probe_devices_runs_concurrently(monkeypatch):
+    """Test that probes overlap and slow devices time out instead of blocking."""
+    import time
+
+    def slow_probe(p, index, report):
+        report('open')
+        time.sleep(0.5 if index == 3 else 0.2)
+        return index != 2
+
+    monkeypatch.setattr(device_manager, '_probe_input', slow_probe)
+    start = time.monotonic()
+    results = device_manager.probe_devices(None, [0, 1, 2, 3], timeout=0.35)
+    elapsed = time.monotonic() - start
+
+    assert results == {0: True, 1: True, 2: False, 3: None}
+    assert elapsed < 0.45
+
+
+class _SlowPortAudio:
+    """PyAudio stand-in whose opens and reads take time, recording overlapping opens."""
+    def __init__(self, open_seconds, read_seconds, hang=None):
+        import threading
+        self.open_seconds = open_seconds
+        self.read_seconds = read_seconds
+        self.hang = hang or {}
+        self.opening = 0
+        self.max_opening = 0
+        self.release = threading.Event()
+
+    def open(self, input_device_index, **kwargs):
+        import time
+        self.opening += 1
+        self.max_opening = max(self.max_opening, self.opening)
+        if self.hang.get(input_device_index) == 'open':
+            self.release.wait(10)
+        time.sleep(self.open_seconds)
+        self.opening -= 1
+        return _SlowStream(self, input_device_index)
+
+
+class _SlowStream:
+    def __init__(self, pa, index):
+        self.pa = pa
+        self.index = index
+
+    def read(self, frames, exception_on_overflow=True):
+        import time
+        if self.pa.hang.get(self.index) == 'read':
+            self.pa.release.wait(10)
+        time.sleep(self.pa.read_seconds)
+        return b'\0' * frames * 2
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_probe_timeout_starts_once_the_lock_is_held():
+    """Opens and closes take turns, reads overlap, and devices queued for the lock keep their full timeout."""
+    import time
+
+    pa = _SlowPortAudio(open_seconds=0.1, read_seconds=0.25)
+    start = time.monotonic()
+    results = device_manager.probe_devices(pa, [0, 1, 2, 3, 4, 5], timeout=0.4)
+    elapsed = time.monotonic() - start
+
+    assert results == {i: True for i in range(6)}
+    assert pa.max_opening == 1
+    # Serial probes would take 6 x 0.35 s
+    assert elapsed < 1.2
+
+
+def test_probe_timeout_applies_to_each_device():
+    """A device hung in its read times out on its own; the others are probed normally."""
+    pa = _SlowPortAudio(open_seconds=0.05, read_seconds=0.05, hang={0: 'read'})
+    try:
+        results = device_manager.probe_devices(pa, [0, 1, 2], timeout=0.3, max_workers=1)
+    finally:
+        pa.release.set()
+    assert results == {0: None, 1: True, 2: True}
+
+
+def test_probe_hung_in_open_blocks_the_remaining_devices():
+    """A probe hung while holding the PortAudio lock makes the queued devices time out too."""
+    import time
+
+    pa = _SlowPortAudio(open_seconds=0.0, read_seconds=0.0, hang={0: 'open'})
+    start = time.monotonic()
+    try:
+        results = device_manager.probe_devices(pa, [0, 1, 2, 3], timeout=0.3, max_workers=2)
+    finally:
+        pa.release.set()
+    assert results == {0: None, 1: None, 2: None, 3: None}
+    assert time.monotonic() - start < 1.0
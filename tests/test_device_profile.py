@@ -0,0 +1,35 @@
+from recordmymeeting.device_profile import DeviceProfile, device_key
+
+SNAPSHOT = {
+    'fingerprint': ((0, 'USB Mic', 'Core Audio', 1, 0), ('defaults', 0, None)),
+    'devices': [{'index': 0, 'name': 'USB Mic', 'host_api': 'Core Audio',
+                 'input_channels': 1, 'output_channels': 0}],
+    'default_input': 0,
+    'default_output': None,
+}
+DETECTED = {'mic': {'index': 0, 'name': 'USB Mic', 'channels': 1}}
+
+
+def test_profile_reuses_detection_for_same_fingerprint(tmp_path):
+    """Test that a persisted profile is reused only for an identical device list."""
+    path = str(tmp_path / "profile.json")
+    DeviceProfile(path).remember(SNAPSHOT, DETECTED)
+
+    profile = DeviceProfile(path)
+    assert profile.last_known_good(SNAPSHOT) == DETECTED
+    assert profile.supported(device_key('Core Audio', 'USB Mic', 1)) == {'rates': [44100], 'channels': [1]}
+
+    changed = dict(SNAPSHOT, fingerprint=SNAPSHOT['fingerprint'] + ((1, 'Headset', 'Core Audio', 1, 2),))
+    assert profile.last_known_good(changed) is None
+
+
+def test_profile_invalidate_forces_probing(tmp_path):
+    """Test that invalidation drops the last-known-good devices but keeps capabilities."""
+    profile = DeviceProfile(str(tmp_path / "profile.json"))
+    profile.remember(SNAPSHOT, DETECTED)
+    profile.note_supported(device_key('Core Audio', 'USB Mic', 1), 48000, 1)
+    profile.invalidate()
+
+    reloaded = DeviceProfile(str(tmp_path / "profile.json"))
+    assert reloaded.last_known_good(SNAPSHOT) is None
+    assert reloaded.supported(device_key('Core Audio', 'USB Mic', 1))['rates'] == [44100, 48000]
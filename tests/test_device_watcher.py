@@ -0,0 +1,24 @@
+import threading
+
+from recordmymeeting import device_watcher
+from recordmymeeting.device_watcher import DeviceWatcher
+
+
+def test_device_watcher_reports_only_changes(monkeypatch):
+    """Test that the callback fires once per fingerprint change, not per poll."""
+    snapshots = iter([{'fingerprint': ('a',)}] * 3 + [{'fingerprint': ('b',)}] * 100)
+    monkeypatch.setattr(device_watcher, 'get_device_snapshot', lambda: next(snapshots))
+
+    changes = []
+    changed = threading.Event()
+
+    def on_change(snapshot):
+        changes.append(snapshot['fingerprint'])
+        changed.set()
+
+    watcher = DeviceWatcher(on_change, interval=0.001)
+    watcher.start()
+    assert changed.wait(5)
+    watcher.stop()
+
+    assert changes == [('b',)]
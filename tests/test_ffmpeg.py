@@ -0,0 +1,92 @@
+import shutil
+import subprocess
+
+import cv2
+import numpy as np
+import pytest
+
+from recordmymeeting import core, video_writer
+from recordmymeeting.audio_writer import StreamingAudioWriter
+from recordmymeeting.core import RecordMyMeeting
+from recordmymeeting.ffmpeg import FfmpegAudioWriter, FfmpegVideoWriter, find_ffmpeg
+from recordmymeeting.ring_buffer import SampleRing
+
+
+def test_open_video_writer_falls_back_to_opencv(tmp_path, monkeypatch):
+    """Without ffmpeg on PATH the OpenCV writer is used."""
+    monkeypatch.setattr(video_writer, 'find_ffmpeg', lambda: None)
+    writer = video_writer.open_video_writer(str(tmp_path / 'screen.mp4'), 10, (64, 48), encoder='ffmpeg')
+    assert isinstance(writer, cv2.VideoWriter)
+    writer.release()
+
+
+@pytest.mark.skipif(find_ffmpeg() is None, reason="ffmpeg not installed")
+def test_ffmpeg_video_writer_encodes_piped_frames(tmp_path):
+    """Frames piped to ffmpeg come out as a playable video with odd sizes cropped even."""
+    path = str(tmp_path / 'screen.mp4')
+    writer = FfmpegVideoWriter(path, 10, (65, 49), threads=2)
+    for i in range(10):
+        writer.write(np.full((49, 65, 3), i * 20, dtype=np.uint8))
+    writer.release()
+
+    cap = cv2.VideoCapture(path)
+    assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == 10
+    assert (cap.get(cv2.CAP_PROP_FRAME_WIDTH), cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) == (64, 48)
+    cap.release()
+
+
+def _decode_pcm(path):
+    result = subprocess.run([find_ffmpeg(), '-hide_banner', '-loglevel', 'error', '-i', path,
+                             '-f', 's16le', '-ac', '1', '-ar', '8000', 'pipe:1'],
+                            stdout=subprocess.PIPE, check=True)
+    return np.frombuffer(result.stdout, dtype=np.int16)
+
+
+@pytest.mark.skipif(find_ffmpeg() is None, reason="ffmpeg not installed")
+def test_streaming_writer_encodes_lossless_flac(tmp_path):
+    """Chunks drained from the ring are encoded by ffmpeg into a FLAC file holding the same samples."""
+    path = str(tmp_path / 'microphone.flac')
+    ring = SampleRing(capacity=16000, channels=1)
+    samples = (np.sin(np.arange(8000) / 10) * 10000).astype(np.int16).reshape(-1, 1)
+    writer = StreamingAudioWriter(path, 2, 8000, source=ring)
+    for i, chunk in enumerate(np.split(samples, 10)):
+        ring.write(chunk.tobytes(), i / 10)
+    writer.close()
+
+    assert writer.frames_written == 8000
+    assert np.array_equal(_decode_pcm(path), samples.ravel())
+
+
+@pytest.mark.skipif(find_ffmpeg() is None, reason="ffmpeg not installed")
+def test_ffmpeg_audio_writer_encodes_opus(tmp_path):
+    """A second of stereo PCM is encoded to an Opus file that decodes to about one second."""
+    path = str(tmp_path / 'speaker.opus')
+    writer = FfmpegAudioWriter(path, 2, 2, 44100, bitrate='32k')
+    writer.write(np.zeros((44100, 2), dtype=np.int16))
+    writer.close()
+    assert writer.frames_written == 44100
+    assert abs(len(_decode_pcm(path)) - 8000) < 400
+
+
+def test_compressed_audio_falls_back_to_wav_without_ffmpeg(tmp_path, monkeypatch):
+    """FLAC falls back to WAV when ffmpeg is missing, and unknown formats are rejected."""
+    monkeypatch.setattr(core, 'find_ffmpeg', lambda: None)
+    rec = RecordMyMeeting(output_dir=str(tmp_path), record_mic=False, record_speaker=False,
+                          audio_format='flac')
+    assert rec.audio_format == 'wav'
+    with pytest.raises(ValueError):
+        RecordMyMeeting(output_dir=str(tmp_path), record_mic=False, record_speaker=False, audio_format='mp3')
+
+
+def test_ffmpeg_audio_writer_stops_after_broken_pipe(tmp_path, caplog):
+    """Once ffmpeg has exited, the first failed write is logged and later writes are dropped."""
+    # 'false' exits at once with an error, like an ffmpeg that rejects its arguments
+    writer = FfmpegAudioWriter(str(tmp_path / 'microphone.flac'), 1, 2, 44100, ffmpeg=shutil.which('false'))
+    writer._process.wait()
+    for _ in range(5):
+        writer.write(np.zeros(65536, dtype=np.int16))
+    writer.close()
+
+    assert writer.failed
+    assert writer.frames_written == 0
+    assert sum('stopped accepting data' in record.message for record in caplog.records) == 1
@@ -0,0 +1,66 @@
+import threading
+import time
+import wave
+
+from concurrent.futures import ThreadPoolExecutor
+
+from recordmymeeting.core import RecordMyMeeting
+from recordmymeeting.finalize import DONE, FAILED, SKIPPED, FinalizationJob
+from recordmymeeting.simulation import SimulatedAudioBackend, SimulatedDevice, SimulatedScreenBackend
+
+
+def test_job_runs_independent_tasks_in_parallel():
+    """Tasks without a dependency between them overlap; dependents wait for both."""
+    both_running = threading.Barrier(2, timeout=5)
+    order = []
+    with ThreadPoolExecutor(4) as executor:
+        job = FinalizationJob('session', executor)
+        job.add_task('a', lambda: order.append('a') or both_running.wait())
+        job.add_task('b', lambda: order.append('b') or both_running.wait())
+        job.add_task('c', lambda: order.append('c') or 'merged.wav', deps=['a', 'b'])
+        job.start()
+        assert job.result(timeout=5)['c'] == 'merged.wav'
+    assert order[-1] == 'c'
+    assert job.progress() == 1.0
+
+
+def test_failed_task_skips_its_dependents():
+    def fail():
+        raise OSError("disk full")
+
+    with ThreadPoolExecutor(2) as executor:
+        job = FinalizationJob('session', executor)
+        job.add_task('video', fail)
+        job.add_task('microphone', lambda: 'microphone.wav')
+        job.add_task('mux', lambda: 'recording.mkv', deps=['video', 'microphone'])
+        done = []
+        job.add_done_callback(done.append)
+        job.start().wait(5)
+    assert job.status() == {'video': FAILED, 'microphone': DONE, 'mux': SKIPPED}
+    assert isinstance(job.errors()['video'], OSError)
+    assert done == [job]
+
+
+def test_start_while_previous_session_finalizes(tmp_path):
+    """stop() hands back a job at once and the next session can start before it finishes."""
+    backend = SimulatedAudioBackend([SimulatedDevice('Sim Mic'),
+                                     SimulatedDevice('Sim Speaker Output', is_output=True)])
+    rec = RecordMyMeeting(output_dir=str(tmp_path), video_fps=5, audio_backend=backend,
+                          screen_backend=SimulatedScreenBackend(64, 48))
+    rec.start()
+    first = rec.session_folder
+    time.sleep(0.5)
+    job = rec.stop()
+    rec.start()
+    second = rec.session_folder
+    time.sleep(0.3)
+    second_job = rec.stop()
+
+    assert job.name == first and second_job.name == second != first
+    assert rec.wait_finalized(timeout=30)
+    assert set(job.status()) == {'video', 'microphone', 'speaker', 'merge'}
+    assert job.result()['merge'] == str(tmp_path / first / 'merged.wav')
+    for folder in (first, second):
+        with wave.open(str(tmp_path / folder / 'merged.wav')) as wf:
+            assert wf.getnframes() > 0
+    assert rec.get_status()['finalizing'] == []
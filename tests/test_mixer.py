@@ -0,0 +1,146 @@
+import wave
+
+import numpy as np
+
+from recordmymeeting.mixer import (
+    BlockInterleaver,
+    BlockMixer,
+    DriftResampler,
+    LiveMixer,
+    export_session_view,
+    mix_wav_files,
+    read_session_view,
+    speaker_alignment_segments,
+)
+from recordmymeeting.ring_buffer import SampleRing
+
+
+def _write_wav(path, samples, channels=1, rate=16000):
+    with wave.open(str(path), 'wb') as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(np.asarray(samples, dtype=np.int16).tobytes())
+
+
+def test_block_mixer_averages_without_overflow():
+    """Test that mixing averages samples in int32 and never wraps around."""
+    mixer = BlockMixer(channels=1, block_frames=4)
+    a = np.array([[32767], [-32768], [100], [-3]], dtype=np.int16)
+    b = np.array([[32767], [-32768], [300], [0]], dtype=np.int16)
+    assert mixer.mix(a, b).ravel().tolist() == [32767, -32768, 200, -2]
+
+
+def test_mix_wav_files_matches_full_merge(tmp_path):
+    """Test that block-wise mixing equals mixing everything at once."""
+    rng = np.random.default_rng(0)
+    mic = rng.integers(-32768, 32767, 10000)
+    speaker = rng.integers(-32768, 32767, 7000)
+    _write_wav(tmp_path / "mic.wav", mic)
+    _write_wav(tmp_path / "speaker.wav", speaker)
+
+    frames = mix_wav_files(str(tmp_path / "mic.wav"), str(tmp_path / "speaker.wav"),
+                           str(tmp_path / "merged.wav"), block_frames=1024)
+
+    expected = (mic[:7000].astype(np.int32) + speaker.astype(np.int32)) // 2
+    with wave.open(str(tmp_path / "merged.wav"), 'rb') as wf:
+        merged = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    assert frames == 7000
+    assert merged.tolist() == expected.tolist()
+
+
+def test_live_mixer_mixes_aligned_frames(tmp_path):
+    """Test that the live mixer only writes frames both sources have delivered."""
+    # Untimed rings are aligned frame by frame
+    mic = SampleRing(capacity=8192)
+    speaker = SampleRing(capacity=8192)
+    mixer = LiveMixer(str(tmp_path / "merged.wav"), mic, speaker, sample_width=2, rate=16000)
+    mic.write(np.full(3000, 100, dtype=np.int16).tobytes())
+    speaker.write(np.full(2000, 300, dtype=np.int16).tobytes())
+    mixer.close()
+
+    with wave.open(str(tmp_path / "merged.wav"), 'rb') as wf:
+        merged = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    # Interpolation needs one frame of look-ahead on the second source
+    assert len(merged) == 1999
+    assert set(merged.tolist()) == {200}
+
+
+def test_drift_resampler_follows_fractional_ratio():
+    """Test that resampling a ramp reproduces the ramp at the drifted positions."""
+    resampler = DriftResampler(channels=1, rate=8000, block_frames=1000)
+    source = np.arange(2000, dtype=np.int16)[:, None]
+    step = resampler.plan(10.0, 1.5)
+    start, end = resampler.span(step, 1000)
+    out = resampler.resample(source[start:end], step, 1000)
+    assert out[:4].ravel().tolist() == [10, 12, 13, 14]
+    assert resampler.position == 1510.0
+
+
+def test_mix_wav_files_applies_offset(tmp_path):
+    """Test that an offset shifts the second file onto the first file's timeline."""
+    _write_wav(tmp_path / "mic.wav", np.zeros(1000))
+    _write_wav(tmp_path / "speaker.wav", np.arange(1000) * 2)
+
+    mix_wav_files(str(tmp_path / "mic.wav"), str(tmp_path / "speaker.wav"),
+                  str(tmp_path / "merged.wav"), block_frames=128, offset=100.0, ratio=1.0)
+
+    with wave.open(str(tmp_path / "merged.wav"), 'rb') as wf:
+        merged = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    assert len(merged) == 899
+    assert merged[:3].tolist() == [100, 101, 102]
+
+
+def test_merge_aligns_each_clock_segment(tmp_path):
+    """Test that audio before and after a device switch is aligned with its own clock."""
+    chunk = np.zeros(100, dtype=np.int16).tobytes()
+    mic = SampleRing(capacity=4096, rate=1000)
+    for i in range(30):
+        mic.write(chunk, timestamp=i * 0.1)
+    speaker = SampleRing(capacity=4096, rate=1000)
+    for i in range(10):
+        speaker.write(chunk, timestamp=i * 0.1)
+    # The new device starts capturing after a 0.5 s gap
+    speaker.mark_discontinuity()
+    for i in range(10):
+        speaker.write(chunk, timestamp=1.5 + i * 0.1)
+
+    alignment = speaker_alignment_segments(mic, speaker)
+    assert [start for start, _, _ in alignment] == [0, 1000, 1500]
+    assert alignment[1][1] is None
+    assert abs(alignment[2][1] + 500.0) < 1e-6
+
+    _write_wav(tmp_path / "mic.wav", np.zeros(3000), rate=1000)
+    _write_wav(tmp_path / "speaker.wav", np.arange(2000) * 2, rate=1000)
+    mix_wav_files(str(tmp_path / "mic.wav"), str(tmp_path / "speaker.wav"),
+                  str(tmp_path / "merged.wav"), block_frames=128, alignment=alignment)
+
+    with wave.open(str(tmp_path / "merged.wav"), 'rb') as wf:
+        merged = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    assert merged[:1000].tolist() == list(range(1000))
+    assert not merged[1000:1500].any()
+    assert merged[1500:1600].tolist() == list(range(1000, 1100))
+
+
+def test_live_interleaver_writes_session_track_and_views(tmp_path):
+    """Mic and speaker land on the left and right channel; views are derived on read."""
+    mic = SampleRing(capacity=8192)
+    speaker = SampleRing(capacity=8192, channels=2)
+    path = str(tmp_path / "session.wav")
+    writer = LiveMixer(path, mic, speaker, sample_width=2, rate=16000, mixer=BlockInterleaver(1024))
+    mic.write(np.full(3000, 100, dtype=np.int16).tobytes())
+    speaker.write(np.tile(np.array([200, 400], dtype=np.int16), 2000).tobytes())
+    writer.close()
+
+    with wave.open(path, 'rb') as wf:
+        assert wf.getnchannels() == 2
+        frames = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16).reshape(-1, 2)
+    assert len(frames) == 1999
+    assert set(frames[:, 0].tolist()) == {100} and set(frames[:, 1].tolist()) == {300}
+
+    merged = np.concatenate(list(read_session_view(path, 'merged', block_frames=500)))
+    assert merged.shape == (1999, 1) and set(merged.ravel().tolist()) == {200}
+    assert export_session_view(path, 'speaker', str(tmp_path / "speaker.wav")) == 1999
+    with wave.open(str(tmp_path / "speaker.wav"), 'rb') as wf:
+        assert wf.getnchannels() == 1
+        assert set(np.frombuffer(wf.readframes(1999), dtype=np.int16).tolist()) == {300}
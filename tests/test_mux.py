@@ -0,0 +1,63 @@
+import subprocess
+import wave
+
+import cv2
+import numpy as np
+import pytest
+
+from recordmymeeting.ffmpeg import find_ffmpeg
+from recordmymeeting.mux import AudioTrack, mux_session, retime_vfr_video
+from recordmymeeting.video_writer import FrameChangeDetector, VideoEncoder
+
+
+def _write_video(path, frames, fps=10, timestamps=None):
+    vfr = timestamps is not None
+    encoder = VideoEncoder(path, fps, (64, 48), None, start_time=0.0,
+                           change_detector=FrameChangeDetector() if vfr else None, vfr=vfr)
+    for i in range(frames):
+        encoder.submit(timestamps[i] if timestamps else i / fps, np.full((48, 64, 4), i * 10, dtype=np.uint8))
+    encoder.close()
+
+
+def _write_wav(path, seconds, rate=8000):
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(np.zeros(int(seconds * rate), dtype=np.int16).tobytes())
+
+
+def test_mux_session_rejects_unknown_container(tmp_path):
+    with pytest.raises(ValueError):
+        mux_session(str(tmp_path / 'recording.avi'), 'screen.mp4', [])
+
+
+def test_retime_vfr_video_holds_frames_until_next_timestamp(tmp_path):
+    """Frames written at 0, 0.5 and 1.0 s become 11 frames at 10 fps."""
+    video = str(tmp_path / 'screen.mp4')
+    _write_video(video, 3, timestamps=[0.0, 0.5, 1.0])
+    output = str(tmp_path / 'cfr.mp4')
+    assert retime_vfr_video(video, str(tmp_path / 'screen_timestamps.txt'), output, 10)
+
+    cap = cv2.VideoCapture(output)
+    assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == 11
+    cap.release()
+
+
+@pytest.mark.skipif(find_ffmpeg() is None, reason="ffmpeg not installed")
+def test_mux_session_writes_offset_audio_tracks(tmp_path):
+    """Every track is mapped with its title, and offsets shift the audio start."""
+    video = str(tmp_path / 'screen.mp4')
+    _write_video(video, 20)
+    merged = str(tmp_path / 'merged.wav')
+    mic = str(tmp_path / 'microphone.wav')
+    _write_wav(merged, 2.0)
+    _write_wav(mic, 2.0)
+    output = str(tmp_path / 'recording.mkv')
+
+    assert mux_session(output, video, [AudioTrack(merged, 0.5, 'Merged'), AudioTrack(mic, -0.25)])
+
+    info = subprocess.run([find_ffmpeg(), '-hide_banner', '-i', output],
+                          stderr=subprocess.PIPE).stderr.decode()
+    assert info.count('Audio: pcm_s16le') == 2
+    assert 'Merged' in info and 'microphone' in info
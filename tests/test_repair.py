@@ -0,0 +1,89 @@
+import json
+import os
+import wave
+
+import numpy as np
+import pytest
+
+from recordmymeeting import audio_writer
+from recordmymeeting.audio_writer import WavReader, WavStreamWriter
+from recordmymeeting.cli import repair_main
+from recordmymeeting.ffmpeg import FfmpegVideoWriter, find_ffmpeg
+from recordmymeeting.repair import FAILED, OK, REPAIRED, mp4_boxes, repair_mp4, repair_session, repair_wav
+from recordmymeeting.segments import SegmentIndex
+
+
+def _crashed_wav(path, frames, header_interval=None):
+    """A WAV file whose writer was never closed."""
+    writer = WavStreamWriter(path, 1, 2, 8000, header_interval=header_interval)
+    writer.write(np.arange(frames, dtype=np.int16).tobytes())
+    writer._file.flush()
+    return writer
+
+
+def test_wav_header_is_updated_while_writing(tmp_path):
+    path = str(tmp_path / 'microphone.wav')
+    _crashed_wav(path, 800, header_interval=0)
+    with wave.open(path) as wf:
+        assert wf.getnframes() == 800
+
+
+def test_repair_wav_recovers_unfinalized_file(tmp_path):
+    path = str(tmp_path / 'microphone.wav')
+    _crashed_wav(path, 800)
+    with open(path, 'ab') as f:
+        f.write(b'\x01')  # half a frame written when the process died
+
+    assert repair_wav(path) == REPAIRED
+    with wave.open(path) as wf:
+        assert wf.getnframes() == 800
+        assert wf.readframes(800) == np.arange(800, dtype=np.int16).tobytes()
+    assert repair_wav(path) == OK
+
+
+def test_repair_wav_writes_rf64_header_for_long_audio(tmp_path, monkeypatch):
+    """A crashed file that passed the RIFF limit is given an RF64 header."""
+    monkeypatch.setattr(audio_writer, 'MAX_RIFF_SIZE', 1000)
+    path = str(tmp_path / 'merged.wav')
+    _crashed_wav(path, 800)
+
+    assert repair_wav(path) == REPAIRED
+    with WavReader(path) as wf:
+        assert wf.rf64 and wf.getnframes() == 800
+    assert repair_wav(path) == OK
+
+
+def test_repair_mp4_rejects_non_mp4(tmp_path):
+    path = tmp_path / 'screen.mp4'
+    path.write_bytes(b'\x00' * 64)
+    assert repair_mp4(str(path)) == FAILED
+
+
+@pytest.mark.skipif(find_ffmpeg() is None, reason="ffmpeg not installed")
+def test_repair_mp4_rebuilds_truncated_fragmented_file(tmp_path):
+    """A fragmented MP4 cut off mid-fragment is remuxed into a complete file."""
+    path = str(tmp_path / 'screen.mp4')
+    writer = FfmpegVideoWriter(path, 10, (64, 48), fragment_seconds=1.0)
+    for i in range(40):
+        writer.write(np.full((48, 64, 3), i * 5, dtype=np.uint8))
+    writer.release()
+    assert 'moof' in mp4_boxes(path)[0]
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 100)
+    assert not mp4_boxes(path)[1]
+
+    assert repair_mp4(path) == REPAIRED
+    boxes, complete = mp4_boxes(path)
+    assert complete and 'moov' in boxes
+
+
+def test_repair_session_completes_segment_index(tmp_path):
+    index = SegmentIndex(str(tmp_path / 'segments.json'), 60.0)
+    index.opened('microphone', 0, str(tmp_path / 'microphone_0000.wav'), 0.5)
+    _crashed_wav(str(tmp_path / 'microphone_0000.wav'), 8000)
+
+    results = repair_session(str(tmp_path))
+    assert results[str(tmp_path / 'microphone_0000.wav')] == REPAIRED
+    data = json.loads((tmp_path / 'segments.json').read_text())
+    assert data['complete'] and data['segments'][0]['end'] == 1.5
+    assert repair_main([str(tmp_path)]) == 0
@@ -0,0 +1,79 @@
+import numpy as np
+
+from recordmymeeting.ring_buffer import SampleRing
+
+
+def test_sample_ring_reader_gets_frames_in_order():
+    """Test that a reader sees every frame written, across the wrap point."""
+    ring = SampleRing(capacity=8, channels=2)
+    reader = ring.reader()
+    received = []
+    for i in range(5):
+        chunk = np.full((3, 2), i, dtype=np.int16)
+        ring.write(chunk.tobytes(), timestamp=float(i))
+        views = reader.peek()
+        received.extend(np.concatenate(views)[:, 0].tolist())
+        reader.advance(sum(len(v) for v in views))
+
+    assert received == [i for i in range(5) for _ in range(3)]
+    assert ring.frames_written == 15
+    assert ring.first_timestamp == 0.0 and ring.last_timestamp == 4.0
+
+
+def test_sample_ring_views_are_zero_copy():
+    """Test that views share memory with the preallocated buffer."""
+    ring = SampleRing(capacity=16)
+    reader = ring.reader()
+    ring.write(np.arange(4, dtype=np.int16).tobytes())
+    view = reader.peek()[0]
+    assert np.shares_memory(view, ring._buffer)
+
+
+def test_sample_ring_reader_counts_lost_frames():
+    """Test that a reader that falls behind skips overwritten frames."""
+    ring = SampleRing(capacity=4)
+    reader = ring.reader()
+    ring.write(np.arange(10, dtype=np.int16).tobytes())
+    assert reader.available() == 4
+    assert reader.lost_frames == 6
+    assert np.concatenate(reader.peek()).ravel().tolist() == [6, 7, 8, 9]
+
+
+def test_sample_ring_clock_measures_device_rate():
+    """Test that chunk stamps yield the device's real rate and start time."""
+    ring = SampleRing(capacity=1024, rate=1000)
+    chunk = np.zeros(100, dtype=np.int16).tobytes()
+    # Device runs 0.1% fast and started at t=50
+    for i in range(200):
+        ring.write(chunk, timestamp=50.0 + i * 100 / 1001.0)
+
+    origin, rate = ring.clock()
+    assert abs(rate - 1001.0) < 0.01
+    assert abs(origin - 50.0) < 1e-6
+    assert abs(ring.frame_at(ring.time_of(12345)) - 12345) < 1e-6
+
+
+def test_sample_ring_keeps_clock_of_each_segment():
+    """Test that a discontinuity keeps the finished segment's clock."""
+    ring = SampleRing(capacity=1024, rate=1000)
+    chunk = np.zeros(100, dtype=np.int16).tobytes()
+    for i in range(5):
+        ring.write(chunk, timestamp=10.0 + i * 0.1)
+    ring.mark_discontinuity()
+    for i in range(5):
+        ring.write(chunk, timestamp=20.0 + i * 0.1)
+
+    assert ring.clock_segments() == [(0, 10.0, 1000.0), (500, 19.5, 1000.0)]
+    assert ring.clock() == (19.5, 1000.0)
+
+
+def test_sample_ring_write_silence_keeps_timeline():
+    """Test that silence for lost audio zeroes the ring in place and advances the frame counter."""
+    ring = SampleRing(capacity=8, rate=1000)
+    ring.write(np.arange(1, 7, dtype=np.int16).tobytes(), timestamp=0.0)
+    assert ring.write_silence(4) == 4
+    ring.write(np.full(2, 9, dtype=np.int16).tobytes(), timestamp=0.010)
+
+    assert ring.frames_written == 12
+    assert np.concatenate(ring.views(4, 12)).ravel().tolist() == [5, 6, 0, 0, 0, 0, 9, 9]
+    assert ring.frame_at(0.010) == 10.0
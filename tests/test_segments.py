@@ -0,0 +1,92 @@
+import json
+import time
+import wave
+
+import cv2
+import numpy as np
+import pytest
+
+from recordmymeeting.audio_writer import SegmentedWavWriter
+from recordmymeeting.core import RecordMyMeeting
+from recordmymeeting.segments import SegmentIndex, segment_path
+from recordmymeeting.simulation import SimulatedAudioBackend, SimulatedDevice, SimulatedScreenBackend
+from recordmymeeting.video_writer import FrameQueue, SegmentedVideoEncoder
+
+
+def test_segmented_wav_writer_splits_writes_at_boundaries(tmp_path):
+    """Segments hold exactly segment_frames frames and report their frame ranges."""
+    events = []
+    writer = SegmentedWavWriter(str(tmp_path / 'microphone.wav'), 1, 2, 8000, 100,
+                                on_open=lambda i, path, frame: events.append(('open', i, frame)),
+                                on_close=lambda i, path, frame: events.append(('close', i, frame)))
+    for _ in range(5):
+        writer.write(np.arange(50, dtype=np.int16).reshape(-1, 1))
+    writer.write(np.zeros((30, 1), dtype=np.int16))
+    writer.close()
+
+    assert writer.frames_written == 280
+    assert writer.paths == [segment_path(str(tmp_path / 'microphone.wav'), i) for i in range(3)]
+    lengths = []
+    for path in writer.paths:
+        with wave.open(path) as wf:
+            lengths.append(wf.getnframes())
+    assert lengths == [100, 100, 80]
+    assert events == [('open', 0, 0), ('close', 0, 100), ('open', 1, 100), ('close', 1, 200),
+                      ('open', 2, 200), ('close', 2, 280)]
+
+
+def test_segment_index_lists_segments_as_they_finish(tmp_path):
+    index = SegmentIndex(str(tmp_path / 'segments.json'), 60.0)
+    index.opened('screen', 0, str(tmp_path / 'screen_0000.mp4'), 0.0)
+    data = json.loads((tmp_path / 'segments.json').read_text())
+    assert data['segments'] == [{'track': 'screen', 'index': 0, 'file': 'screen_0000.mp4',
+                                 'start': 0.0, 'end': None}]
+    index.closed('screen', 0, 60.0)
+    index.finish()
+    data = json.loads((tmp_path / 'segments.json').read_text())
+    assert data['complete'] and data['segments'][0]['end'] == 60.0
+
+
+def test_segmented_video_encoder_cuts_on_frame_boundaries(tmp_path):
+    """25 frames at 10 fps in 1 s segments give files of 10, 10 and 5 frames."""
+    closed = []
+    encoder = SegmentedVideoEncoder(str(tmp_path / 'screen.mp4'), 10, (64, 48), FrameQueue(64, 'block'), 1.0,
+                                    start_time=0.0, writer_options={'encoder': 'opencv'},
+                                    on_close=lambda i, path, end: closed.append((i, end)))
+    for i in range(25):
+        encoder.put(i / 10, np.full((48, 64, 4), i, dtype=np.uint8))
+    encoder.close(end_time=2.5)
+
+    counts = []
+    for path in encoder.paths:
+        cap = cv2.VideoCapture(path)
+        counts.append(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+        cap.release()
+    assert counts == [10, 10, 5]
+    assert closed == [(0, 1.0), (1, 2.0), (2, 2.5)]
+    assert encoder.stats()['frames_encoded'] == 25
+
+
+def test_segmented_session_rolls_every_track(tmp_path):
+    """A segmented session writes numbered files for every track and indexes them."""
+    backend = SimulatedAudioBackend([SimulatedDevice('Sim Mic'),
+                                     SimulatedDevice('Sim Speaker Output', is_output=True)])
+    rec = RecordMyMeeting(
+        output_dir=str(tmp_path),
+        video_fps=5,
+        audio_backend=backend,
+        screen_backend=SimulatedScreenBackend(64, 48),
+        segment_minutes=0.01,
+    )
+    rec.start()
+    index_file = rec.segment_index_file
+    time.sleep(1.5)
+    rec.stop().wait()
+
+    data = json.loads(open(index_file).read())
+    assert data['complete']
+    for track in ('screen', 'microphone', 'speaker', 'merged'):
+        segments = [s for s in data['segments'] if s['track'] == track]
+        assert len(segments) >= 2, track
+        assert all(s['end'] is not None for s in segments)
+        assert segments[1]['start'] - segments[0]['start'] == pytest.approx(0.6, abs=0.05)
@@ -0,0 +1,187 @@
+import time
+import wave
+
+import numpy as np
+
+from recordmymeeting.core import RecordMyMeeting
+from recordmymeeting.simulation import (
+    SimulatedAudioBackend,
+    SimulatedDevice,
+    SimulatedScreenBackend,
+)
+
+
+def test_simulated_session_runs_faster_than_real_time(tmp_path):
+    """A full session on simulated backends records speed x the wall-clock time."""
+    mic = SimulatedDevice('Sim Mic', drift_ppm=200, overflow_every=50)
+    speaker = SimulatedDevice('Sim Speaker Output', channels=2, signal='noise', is_output=True)
+    backend = SimulatedAudioBackend([mic, speaker], speed=10.0)
+    rec = RecordMyMeeting(
+        output_dir=str(tmp_path),
+        video_fps=5,
+        audio_backend=backend,
+        screen_backend=SimulatedScreenBackend(64, 48),
+    )
+    rec.start()
+    session = rec.session_folder
+    time.sleep(0.5)
+    status = rec.get_status()
+    rec.stop().wait()
+
+    assert status['audio_stats']['microphone']['overflows'] > 0
+    with wave.open(str(tmp_path / session / 'microphone.wav')) as wf:
+        # About 5 simulated seconds; chunks lost to overflows are recorded as silence
+        assert wf.getnframes() > 3 * 44100
+    with wave.open(str(tmp_path / session / 'merged.wav')) as wf:
+        assert wf.getnframes() > 3 * 44100
+    assert (tmp_path / session / 'screen.mp4').exists()
+
+
+def test_video_follows_simulated_clock(tmp_path):
+    """With a fast simulated clock the video lasts as long as the audio."""
+    import cv2
+
+    backend = SimulatedAudioBackend(speed=10.0)
+    rec = RecordMyMeeting(
+        output_dir=str(tmp_path),
+        video_fps=5,
+        record_speaker=False,
+        audio_backend=backend,
+        screen_backend=SimulatedScreenBackend(64, 48, clock=backend.monotonic),
+    )
+    rec.start()
+    video_file, mic_file = rec.video_file, rec.mic_file
+    time.sleep(0.5)
+    rec.stop().wait()
+
+    with wave.open(mic_file) as wf:
+        audio_seconds = wf.getnframes() / wf.getframerate()
+    cap = cv2.VideoCapture(video_file)
+    video_seconds = cap.get(cv2.CAP_PROP_FRAME_COUNT) / cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    assert audio_seconds > 3
+    assert abs(video_seconds - audio_seconds) < 1.0
+
+
+def test_incomplete_backend_fails_at_construction():
+    """Backends missing an abstract method cannot be instantiated."""
+    import pytest
+
+    from recordmymeeting.backends import AudioBackend, ScreenBackend
+
+    class NoSnapshot(AudioBackend):
+        def create(self):
+            return None
+
+        def detect_devices(self, refresh=False):
+            return {'mic': None, 'speaker': None}
+
+    with pytest.raises(TypeError):
+        NoSnapshot()
+    with pytest.raises(TypeError):
+        ScreenBackend()
+
+
+def test_capture_fills_overflows_and_stalls_with_silence():
+    """Audio lost to overflows and stalls becomes silence, so the clock estimate keeps the device rate."""
+    from recordmymeeting.capture import AudioCaptureStream
+
+    device = SimulatedDevice('Sim Speaker Output', drift_ppm=300, overflow_every=50,
+                             stall_every=8.0, stall_duration=0.5, is_output=True)
+    backend = SimulatedAudioBackend([device], speed=25.0)
+    capture = AudioCaptureStream(backend.create(), 'speaker', 0, 1, 44100, ring_seconds=30.0,
+                                 clock=backend.monotonic)
+    capture.open()
+    time.sleep(1.0)
+    capture.close()
+
+    ring = capture.ring
+    origin, rate = ring.clock()
+    assert capture.overflows > 0 and capture.frames_lost > 0
+    # Beyond MIN_CLOCK_SPAN, with lost audio not counted as drift
+    assert ring.last_timestamp - ring.first_timestamp > 20
+    assert abs(rate / 44100 - 1 - 300e-6) < 200e-6
+    assert capture.frames_captured + capture.frames_lost == ring.frames_written
+    # The timeline still matches the stamps: the last chunk is where the clock says,
+    # give or take the (speed-scaled) callback jitter
+    assert abs(ring.frame_at(ring.last_timestamp) - (ring.frames_written - 1024)) < 0.02 * 44100
+
+
+def test_simulated_hotplug_updates_device_list():
+    """Devices appear and disappear at their scheduled simulated times."""
+    headset = SimulatedDevice('Sim Headset')
+    backend = SimulatedAudioBackend(speed=100.0, hotplug=[(0.0, 'add', headset), (2.0, 'remove', headset)])
+    assert 'Sim Headset' in [d['name'] for d in backend.snapshot()['devices']]
+    time.sleep(0.05)
+    assert 'Sim Headset' not in [d['name'] for d in backend.snapshot()['devices']]
+
+
+def test_simulated_screen_records_selected_monitor(tmp_path):
+    """Only the chosen monitor is grabbed and the video is scaled to fit video_size."""
+    import cv2
+
+    rec = RecordMyMeeting(
+        output_dir=str(tmp_path),
+        record_mic=False,
+        record_speaker=False,
+        monitor=2,
+        video_size=(64, 64),
+        grayscale=True,
+        screen_backend=SimulatedScreenBackend(160, 90, monitors=2),
+    )
+    rec.start()
+    video_file = rec.video_file
+    time.sleep(0.3)
+    rec.stop().wait()
+
+    cap = cv2.VideoCapture(video_file)
+    assert (cap.get(cv2.CAP_PROP_FRAME_WIDTH), cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) == (64, 36)
+    cap.release()
+
+
+def test_interleaved_layout_writes_one_session_track(tmp_path):
+    """Mic and speaker share one 2-channel file; no separate or merged files are written."""
+    backend = SimulatedAudioBackend([SimulatedDevice('Sim Mic'),
+                                     SimulatedDevice('Sim Speaker Output', is_output=True)], speed=10.0)
+    rec = RecordMyMeeting(
+        output_dir=str(tmp_path),
+        record_screen=False,
+        audio_backend=backend,
+        audio_layout='interleaved',
+    )
+    rec.start()
+    session = rec.session_folder
+    time.sleep(0.3)
+    job = rec.stop()
+    job.wait()
+
+    assert set(job.status()) == {'session'}
+    assert sorted(p.name for p in (tmp_path / session).iterdir()) == ['session.wav']
+    with wave.open(str(tmp_path / session / 'session.wav')) as wf:
+        assert wf.getnchannels() == 2 and wf.getnframes() > 44100
+
+
+def test_interleaved_session_keeps_microphone_after_speaker_unplug(tmp_path):
+    """An unplugged speaker leaves its channel silent instead of stopping the session track."""
+    speaker = SimulatedDevice('Sim Speaker Output', is_output=True)
+    backend = SimulatedAudioBackend([SimulatedDevice('Sim Mic'), speaker], speed=10.0,
+                                    hotplug=[(2.0, 'remove', speaker)])
+    rec = RecordMyMeeting(
+        output_dir=str(tmp_path),
+        record_screen=False,
+        audio_backend=backend,
+        audio_layout='interleaved',
+    )
+    rec.start()
+    session_file = rec.session_audio_file
+    time.sleep(1.0)
+    rec.stop().wait()
+
+    with wave.open(session_file) as wf:
+        rate = wf.getframerate()
+        frames = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16).reshape(-1, 2)
+    # About 10 simulated seconds of microphone, not just the 2 s before the unplug
+    assert len(frames) > 8 * rate
+    assert np.abs(frames[-rate:, 0]).max() > 1000
+    assert np.abs(frames[rate:2 * rate - 4096, 1]).max() > 1000
+    assert not frames[4 * rate:, 1].any()
@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+import pytest
+
+from recordmymeeting.ffmpeg import find_ffmpeg
+from recordmymeeting.video_process import ProcessVideoEncoder
+
+
+def _frame(value):
+    frame = np.zeros((48, 64, 4), dtype=np.uint8)
+    frame[..., :3] = value
+    return frame
+
+
+def test_process_encoder_writes_constant_frame_rate_video(tmp_path):
+    """Frames copied into shared memory are encoded by a worker process."""
+    path = str(tmp_path / 'screen.mp4')
+    encoder = ProcessVideoEncoder(path, 10, (48, 64, 4), (64, 48), workers=1, policy='block',
+                                  start_time=0.0, writer_options={'encoder': 'opencv'})
+    for i in range(10):
+        assert encoder.put(i / 10, _frame(i * 20))
+    encoder.close(end_time=2.0)
+
+    stats = encoder.stats()
+    assert stats['queue_pushed'] == 10 and stats['queue_queued'] == 0
+    assert stats['frames_encoded'] == 20 and stats['frames_duplicated'] == 10
+    cap = cv2.VideoCapture(path)
+    assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == 20
+    cap.release()
+
+
+@pytest.mark.skipif(find_ffmpeg() is None, reason="ffmpeg not installed")
+def test_process_encoder_joins_parallel_segments(tmp_path):
+    """Segments encoded by several workers are joined into one seamless video."""
+    path = str(tmp_path / 'screen.mp4')
+    encoder = ProcessVideoEncoder(path, 10, (48, 64, 4), (64, 48), workers=2, segment_seconds=1.0,
+                                  policy='block', start_time=0.0, writer_options={'encoder': 'opencv'})
+    for i in range(35):
+        assert encoder.put(i / 10, _frame(i * 7))
+    encoder.close(end_time=3.5)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['screen.mp4']
+    cap = cv2.VideoCapture(path)
+    assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == 35
+    cap.release()
+
+
+def test_process_encoder_reports_dead_worker_when_dropping(tmp_path):
+    """With drop_oldest, put() returns False once the worker is gone instead of dropping forever."""
+    encoder = ProcessVideoEncoder(str(tmp_path / 'screen.mp4'), 10, (48, 64, 4), (64, 48), workers=1,
+                                  slots=2, policy='drop_oldest', start_time=0.0,
+                                  writer_options={'encoder': 'opencv'})
+    encoder._processes[0].kill()
+    encoder._processes[0].join()
+    results = [encoder.put(i / 10, _frame(i)) for i in range(4)]
+    encoder.close(end_time=0.4)
+
+    assert results[-1] is False
+    assert encoder.dropped == 0
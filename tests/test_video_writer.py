@@ -0,0 +1,136 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from recordmymeeting.video_writer import FrameQueue, VideoEncoder
+
+
+def test_frame_queue_drop_oldest_keeps_newest_frames():
+    """A full drop-oldest queue discards old frames instead of waiting."""
+    queue = FrameQueue(maxsize=2, policy='drop_oldest')
+    for i in range(5):
+        assert queue.put(float(i), np.full((1, 1, 4), i, dtype=np.uint8))
+    assert queue.dropped == 3
+    assert [queue.get()[0] for _ in range(2)] == [3.0, 4.0]
+
+
+def test_frame_queue_block_waits_for_consumer():
+    """A full blocking queue makes put() wait until a frame is taken."""
+    queue = FrameQueue(maxsize=1, policy='block')
+    queue.put(0.0, np.zeros((1, 1, 4), dtype=np.uint8))
+    done = threading.Event()
+
+    def producer():
+        queue.put(1.0, np.zeros((1, 1, 4), dtype=np.uint8))
+        done.set()
+
+    threading.Thread(target=producer, daemon=True).start()
+    assert not done.wait(0.05)
+    assert queue.get()[0] == 0.0
+    assert done.wait(2)
+    assert queue.blocked == 1 and queue.dropped == 0
+
+
+def test_video_encoder_drains_queue_on_close(tmp_path):
+    """Frames still queued at close() are encoded before the file is finalized."""
+    path = str(tmp_path / 'screen.mp4')
+    queue = FrameQueue(maxsize=16, policy='block')
+    encoder = VideoEncoder(path, 10, (64, 48), queue)
+    for i in range(10):
+        queue.put(i / 10, np.zeros((48, 64, 4), dtype=np.uint8))
+    encoder.close()
+
+    assert encoder.frames_written == 10
+    cap = cv2.VideoCapture(path)
+    assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == 10
+    cap.release()
+
+
+def test_video_encoder_keeps_constant_frame_rate(tmp_path):
+    """Irregular capture times are mapped onto slots N / fps by duplicating and dropping."""
+    queue = FrameQueue(maxsize=16, policy='block')
+    encoder = VideoEncoder(str(tmp_path / 'screen.mp4'), 10, (64, 48), queue, start_time=0.0)
+    # Slots 0, 1, 1 (same slot), 5
+    for timestamp in (0.0, 0.1, 0.13, 0.5):
+        queue.put(timestamp, np.zeros((48, 64, 4), dtype=np.uint8))
+    encoder.close(end_time=1.0)
+
+    assert encoder.frames_written == 10
+    assert encoder.frames_dropped == 1
+    # Slots 2-4 repeat the frame from slot 1, slots 6-9 repeat the last frame
+    assert encoder.frames_duplicated == 7
+
+
+def test_bgra_frame_wraps_screenshot_without_copying():
+    """The grabbed buffer is viewed in place and converted to BGR colors on encode."""
+    from recordmymeeting.simulation import SimulatedScreenBackend
+    from recordmymeeting.video_writer import bgra_frame
+
+    with SimulatedScreenBackend(64, 48).open() as sct:
+        shot = sct.grab(sct.monitors[1])
+    frame = bgra_frame(shot)
+    assert frame.shape == (48, 64, 4)
+    assert np.shares_memory(frame, np.frombuffer(shot.raw, dtype=np.uint8))
+
+    queue = FrameQueue()
+    encoder = VideoEncoder(os.devnull, 10, (64, 48), queue)
+    converted = encoder._convert(frame)
+    encoder.close()
+    assert converted is encoder._buffers[0]
+    assert np.array_equal(converted, frame[:, :, :3])
+
+
+def test_frame_change_detector_catches_small_changes():
+    """Identical frames are unchanged; a small edit on the sampling grid is a change."""
+    from recordmymeeting.video_writer import FrameChangeDetector
+
+    detector = FrameChangeDetector(step=4)
+    frame = np.zeros((48, 64, 4), dtype=np.uint8)
+    assert detector.changed(frame)
+    assert not detector.changed(frame.copy())
+    frame[8:12, 8:12, 1] = 255
+    assert detector.changed(frame)
+    assert not detector.changed(frame)
+
+
+def test_video_encoder_vfr_writes_changed_frames_and_timestamps(tmp_path):
+    """With change detection in VFR mode only changed frames are encoded, with their times."""
+    from recordmymeeting.video_writer import FrameChangeDetector
+
+    queue = FrameQueue(maxsize=16, policy='block')
+    encoder = VideoEncoder(str(tmp_path / 'screen.mp4'), 10, (64, 48), queue, start_time=0.0,
+                           change_detector=FrameChangeDetector(), vfr=True)
+    static = np.zeros((48, 64, 4), dtype=np.uint8)
+    slide = np.full((48, 64, 4), 200, dtype=np.uint8)
+    for i, frame in enumerate([static] * 5 + [slide] * 5):
+        queue.put(i / 10, frame)
+    encoder.close(end_time=1.0)
+
+    assert encoder.frames_unchanged == 8
+    # First frame, the slide change and the final frame held until the end
+    assert encoder.frames_written == 3
+    with open(encoder.timestamps_file) as f:
+        lines = f.read().splitlines()
+    assert lines == ['# timestamp format v2', '0.000', '500.000', '1000.000']
+
+
+def test_fit_size_scales_down_keeping_aspect_ratio():
+    from recordmymeeting.video_writer import fit_size
+
+    assert fit_size(7680, 1440, (1920, 1080)) == (1920, 360)
+    assert fit_size(1280, 720, (1920, 1080)) == (1280, 720)
+    assert fit_size(1366, 768, None) == (1366, 768)
+
+
+def test_video_encoder_downscales_and_converts_to_grayscale(tmp_path):
+    """Large BGRA frames are shrunk to the output size, optionally as one channel."""
+    frame = np.zeros((96, 128, 4), dtype=np.uint8)
+    frame[:, :64, :3] = 255
+    for grayscale, shape in ((False, (48, 64, 3)), (True, (48, 64))):
+        encoder = VideoEncoder(str(tmp_path / 'screen.mp4'), 10, (64, 48), FrameQueue(), grayscale=grayscale)
+        converted = encoder._convert(frame)
+        encoder.close()
+        assert converted.shape == shape
+        assert converted[:, :32].min() == 255 and converted[:, 32:].max() == 0